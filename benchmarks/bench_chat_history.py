@@ -0,0 +1,106 @@
+"""
+bench_chat_history.py — "last N messages" fetch over a large chat_history.
+
+Loads a synthetic chat_history (default 2,000,000 rows across 200,000
+conversations) into a scratch database, then times the recent-window fetch
+used by every service's get_conversation_history():
+
+  old  — find(conversation_id).sort(timestamp ASC).limit(N), no index
+         (returns the OLDEST N messages and examines the whole collection)
+  new  — find(conversation_id).sort(timestamp DESC).limit(N), reversed,
+         on the (conversation_id, timestamp) index
+
+Requires a running MongoDB (DATABASE_URL, default mongodb://localhost:27017).
+Run from the repo root:
+    python benchmarks/bench_chat_history.py --rows 2000000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from pymongo import MongoClient
+
+BATCH = 10_000
+
+
+def seed(coll, rows: int, conversations: int):
+    coll.drop()
+    base = datetime(2025, 1, 1)
+    batch = []
+    for i in range(rows):
+        conv = i % conversations
+        batch.append({
+            "conversation_id": f"conv-{conv}",
+            "service": "bench", "employee_id": f"EMP{conv % 5000:06d}",
+            "role": "user" if (i // conversations) % 2 == 0 else "assistant",
+            "message": f"message {i}", "flagged": False,
+            "timestamp": (base + timedelta(seconds=i)).isoformat(),
+        })
+        if len(batch) == BATCH:
+            coll.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        coll.insert_many(batch, ordered=False)
+
+
+def time_queries(coll, conv_ids, limit: int, newest_first: bool):
+    timings = []
+    for conv_id in conv_ids:
+        start = time.perf_counter()
+        cursor = coll.find({"conversation_id": conv_id},
+                           sort=[("timestamp", -1 if newest_first else 1)]).limit(limit)
+        docs = list(cursor)
+        if newest_first:
+            docs.reverse()
+        timings.append((time.perf_counter() - start) * 1000)
+    plan = coll.find({"conversation_id": conv_ids[0]},
+                     sort=[("timestamp", -1 if newest_first else 1)]).limit(limit).explain()
+    examined = plan["executionStats"]["totalDocsExamined"]
+    return timings, examined
+
+
+def report(label, timings, examined):
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"  {label:<32} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms"
+          f"   docs examined {examined:>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--conversations", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("DATABASE_URL", "mongodb://localhost:27017"))
+    db     = client["bench_chat_history"]
+    coll   = db.chat_history
+
+    print(f"Seeding {args.rows:,} messages across {args.conversations:,} conversations...")
+    start = time.perf_counter()
+    seed(coll, args.rows, args.conversations)
+    print(f"  seeded in {time.perf_counter() - start:.1f}s")
+
+    conv_ids = [f"conv-{random.randrange(args.conversations)}" for _ in range(args.queries)]
+    # The unindexed scan is slow — time a handful of queries only
+    old_ids = conv_ids[:max(5, args.queries // 20)]
+
+    print(f"Fetching last {args.limit} messages per conversation:")
+    report("old: ASC + limit, no index", *time_queries(coll, old_ids, args.limit, newest_first=False))
+
+    coll.create_index([("conversation_id", 1), ("timestamp", 1)], name="conversation_timestamp")
+    report("new: DESC + limit + index", *time_queries(coll, conv_ids, args.limit, newest_first=True))
+
+    if not args.keep:
+        client.drop_database("bench_chat_history")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+bench_fast_router.py — how many create_plan() LLM calls the fast-path router avoids.
+
+Replays a labelled query mix through FastRouter, first with the rule table
+alone and then with the k-NN tier trained on a synthetic "logged" history of
+single-agent plans, disjoint from the evaluation queries. Reports planner
+calls avoided, fast-path accuracy (a wrong fast-path route is worse than a
+planner call) and routing latency.
+
+Run from the repo root:
+    python benchmarks/bench_fast_router.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "coordinator-service", "src"))
+
+from fast_router import FastRouter
+
+AGENTS = ["FAQ", "Payroll", "Leave", "Recruitment", "Performance"]
+
+# (query, expected agent — None when the planner should decide)
+EVAL_QUERIES = [
+    ("What's my leave balance?", "Leave"),
+    ("How many sick days do I get?", "Leave"),
+    ("I want to apply for leave next Friday", "Leave"),
+    ("Show my leave history", "Leave"),
+    ("Can I take a day off on Monday?", "Leave"),
+    ("When is payday?", "Payroll"),
+    ("Show me my latest payslip", "Payroll"),
+    ("How much CPF is deducted each month?", "Payroll"),
+    ("What is my take-home pay?", "Payroll"),
+    ("Why is my net pay lower this month?", "Payroll"),
+    ("What is the dress code?", "FAQ"),
+    ("What are the working hours?", "FAQ"),
+    ("Where is the office located?", "FAQ"),
+    ("What benefits are available?", "FAQ"),
+    ("Is there a remote work policy?", "FAQ"),
+    ("What is the annual leave policy?", "FAQ"),
+    ("What is the sick leave policy?", "FAQ"),
+    ("Are there any job openings in Engineering?", "Recruitment"),
+    ("Which open positions are there in Singapore?", "Recruitment"),
+    ("Are we hiring data scientists?", "Recruitment"),
+    ("Show my goals", "Performance"),
+    ("What was my last performance review?", "Performance"),
+    ("Update my KPI progress to 80%", "Performance"),
+    # phrasing the rule table does not know — only k-NN can route these
+    ("how much will land in my bank account", "Payroll"),
+    ("when do we get paid", "Payroll"),
+    ("how many days can I still take off this year", "Leave"),
+    ("what should I wear to the office", "FAQ"),
+    ("any vacancies for designers", "Recruitment"),
+    ("how am I tracking against my objectives", "Performance"),
+    # multi-intent / ambiguous — should fall through to the planner
+    ("What's my leave balance and my latest payslip?", None),
+    ("Check the leave policy then apply for 3 days of annual leave", None),
+    ("Tell me everything about my employment", None),
+    ("How many days of annual leave am I entitled to?", None),
+    ("Can you help me?", None),
+]
+
+# Synthetic chat_history: paraphrases the planner previously routed to one agent.
+# Training data only — none of these may appear among EVAL_QUERIES.
+LOGGED_PLANS = {
+    "Payroll": ["how much will I get in my bank account this month", "when does pay come in each month",
+                "how much money lands in my account", "which day of the month are we paid",
+                "what do I get paid"],
+    "Leave": ["how many days can I take off", "how much time off can I still take",
+              "how many days off do I have left this year", "can I still take days off this year"],
+    "FAQ": ["what should I wear to work", "what do people wear on fridays",
+            "what to wear at the office"],
+    "Recruitment": ["any vacancies for engineers", "are there vacancies for designers",
+                    "any vacancies in marketing"],
+    "Performance": ["how am I tracking against my goals this quarter", "am I on track with my objectives",
+                    "tracking progress on my objectives"],
+}
+
+
+def run(router: FastRouter, label: str):
+    avoided = correct = 0
+    start = time.perf_counter()
+    for query, expected in EVAL_QUERIES:
+        routed = router.route(query)
+        if routed:
+            avoided += 1
+            correct += routed[0] == expected
+    elapsed_us = (time.perf_counter() - start) / len(EVAL_QUERIES) * 1e6
+    accuracy = f"{correct / avoided:.0%}" if avoided else "n/a"
+    print(f"  {label:<14} planner calls avoided {avoided:>2}/{len(EVAL_QUERIES)}"
+          f"  fast-path accuracy {accuracy:>4}  routing {elapsed_us:6.1f} µs/query")
+
+
+def main():
+    print(f"{len(EVAL_QUERIES)} queries (each avoided call saves one gpt-4o-mini planner round-trip)")
+    run(FastRouter(AGENTS), "rules only")
+
+    router = FastRouter(AGENTS)
+    examples = [(q, a) for a, qs in LOGGED_PLANS.items() for q in qs]
+    normalise = lambda q: " ".join(q.lower().strip("?!. ").split())
+    leaked = {q for q, _ in EVAL_QUERIES for t, _ in examples if normalise(q) in normalise(t)}
+    assert not leaked, f"evaluation queries in the training set: {leaked}"
+    random.Random(0).shuffle(examples)
+    router.train(examples)
+    run(router, "rules + k-NN")
+
+
+if __name__ == "__main__":
+    main()
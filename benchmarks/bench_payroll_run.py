@@ -0,0 +1,114 @@
+"""
+bench_payroll_run.py — month-end payroll for the whole company.
+
+Compares the existing per-employee path with the vectorized batch engine
+(payroll_batch.py) over a synthetic company (default 100,000 employees):
+
+  compute (default, no database needed)
+    old  — await _compute_payslip(emp, month, year) once per employee
+    new  — compute_payslips() over chunks of --chunk employees (NumPy columns)
+
+  --mongo (needs MongoDB at DATABASE_URL, default mongodb://localhost:27017)
+    old  — per employee: find_one + _compute_payslip + insert_one, timed on
+           --old-sample employees and extrapolated to the full company
+    new  — run_payroll(): chunked cursor + NumPy + insert_many per chunk
+
+Run from the repo root (with payroll-service requirements installed):
+    python benchmarks/bench_payroll_run.py --employees 100000
+    python benchmarks/bench_payroll_run.py --employees 100000 --mongo
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "payroll-service", "src"))
+
+from main import _compute_payslip
+from payroll_batch import PayrollRun, compute_payslips, run_payroll
+
+MONTH, YEAR = "January", 2026
+
+
+def make_employees(count: int):
+    rng = random.Random(7)
+    return [
+        {"employee_id": f"EMP{i:06d}", "name": f"Employee {i}",
+         "monthly_salary": rng.randrange(3000, 20000), "currency": "SGD",
+         "tax_rate": rng.choice([0.07, 0.115, 0.15, 0.18, 0.2]),
+         "cpf_rate": 0.2, "insurance": rng.choice([100, 150, 200])}
+        for i in range(count)
+    ]
+
+
+async def bench_compute(employees, chunk: int):
+    start = time.perf_counter()
+    for emp in employees:
+        await _compute_payslip(emp, MONTH, YEAR)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(employees), chunk):
+        compute_payslips(employees[i:i + chunk], MONTH, YEAR)
+    new = time.perf_counter() - start
+    return old, new
+
+
+async def bench_mongo(employees, chunk: int, old_sample: int):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.getenv("DATABASE_URL", "mongodb://localhost:27017"))
+    db     = client["bench_payroll_run"]
+    await db.employees.drop()
+    await db.payslips.drop()
+    await db.employees.insert_many([dict(e) for e in employees], ordered=False)
+    await db.employees.create_index("employee_id")
+    await db.payslips.create_index([("employee_id", 1), ("year", 1), ("month_num", 1)], unique=True)
+
+    sample = random.Random(11).sample(employees, min(old_sample, len(employees)))
+    start  = time.perf_counter()
+    for emp in sample:
+        doc = await db.employees.find_one({"employee_id": emp["employee_id"]})
+        await db.old_payslips.insert_one(await _compute_payslip(doc, MONTH, YEAR))
+    old = (time.perf_counter() - start) / len(sample) * len(employees)
+
+    run   = PayrollRun(MONTH, YEAR, chunk)
+    start = time.perf_counter()
+    await run_payroll(db, run)
+    new = time.perf_counter() - start
+    assert run.status == "completed" and run.written == len(employees), run.to_dict()
+
+    await client.drop_database("bench_payroll_run")
+    client.close()
+    return old, new
+
+
+def report(label, old, new, count):
+    print(f"  {label}")
+    print(f"    old: per-employee loop   {old:9.2f} s   {count / old:12,.0f} employees/s")
+    print(f"    new: vectorized chunks   {new:9.2f} s   {count / new:12,.0f} employees/s"
+          f"   ({old / new:,.1f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=100_000)
+    parser.add_argument("--chunk", type=int, default=5000)
+    parser.add_argument("--mongo", action="store_true", help="also time the end-to-end run against MongoDB")
+    parser.add_argument("--old-sample", type=int, default=2000,
+                        help="employees timed on the old Mongo path (extrapolated)")
+    args = parser.parse_args()
+
+    employees = make_employees(args.employees)
+    print(f"Payroll for {args.employees:,} employees, chunks of {args.chunk:,}:")
+    report("compute only", *asyncio.run(bench_compute(employees, args.chunk)), args.employees)
+    if args.mongo:
+        report("end to end (MongoDB)", *asyncio.run(bench_mongo(employees, args.chunk, args.old_sample)),
+               args.employees)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+bench_react_concurrency.py — concurrent ReAct throughput, sync vs async LLM client.
+
+Spins up a local fake OpenAI-compatible completion server that answers every
+/chat/completions call with "Final Answer: ..." after a fixed delay, then
+fires N concurrent run_react_loop() calls on one event loop:
+
+  sync   — the previous behaviour: the blocking OpenAI client is called
+           directly inside the coroutine, so requests are served one by one
+  async  — AsyncOpenAI awaited through react_engine.chat_completion()
+
+Run from the repo root:
+    python benchmarks/bench_react_concurrency.py --requests 50 --delay 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "services", "coordinator-service", "src"))
+
+from openai import AsyncOpenAI, OpenAI
+from react_engine import run_react_loop
+
+
+def make_handler(delay: float):
+    class FakeCompletionHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            time.sleep(delay)
+            body = json.dumps({
+                "id": "chatcmpl-bench", "object": "chat.completion",
+                "created": int(time.time()), "model": "gpt-4o-mini",
+                "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant",
+                                "content": "Thought: done.\nFinal Answer: benchmark ok"},
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeCompletionHandler
+
+
+class BlockingClient:
+    """Reproduces the old code path: a sync create() called on the event loop."""
+
+    def __init__(self, client: OpenAI):
+        self.chat = self
+        self.completions = self
+        self._client = client
+
+    async def create(self, **kwargs):
+        return self._client.chat.completions.create(**kwargs)
+
+
+async def run_batch(openai_client, n: int) -> float:
+    async def noop_tool(name, args):
+        return "{}"
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_react_loop(
+            openai_client=openai_client,
+            messages=[{"role": "user", "content": f"question {i}"}],
+            tools=[],
+            tool_executor=noop_tool,
+            service_name="Bench",
+        )
+        for i in range(n)
+    ])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50, help="concurrent ReAct loops")
+    parser.add_argument("--delay", type=float, default=0.2, help="fake completion latency (s)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    sync_client  = BlockingClient(OpenAI(api_key="bench", base_url=base_url))
+    async_client = AsyncOpenAI(api_key="bench", base_url=base_url)
+
+    sync_elapsed  = asyncio.run(run_batch(sync_client, args.requests))
+    async_elapsed = asyncio.run(run_batch(async_client, args.requests))
+    server.shutdown()
+
+    print(f"{args.requests} concurrent ReAct loops, {args.delay * 1000:.0f} ms per completion")
+    print(f"  sync  client: {sync_elapsed:7.2f}s  {args.requests / sync_elapsed:8.1f} req/s")
+    print(f"  async client: {async_elapsed:7.2f}s  {args.requests / async_elapsed:8.1f} req/s")
+    print(f"  speed-up:     {sync_elapsed / async_elapsed:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
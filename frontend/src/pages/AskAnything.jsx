@@ -11,6 +11,7 @@ const AskAnything = () => {
   const [loading, setLoading] = useState(false);
   const [agents, setAgents] = useState([]);  
   const [conversationId, setConversationId] = useState(null);
+  const [status, setStatus] = useState(null);
   const employeeId = user?.employee_id;
 
   useEffect(() => {
@@ -34,29 +35,38 @@ const AskAnything = () => {
     setLoading(true);
 
     try {
-      //const response = await coordinatorAPI.ask(query);
-      const response = await coordinatorAPI.ask({
+      // Streamed: plan/step events update the status line, `token` events
+      // fill in the answer as it is generated, `done` carries the final response.
+      const appendAi = (patch) => setConversation(prev => {
+        const last = prev[prev.length - 1];
+        if (last?.type === 'ai' && last.streaming) {
+          return [...prev.slice(0, -1), { ...last, ...patch(last) }];
+        }
+        return [...prev, { type: 'ai', text: '', streaming: true, ...patch({ text: '' }) }];
+      });
+
+      const data = await coordinatorAPI.askStream({
         query,
         employee_id: employeeId,
         conversation_id: conversationId,
+      }, (event, payload) => {
+        if (event === 'plan') setStatus(`🧭 Asking ${payload.steps.join(' + ')}...`);
+        else if (event === 'step') setStatus(`✅ ${payload.agent} finished`);
+        else if (event === 'token') appendAi(last => ({ text: last.text + payload.text }));
       });
-      
-      setConversationId(response.data.conversation_id);
-
-      setConversation(prev => [...prev, { 
-        type: 'ai', 
-        text: response.data.answer,
-        agent: response.data.agent_used
-      }]);
-      
+
+      setConversationId(data.conversation_id);
+      appendAi(() => ({ text: data.answer, agent: data.agent_used, streaming: false }));
+
       setQuery('');
-      toast.success(`Routed to ${response.data.agent_used} Agent!`);
+      toast.success(`Routed to ${data.agent_used} Agent!`);
     } catch (error) {
-      console.error('Coordinator error:', error.response?.data); 
+      console.error('Coordinator error:', error.message);
       toast.error('Failed to get answer');
-      setConversation(prev => prev.slice(0, -1));
+      setConversation(prev => prev.filter(msg => !msg.streaming).slice(0, -1));
     } finally {
       setLoading(false);
+      setStatus(null);
     }
   };
 
@@ -154,12 +164,12 @@ const AskAnything = () => {
                       </div>
                     </div>
                   ))}
-                  {loading && (
+                  {loading && !conversation[conversation.length - 1]?.streaming && (
                     <div className="chat-message ai">
                       <div className="message-avatar">🤖</div>
                       <div className="message-content">
                         <div style={{ fontSize: '11px', color: '#999', marginBottom: '4px' }}>
-                          🧠 Routing query to appropriate agent...
+                          {status || '🧠 Routing query to appropriate agent...'}
                         </div>
                         <div className="typing-indicator">
                           <span></span><span></span><span></span>
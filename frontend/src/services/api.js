@@ -40,9 +40,61 @@ export const faqAPI = {
   getCategories: () => api.get('/api/faq/categories'),
 };
 
+// Server-Sent Events over fetch (EventSource cannot POST or send headers).
+// Calls onEvent(event, data) per event and resolves with the `done` payload.
+// Not bound by the axios timeout: the stream stays open until `done`.
+const postEventStream = async (path, data, onEvent) => {
+  const token = localStorage.getItem('token');
+  const response = await fetch(`${API_URL}${path}`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify(data),
+  });
+  if (!response.ok) {
+    if (response.status === 401) {
+      localStorage.removeItem('token');
+      window.location.href = '/login';
+    }
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      const lines = [];
+      frame.split('\n').forEach((line) => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) lines.push(line.slice(5).trim());
+      });
+      if (!lines.length) continue;
+      const payload = JSON.parse(lines.join('\n'));
+      if (event === 'error') throw new Error(payload.detail || 'Stream failed');
+      if (event === 'done') result = payload;
+      onEvent?.(event, payload);
+    }
+  }
+  if (!result) throw new Error('Stream closed before completion');
+  return result;
+};
+
 export const coordinatorAPI = {
   //ask: (query, context) => api.post('/api/coordinator/ask', { query, context }),
   ask: (data) => api.post('/api/coordinator/ask', data),
+  askStream: (data, onEvent) => postEventStream('/api/coordinator/ask/stream', data, onEvent),
   getAgents: () => api.get('/api/coordinator/agents'),
   getChatHistory: (employeeId) => api.get('/api/coordinator/history/chat', { params: { employee_id: employeeId } }),
   getConversation: (conversationId) => api.get(`/api/coordinator/history/chat/${conversationId}`),
@@ -61,6 +113,7 @@ export const recruitmentAPI = {
   query: (data) => api.post('/api/recruitment/query', data),
   getOpenings: (params) => api.get('/api/recruitment/openings', { params }),
   getOpening: (id) => api.get(`/api/recruitment/opening/${id}`),
+  setOpeningStatus: (id, status) => api.put(`/api/recruitment/opening/${id}/status`, { status }),
 };
 
 
@@ -79,6 +132,7 @@ export const leaveAPI = {
   query: (data) => api.post('/api/leave/query', data),
   request: (data) => api.post('/api/leave/request', data),
   getBalance: (employeeId) => api.get(`/api/leave/balance?employee_id=${employeeId}`),
+  approveMany: (requestIds) => api.post('/api/leave/approve', { request_ids: requestIds }),
   getHistory: () => api.get('/api/leave/history'),
 };
 
@@ -350,7 +350,8 @@ app.get('/api/docs', (req, res) => {
         url: '/api/coordinator',
         description: 'Intelligent query routing',
         endpoints: {
-          ask: 'POST /api/coordinator/ask'
+          ask: 'POST /api/coordinator/ask',
+          askStream: 'POST /api/coordinator/ask/stream (text/event-stream)'
         }
       },
       faq: {
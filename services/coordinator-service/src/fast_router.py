@@ -0,0 +1,191 @@
+"""
+fast_router.py — Local routing tier that runs ahead of the LLM planner.
+
+Two tiers, tried in order:
+  1. rules — a keyword/regex table per agent. Fires only when exactly one
+     agent matches, so multi-intent queries ("leave balance and my payslip")
+     still go to the planner.
+  2. knn   — optional nearest-neighbour classifier over past coordinator
+     queries whose logged answer came from a single agent. Queries are
+     embedded as hashed word + bigram vectors; the tier fires only when the
+     nearest neighbours are both similar enough and agree.
+
+Queries that chain several requests ("... then apply for leave") skip both
+tiers. Policy / handbook questions go to FAQ even when they name a leave or
+pay topic ("what is the annual leave policy?"), matching the planner's
+routing table; when they are also personal ("how much leave am I entitled
+to?") the planner decides. When neither tier is confident, route() returns None and the caller
+falls back to create_plan().
+"""
+
+import re
+import math
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from typing import Dict, List, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tier 1 — keyword / regex table (one entry per AGENT_DISPATCH agent)
+# ─────────────────────────────────────────────────────────────────────────────
+ROUTING_RULES: Dict[str, List[str]] = {
+    "FAQ": [
+        r"\bdress code\b", r"\bworking hours\b", r"\boffice (hours|address|location)\b",
+        r"\bwhere is the office\b", r"\bremote work\b", r"\bwork from home\b",
+        r"\bbenefits?\b", r"\bcontact hr\b", r"\bonboarding\b", r"\btraining\b",
+    ],
+    "Payroll": [
+        r"\bpayslips?\b", r"\bsalary\b", r"\bpay ?day\b", r"\bcpf\b", r"\btake[- ]home\b",
+        r"\bnet pay\b", r"\bgross pay\b", r"\bdeductions?\b", r"\bincome tax\b",
+    ],
+    "Leave": [
+        r"\bleave balance\b", r"\bleave (days|history|requests?)\b", r"\bsick (days|leave)\b",
+        r"\bannual leave\b", r"\bpersonal leave\b", r"\b(apply|request) for leave\b",
+        r"\bday off\b", r"\bdays off\b", r"\bvacation\b",
+    ],
+    "Recruitment": [
+        r"\bjob (openings?|postings?|vacanc(y|ies))\b", r"\bopen (positions?|roles?)\b",
+        r"\bhiring\b", r"\brecruit(ment|ing)?\b", r"\bjob posting\b",
+    ],
+    "Performance": [
+        r"\bgoals?\b", r"\bkpis?\b", r"\bperformance reviews?\b", r"\bappraisals?\b",
+        r"\bperformance rating\b", r"\breview rating\b",
+    ],
+}
+
+# Sequencing words that signal a multi-step request — always left to the planner
+_MULTI_STEP_RE = re.compile(r"\b(then|also|after that|afterwards|as well as)\b", re.IGNORECASE)
+
+# Policy questions are FAQ's, whatever topic they name; about the employee's own record, the planner's
+_POLICY_RE   = re.compile(r"\b(polic(y|ies)|entitle(d|ments?)?|rules?|allowed|handbook)\b", re.IGNORECASE)
+_PERSONAL_RE = re.compile(r"\b(my|mine|me|i|i'm|i've)\b", re.IGNORECASE)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tier 2 — hashed n-gram nearest neighbour
+# ─────────────────────────────────────────────────────────────────────────────
+_TOKEN_RE   = re.compile(r"[a-z0-9']+")
+_HASH_DIM   = 1 << 18
+_STOPWORDS  = {"a", "an", "the", "my", "i", "me", "is", "are", "do", "does", "what",
+               "how", "can", "to", "of", "for", "in", "on", "and", "please", "you"}
+
+
+def embed(text: str) -> Dict[int, float]:
+    """L2-normalised sparse vector of hashed unigrams and bigrams."""
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+    grams  = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts = Counter(int(hashlib.md5(g.encode()).hexdigest()[:8], 16) % _HASH_DIM for g in grams)
+    norm   = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+class FastRouter:
+    """Rule table plus an optional k-NN classifier over logged single-agent plans."""
+
+    def __init__(self, agents: Iterable[str], rules: Dict[str, List[str]] = ROUTING_RULES,
+                 knn_k: int = 5, knn_threshold: float = 0.75, knn_agreement: float = 0.8):
+        self.agents        = set(agents)
+        self.rules         = {a: [re.compile(p, re.IGNORECASE) for p in pats]
+                              for a, pats in rules.items() if a in self.agents}
+        self.knn_k         = knn_k
+        self.knn_threshold = knn_threshold
+        self.knn_agreement = knn_agreement
+        self._vectors: List[Dict[int, float]] = []
+        self._labels:  List[str] = []
+        self._postings: Dict[int, List[int]] = defaultdict(list)
+        self.counters = {"rules": 0, "knn": 0, "planner": 0}
+
+    # ── Tier 1 ────────────────────────────────────────────────────────────────
+    def match_rules(self, query: str) -> Optional[str]:
+        matched = [agent for agent, patterns in self.rules.items()
+                   if any(p.search(query) for p in patterns)]
+        return matched[0] if len(matched) == 1 else None
+
+    # ── Tier 2 ────────────────────────────────────────────────────────────────
+    def train(self, examples: Iterable[Tuple[str, str]]) -> int:
+        """Add (query, agent) examples. Returns how many were accepted."""
+        added = 0
+        for query, agent in examples:
+            if agent not in self.agents or not query.strip():
+                continue
+            idx = len(self._vectors)
+            vec = embed(query)
+            self._vectors.append(vec)
+            self._labels.append(agent)
+            for dim in vec:
+                self._postings[dim].append(idx)
+            added += 1
+        return added
+
+    def match_knn(self, query: str) -> Optional[str]:
+        if not self._vectors:
+            return None
+        vec    = embed(query)
+        scores: Dict[int, float] = defaultdict(float)
+        for dim, weight in vec.items():
+            for idx in self._postings.get(dim, ()):
+                scores[idx] += weight * self._vectors[idx][dim]
+        if not scores:
+            return None
+        nearest = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:self.knn_k]
+        if nearest[0][1] < self.knn_threshold:
+            return None
+        votes = Counter(self._labels[idx] for idx, score in nearest if score >= self.knn_threshold)
+        agent, count = votes.most_common(1)[0]
+        return agent if count / sum(votes.values()) >= self.knn_agreement else None
+
+    async def train_from_history(self, db, limit: int = 5000) -> int:
+        """
+        Learn from coordinator chat_history: each user message followed by an
+        assistant message whose agent_used is a single agent is one example.
+        """
+        cursor = db.chat_history.find(
+            {"service": "coordinator", "flagged": False},
+            {"_id": 0, "conversation_id": 1, "role": 1, "message": 1, "agent_used": 1, "timestamp": 1},
+            sort=[("timestamp", -1)],
+        ).limit(limit)
+        docs = await cursor.to_list(length=limit)
+
+        by_conv: Dict[str, List[Dict]] = defaultdict(list)
+        for d in docs:
+            by_conv[d["conversation_id"]].append(d)
+
+        examples = []
+        for msgs in by_conv.values():
+            msgs.sort(key=lambda m: m["timestamp"])
+            for user, reply in zip(msgs, msgs[1:]):
+                if user["role"] == "user" and reply["role"] == "assistant" and reply.get("agent_used"):
+                    examples.append((user["message"], reply["agent_used"]))
+        added = self.train(examples)
+        logger.info(f"🧭 Fast router trained on {added} logged single-agent plans")
+        return added
+
+    # ── Entry point ───────────────────────────────────────────────────────────
+    def route(self, query: str) -> Optional[Tuple[str, str]]:
+        """Return (agent, tier) when a local tier is confident, else None."""
+        if _MULTI_STEP_RE.search(query):
+            self.counters["planner"] += 1
+            return None
+        if _POLICY_RE.search(query):
+            if _PERSONAL_RE.search(query) or "FAQ" not in self.agents:
+                self.counters["planner"] += 1
+                return None
+            self.counters["rules"] += 1
+            return "FAQ", "rules"
+        agent = self.match_rules(query)
+        if agent:
+            self.counters["rules"] += 1
+            return agent, "rules"
+        agent = self.match_knn(query)
+        if agent:
+            self.counters["knn"] += 1
+            return agent, "knn"
+        self.counters["planner"] += 1
+        return None
+
+    def stats(self) -> Dict:
+        total = sum(self.counters.values())
+        avoided = self.counters["rules"] + self.counters["knn"]
+        return {**self.counters, "knn_examples": len(self._vectors),
+                "planner_calls_avoided_rate": round(avoided / total, 3) if total else None}
@@ -1,18 +1,19 @@
 """
 Coordinator Agent - Multi-Step Plan-and-Execute Orchestrator
-Upgraded to true multi-step: plans a sequence of agent calls,
-executes each step, passes results as context to the next,
-then synthesises a unified final answer.
+Upgraded to true multi-step: plans a small dependency graph of agent calls,
+runs independent steps concurrently, passes results as context only to the
+steps that depend on them, then synthesises a unified final answer.
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, List, Any
-import sys, os, json, uuid, traceback
+from typing import Optional, Dict, List, Any, Tuple
+import sys, os, re, json, uuid, time, hashlib, asyncio, traceback
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 import httpx
 from datetime import datetime
 import uvicorn
@@ -20,7 +21,12 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 import redis.asyncio as aioredis
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from react_engine import build_react_system_prompt, REACT_INSTRUCTION, REEVAL_PROMPT, FINAL_ANSWER_MARKER
+from react_engine import (build_react_system_prompt, chat_completion, chat_completion_stream,
+                          sse_stream, parse_sse, SSE_HEADERS, REACT_INSTRUCTION,
+                          REEVAL_PROMPT, FINAL_ANSWER_MARKER, LLM_TIMEOUT_SECONDS)
+from mongo_indexes import ensure_indexes, index_report
+from chat_logger import ChatHistoryWriter
+from fast_router import FastRouter
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -32,7 +38,8 @@ app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
                    allow_methods=["*"], allow_headers=["*"])
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai_client  = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+openai_client  = (AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS)
+                  if OPENAI_API_KEY else None)
 
 FAQ_URL         = os.getenv("FAQ_SERVICE_URL",         "http://localhost:8002")
 PAYROLL_URL     = os.getenv("PAYROLL_SERVICE_URL",     "http://localhost:8003")
@@ -45,6 +52,24 @@ DB_NAME     = os.getenv("DB_NAME", "coordinator_db")
 REDIS_URL   = os.getenv("REDIS_URL", "redis://localhost:6379")
 SESSION_TTL = 3600
 
+# How to decide whether a dependent plan step is still needed: skip | heuristic | llm
+REEVAL_STRATEGY = os.getenv("REEVAL_STRATEGY", "heuristic").lower()
+
+# How to combine multi-step answers: template (LLM only for true merges) | llm
+SYNTHESIS_STRATEGY = os.getenv("SYNTHESIS_STRATEGY", "template").lower()
+SYNTHESIS_OVERLAP  = float(os.getenv("SYNTHESIS_OVERLAP", "0.35"))
+
+# Local routing tier ahead of the planner; k-NN tier learns from chat_history
+FAST_ROUTER_ENABLED   = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+FAST_ROUTER_KNN       = os.getenv("FAST_ROUTER_KNN", "true").lower() == "true"
+FAST_ROUTER_KNN_LIMIT = int(os.getenv("FAST_ROUTER_KNN_LIMIT", "5000"))
+
+# Redis plan cache — LLM planner output reused for repeated questions
+PLAN_CACHE_ENABLED     = os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+PLAN_CACHE_TTL         = int(os.getenv("PLAN_CACHE_TTL", "86400"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "10000"))
+PLAN_CACHE_LRU_KEY     = "plancache:lru"
+
 mongo_client  = None
 db            = None
 redis_client  = None
@@ -84,26 +109,31 @@ COORDINATOR_ESCALATION_RESPONSE = (
 # ─────────────────────────────────────────────
 # Helpers — MongoDB chat history (Level 1)
 # ─────────────────────────────────────────────
+chat_writer = ChatHistoryWriter()
+
 async def log_message(conv_id, role, message, employee_id=None,
                        agent_used=None, flagged=False):
     if db is None:
         return
-    try:
-        await db.chat_history.insert_one({
-            "conversation_id": conv_id, "service": "coordinator",
-            "employee_id": employee_id, "role": role,
-            "message": message, "agent_used": agent_used,
-            "flagged": flagged, "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.warning(f"⚠️ log_message failed: {str(e)}")
+    # Write-behind: the background writer batches these into insert_many
+    chat_writer.enqueue({
+        "conversation_id": conv_id, "service": "coordinator",
+        "employee_id": employee_id, "role": role,
+        "message": message, "agent_used": agent_used,
+        "flagged": flagged, "timestamp": datetime.now().isoformat()
+    })
 
 async def get_conversation_history(conv_id, limit=10):
     if db is None:
         return []
     try:
-        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", 1)]).limit(limit)
-        return await cursor.to_list(length=limit)
+        # Write-behind logging: make this conversation's queued messages readable first
+        await chat_writer.flush(conv_id)
+        # Newest `limit` messages via the (conversation_id, timestamp) index,
+        # then flipped back to chronological order for the prompt
+        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", -1)]).limit(limit)
+        recent = await cursor.to_list(length=limit)
+        return recent[::-1]
     except Exception as e:
         logger.warning(f"⚠️ get_history failed: {str(e)}")
         return []
@@ -137,6 +167,84 @@ async def save_session(employee_id, updates):
     except Exception as e:
         logger.warning(f"⚠️ Redis save failed: {str(e)}")
 
+# ─────────────────────────────────────────────
+# Helpers — Redis plan cache (Level 3)
+# ─────────────────────────────────────────────
+_NON_WORD_RE = re.compile(r"[^a-z0-9 ]+")
+
+plan_cache_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+
+def plan_cache_key(query: str, session: Dict) -> str:
+    """
+    Normalised query plus the session fields the planner actually sees
+    (last_service, only when the session hint would be shown).
+    """
+    normalised   = " ".join(_NON_WORD_RE.sub(" ", query.lower()).split())
+    last_service = session.get("last_service", "") if session.get("last_topic") else ""
+    digest       = hashlib.sha1(f"{normalised}|{last_service}".encode()).hexdigest()
+    return f"plancache:{digest}"
+
+def plan_cacheable(history: List[Dict]) -> bool:
+    """
+    The planner also sees the recent conversation, so a plan made with
+    history ("yes, go ahead", "what about last month?") is neither served
+    from nor stored in the cache — it would replay in other conversations.
+    """
+    if redis_client is None or not PLAN_CACHE_ENABLED:
+        return False
+    if history:
+        plan_cache_stats["bypassed"] += 1
+        return False
+    return True
+
+async def get_cached_plan(query: str, session: Dict, history: List[Dict]) -> Optional[List[Dict]]:
+    if not plan_cacheable(history):
+        return None
+    key = plan_cache_key(query, session)
+    try:
+        data = await redis_client.get(key)
+        if data is None:
+            plan_cache_stats["misses"] += 1
+            await redis_client.zrem(PLAN_CACHE_LRU_KEY, key)   # the key may have expired
+            return None
+        await redis_client.zadd(PLAN_CACHE_LRU_KEY, {key: time.time()})
+        plan_cache_stats["hits"] += 1
+        return normalise_plan(json.loads(data))
+    except Exception as e:
+        logger.warning(f"⚠️ Plan cache get failed: {str(e)}")
+        return None
+
+async def cache_plan(query: str, session: Dict, history: List[Dict], plan: List[Dict]):
+    """
+    Store a planner result with TTL; evict least-recently-used plans over the
+    cap. LRU members last used more than a TTL ago have certainly expired and
+    are dropped here; others whose key expired are dropped on their next miss.
+    """
+    if not plan_cacheable(history):
+        return
+    key = plan_cache_key(query, session)
+    now = time.time()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(key, PLAN_CACHE_TTL, json.dumps(plan))
+            pipe.zadd(PLAN_CACHE_LRU_KEY, {key: now})
+            pipe.zremrangebyscore(PLAN_CACHE_LRU_KEY, "-inf", now - PLAN_CACHE_TTL)
+            pipe.zcard(PLAN_CACHE_LRU_KEY)
+            *_, size = await pipe.execute()
+        plan_cache_stats["stores"] += 1
+        if size > PLAN_CACHE_MAX_ENTRIES:
+            evicted = await redis_client.zpopmin(PLAN_CACHE_LRU_KEY, size - PLAN_CACHE_MAX_ENTRIES)
+            if evicted:
+                await redis_client.delete(*[k for k, _ in evicted])
+                plan_cache_stats["evictions"] += len(evicted)
+    except Exception as e:
+        logger.warning(f"⚠️ Plan cache store failed: {str(e)}")
+
+def plan_cache_health() -> Dict:
+    lookups = plan_cache_stats["hits"] + plan_cache_stats["misses"]
+    return {**plan_cache_stats, "enabled": PLAN_CACHE_ENABLED,
+            "hit_rate": round(plan_cache_stats["hits"] / lookups, 3) if lookups else None}
+
 # ─────────────────────────────────────────────
 # Agent Callers
 # ─────────────────────────────────────────────
@@ -208,6 +316,52 @@ AGENT_DISPATCH = {
     "Performance": lambda q, eid, cid: call_performance_agent(q, eid, cid),
 }
 
+# Streaming endpoints of the same agents: (url, payload) per call
+AGENT_STREAM_ENDPOINTS = {
+    "FAQ":         lambda q, eid, cid: (f"{FAQ_URL}/api/faq/ask/stream",
+                                        {"question": q, "conversation_id": cid}),
+    "Payroll":     lambda q, eid, cid: (f"{PAYROLL_URL}/api/payroll/query/stream",
+                                        {"query": q, "employee_id": eid, "conversation_id": cid}),
+    "Leave":       lambda q, eid, cid: (f"{LEAVE_URL}/api/leave/query/stream",
+                                        {"query": q, "employee_id": eid, "conversation_id": cid}),
+    "Recruitment": lambda q, eid, cid: (f"{RECRUITMENT_URL}/api/recruitment/query/stream",
+                                        {"query": q, "conversation_id": cid}),
+    "Performance": lambda q, eid, cid: (f"{PERFORMANCE_URL}/api/performance/query/stream",
+                                        {"query": q, "employee_id": eid, "conversation_id": cid}),
+}
+
+async def stream_agent(agent_name: str, query: str, employee_id: str, conv_id: str, on_token) -> Dict:
+    """
+    Call an agent's SSE endpoint, forwarding its Final Answer tokens to
+    `on_token`. Returns the same shape as the call_*_agent helpers plus
+    "streamed". If nothing was streamed yet when the call fails (e.g. an
+    agent without the stream endpoint) the plain endpoint is used instead.
+    """
+    url, payload = AGENT_STREAM_ENDPOINTS[agent_name](query, employee_id, conv_id)
+    streamed = False
+    try:
+        async with http_client.stream("POST", url, json=payload) as resp:
+            resp.raise_for_status()
+            async for event, data in parse_sse(resp.aiter_lines()):
+                if event == "token":
+                    streamed = True
+                    await on_token(data["text"])
+                elif event == "done":
+                    return {"answer": data.get("answer", ""), "agent": agent_name,
+                            "tools_used": data.get("tools_used", []), "success": True,
+                            "streamed": streamed}
+                elif event == "error":
+                    raise RuntimeError(data.get("detail"))
+        raise RuntimeError("stream closed without a result")
+    except Exception as e:
+        logger.error(f"❌ {agent_name} Agent stream: {str(e)}")
+        if not streamed:
+            return await AGENT_DISPATCH[agent_name](query, employee_id, conv_id)
+        return {"answer": f"{agent_name} unavailable: {str(e)}", "agent": agent_name,
+                "tools_used": [], "success": False, "streamed": True}
+
+fast_router = FastRouter(AGENT_DISPATCH.keys())
+
 # ─────────────────────────────────────────────
 # Meta-Query Detection and Handler
 # ─────────────────────────────────────────────
@@ -234,7 +388,8 @@ async def handle_meta_query(query: str, history: List[Dict]) -> str:
     prompt = (f"Answer this question about the conversation using only the transcript:\n\n"
               f"Transcript:\n{transcript}\n\nQuestion: {query}")
     try:
-        resp   = openai_client.chat.completions.create(
+        resp   = await chat_completion(
+            openai_client,
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1, max_tokens=300
@@ -251,13 +406,42 @@ async def handle_meta_query(query: str, history: List[Dict]) -> str:
 # ─────────────────────────────────────────────
 # PLANNER — ReAct-style: explicit Thought before plan
 # ─────────────────────────────────────────────
-async def create_plan(query: str, session: Dict, history: List[Dict]) -> List[str]:
+def normalise_plan(raw_plan: List[Any]) -> List[Dict]:
+    """
+    Turn the planner's JSON into a validated dependency graph.
+
+    Accepts step objects ({"agent": ..., "depends_on": [...]}) or bare agent
+    names (independent steps). Unknown and duplicate agents are dropped, and a
+    step may only depend on agents listed before it, so the graph is acyclic
+    and plan order is always a valid execution order.
+    """
+    steps, seen = [], set()
+    for entry in raw_plan:
+        if isinstance(entry, str):
+            agent, deps = entry, []
+        elif isinstance(entry, dict):
+            agent, deps = entry.get("agent"), entry.get("depends_on") or []
+        else:
+            continue
+        if agent not in AGENT_DISPATCH or agent in seen:
+            continue
+        steps.append({"agent": agent,
+                      "depends_on": [d for d in deps if d in seen]})
+        seen.add(agent)
+    return steps
+
+
+def plan_agents(plan: List[Dict]) -> List[str]:
+    return [step["agent"] for step in plan]
+
+
+async def create_plan(query: str, session: Dict, history: List[Dict]) -> List[Dict]:
     """
     Uses a ReAct-style prompt to reason explicitly before producing a plan.
 
     The model outputs:
       Thought: <reasoning about the query and what agents are needed>
-      Plan: <JSON array>
+      Plan: <JSON array of {"agent", "depends_on"} steps>
 
     This makes the planning decision auditable and forces the model to
     justify its agent selection rather than pattern-matching silently.
@@ -295,18 +479,24 @@ Reasoning approach:
 1. Identify what INFORMATION the query needs → which agent knows that topic?
 2. Identify what ACTIONS the query needs → which agent can perform that action?
 3. If both are needed, include both agents (information agent first, then action agent)
-4. Maximum 3 agents. Later agents receive earlier agents' answers as context.
+4. Maximum 3 agents.
+5. Steps run in parallel unless they depend on each other. Give each step a
+   "depends_on" list naming the earlier agents whose answers it NEEDS as input
+   (typically an action step that needs a policy or balance first). Independent
+   information steps use an empty list.
 
 Follow this format EXACTLY:
 
 Thought: <What information is needed? What actions are needed? Which agents cover each?>
-Plan: <valid JSON array, e.g. ["FAQ", "Leave"]>
+Plan: <valid JSON array of steps, e.g.
+  [{{"agent": "FAQ", "depends_on": []}}, {{"agent": "Leave", "depends_on": ["FAQ"]}}]>
 
 User query: "{query}"
 """
 
     try:
-        resp = openai_client.chat.completions.create(
+        resp = await chat_completion(
+            openai_client,
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": planning_prompt}],
             temperature=0.0, max_tokens=200
@@ -325,118 +515,364 @@ User query: "{query}"
             plan_raw = raw
 
         plan  = json.loads(plan_raw)
-        valid = [a for a in plan if a in AGENT_DISPATCH]
+        valid = normalise_plan(plan)
         if not valid:
             logger.warning(f"⚠️ Plan contained no valid agents: {plan_raw}")
-            return ["FAQ"]
+            return normalise_plan(["FAQ"])
         logger.info(f"📋 Plan created: {valid}")
+        await cache_plan(query, session, history, valid)
         return valid
 
     except Exception as e:
         logger.error(f"❌ Planner failed: {str(e)} — defaulting to FAQ")
-        return ["FAQ"]
+        return normalise_plan(["FAQ"])
 
 
 # ─────────────────────────────────────────────
-# EXECUTOR — ReAct-style: re-evaluate after each step
+# EXECUTOR — dependency graph, independent steps run concurrently
 # ─────────────────────────────────────────────
+ACTION_AGENTS = {"Leave", "Recruitment", "Performance"}   # agents that can perform actions
+
+# Word stems of each agent's own topic (mirrors the planner's routing table).
+# Query terms matching a dependency's stems are that dependency's part of the
+# question; whatever is left is the sub-question of the step still to run.
+AGENT_TOPIC_STEMS = {
+    "FAQ":         ("polic", "handb", "benef", "offic", "proce", "entit", "rule"),
+    "Payroll":     ("salar", "paysl", "pay", "deduc", "cpf", "tax", "bonus", "wage"),
+    "Leave":       ("leave", "balan", "annua", "sick", "holid", "vacat", "day"),
+    "Recruitment": ("job", "openi", "hire", "hirin", "recru", "posit", "vacan", "candi"),
+    "Performance": ("goal", "kpi", "revie", "ratin", "objec", "perfo", "progr"),
+}
+
+_TERM_RE      = re.compile(r"[a-z][a-z0-9]{2,}")
+_QUERY_FILLER = {"what", "whats", "when", "where", "which", "does", "how", "many", "much", "can",
+                 "the", "and", "for", "are", "you", "our", "any", "its", "also", "then", "tell",
+                 "know", "need", "want", "get", "give", "show", "check", "there", "have", "has",
+                 "mine", "please", "about", "with", "this", "that", "will", "would", "could", "should"}
+
+
+def _query_terms(text: str) -> set:
+    """Stemmed (first five letters) content terms of a query or answer."""
+    return {w[:5] for w in _TERM_RE.findall(text.lower().replace("'", "")) if w not in _QUERY_FILLER}
+
+
+def uncovered_terms(original_query: str, dep_results: List[Dict]) -> set:
+    """
+    Query terms outside the dependencies' own topics that none of their
+    answers mention — the part of the question still unanswered.
+    """
+    dep_stems = tuple(stem for r in dep_results for stem in AGENT_TOPIC_STEMS.get(r["agent"], ()))
+    open_terms = {t for t in _query_terms(original_query) if not t.startswith(dep_stems)}
+    answered   = set().union(*(_query_terms(r.get("answer") or "") for r in dep_results))
+    return open_terms - answered
+
+reeval_metrics = {
+    "evaluations": {"skip": 0, "heuristic": 0, "llm": 0},
+    "short_circuits": {"skip": 0, "heuristic": 0, "llm": 0},
+    "llm_failures": 0,
+    "llm_total_ms": 0.0,
+}
+
+
+async def reeval_skip(original_query: str, dep_results: List[Dict],
+                      remaining: List[str], thoughts: List[str]) -> bool:
+    """Never short-circuit — always run the planned step."""
+    return False
+
+
+async def reeval_heuristic(original_query: str, dep_results: List[Dict],
+                           remaining: List[str], thoughts: List[str]) -> bool:
+    """
+    Local completeness check from signals we already have:
+      - a dependency failed               → CONTINUE (the answer is incomplete)
+      - a dependency answered without tools → CONTINUE (not grounded in data)
+      - a remaining step is an action      → CONTINUE (answers can't perform it)
+      - the query has terms outside the dependencies' topics that their
+        answers don't mention             → CONTINUE (that part is still open)
+      - otherwise the dependency answers already cover the remaining
+        information step's sub-question   → DONE
+    """
+    missing = uncovered_terms(original_query, dep_results)
+    if not all(r.get("success") for r in dep_results):
+        done, reason = False, "a dependency failed"
+    elif not all(r.get("tools_used") for r in dep_results):
+        done, reason = False, "dependency answer not grounded in tools"
+    elif any(agent in ACTION_AGENTS for agent in remaining):
+        done, reason = False, "remaining step is an action agent"
+    elif missing:
+        done, reason = False, f"dependency answers don't cover {sorted(missing)}"
+    else:
+        done, reason = True, "dependency answers already cover the question"
+    thoughts.append(f"Re-eval before {remaining}: {'DONE' if done else 'CONTINUE'} (heuristic — {reason})")
+    return done
+
+
+async def reeval_llm(original_query: str, dep_results: List[Dict],
+                     remaining: List[str], thoughts: List[str]) -> bool:
+    """Ask gpt-4o-mini whether the remaining steps still add value (one extra round-trip)."""
+    context = "".join(f"\n{r['agent']} Agent: {r['answer']}" for r in dep_results if r.get("answer"))
+    reeval_prompt = (
+        f"Original question: {original_query}\n\n"
+        f"Results so far:\n{context}\n\n"
+        f"Remaining planned steps: {remaining}\n\n"
+        f"Thought: Do I already have sufficient information to fully answer "
+        f"the original question? Or do the remaining steps add essential value?\n\n"
+        f"Reply with ONLY one of:\n"
+        f"  CONTINUE — remaining steps are needed\n"
+        f"  DONE — I already have enough information"
+    )
+    started = time.perf_counter()
+    try:
+        eval_resp = await chat_completion(
+            openai_client,
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": reeval_prompt}],
+            temperature=0.0, max_tokens=20
+        )
+        decision = eval_resp.choices[0].message.content.strip().upper()
+        thoughts.append(f"Re-eval before {remaining}: {decision}")
+        logger.info(f"🤔 Re-evaluation before {remaining}: {decision}")
+        return "DONE" in decision
+    except Exception as e:
+        reeval_metrics["llm_failures"] += 1
+        logger.warning(f"⚠️ Re-evaluation failed: {str(e)} — continuing plan")
+        return False
+    finally:
+        reeval_metrics["llm_total_ms"] += (time.perf_counter() - started) * 1000
+
+
+REEVAL_STRATEGIES = {
+    "skip":      reeval_skip,
+    "heuristic": reeval_heuristic,
+    "llm":       reeval_llm,
+}
+
+
+async def reevaluate_before_step(
+    original_query: str,
+    dep_results: List[Dict],
+    remaining: List[str],
+    thoughts: List[str],
+) -> bool:
+    """
+    ReAct re-evaluation ahead of a dependent step, using REEVAL_STRATEGY.
+    Returns True when the answers gathered so far already cover the
+    question (skip the step).
+    """
+    strategy = REEVAL_STRATEGY if REEVAL_STRATEGY in REEVAL_STRATEGIES else "skip"
+    done = await REEVAL_STRATEGIES[strategy](original_query, dep_results, remaining, thoughts)
+    reeval_metrics["evaluations"][strategy] += 1
+    if done:
+        reeval_metrics["short_circuits"][strategy] += 1
+    return done
+
+
+def reeval_stats() -> Dict:
+    """Per-strategy short-circuit rates — is the extra LLM round-trip paying off?"""
+    evaluations = reeval_metrics["evaluations"]
+    shorts      = reeval_metrics["short_circuits"]
+    llm_calls   = evaluations["llm"]
+    return {
+        "strategy": REEVAL_STRATEGY,
+        "evaluations": dict(evaluations),
+        "short_circuits": dict(shorts),
+        "short_circuit_rate": {k: round(shorts[k] / evaluations[k], 3) if evaluations[k] else None
+                               for k in evaluations},
+        "llm_failures": reeval_metrics["llm_failures"],
+        "llm_avg_ms": round(reeval_metrics["llm_total_ms"] / llm_calls, 1) if llm_calls else None,
+    }
+
+
 async def execute_plan(
-    plan: List[str],
+    plan: List[Dict],
     original_query: str,
     employee_id: str,
-    conv_id: str
+    conv_id: str,
+    on_token=None,
+    on_step=None,
 ) -> Dict:
     """
-    Execute each agent step sequentially with ReAct re-evaluation.
+    Execute the plan's dependency graph over the shared http_client.
 
-    After each step the coordinator asks itself:
-      "Do I now have enough information to answer the original question,
-       or does the next planned step still add value?"
-
-    This means the coordinator can short-circuit a multi-step plan if
-    an earlier step already provides a complete answer, avoiding
-    unnecessary downstream calls and token spend.
-    """
-    step_results       = []
-    all_tools          = []
-    cumulative_context = ""
-    thoughts           = []
+    Every step is started as a task immediately; a step first awaits only the
+    steps it depends on, so independent agents run concurrently and latency
+    follows the critical path instead of the sum of all steps.
 
-    for i, agent_name in enumerate(plan):
-        logger.info(f"▶️  Step {i+1}/{len(plan)}: calling {agent_name} agent")
+    A step with dependencies receives only its dependencies' answers as
+    context, and is preceded by a ReAct re-evaluation (see REEVAL_STRATEGY —
+    skip, local heuristic or an LLM call): if the answers so far
+    already cover the question the step (and anything depending on it) is
+    skipped, avoiding unnecessary downstream calls and token spend.
 
-        # Build enriched query with cumulative context from prior steps
-        if cumulative_context:
+    Streaming: `on_step(result)` is awaited as each step finishes, and for a
+    single-step plan — whose answer is the final answer — the agent is called
+    over SSE with its tokens forwarded to `on_token`.
+    """
+    thoughts: List[str] = []
+    tasks:    Dict[str, asyncio.Task] = {}
+
+    async def run_step(step: Dict) -> Optional[Dict]:
+        agent_name  = step["agent"]
+        dep_results = await asyncio.gather(*[tasks[d] for d in step["depends_on"]])
+        if any(r is None for r in dep_results):
+            logger.info(f"⏭️  Skipping {agent_name}: a dependency was skipped")
+            return None
+
+        context = "".join(f"\n{r['agent']} Agent: {r['answer']}"
+                          for r in dep_results if r.get("answer"))
+        if dep_results and await reevaluate_before_step(original_query, dep_results, [agent_name], thoughts):
+            logger.info(f"⚡ Short-circuiting plan — skipping {agent_name}")
+            return None
+        if context:
             enriched_query = (
                 f"{original_query}\n\n"
-                f"[Context from previous steps:\n{cumulative_context}]"
+                f"[Context from previous steps:\n{context}]"
             )
         else:
             enriched_query = original_query
 
-        dispatch = AGENT_DISPATCH.get(agent_name)
-        if not dispatch:
-            logger.error(f"❌ Unknown agent in plan: {agent_name}")
-            continue
-
-        result = await dispatch(enriched_query, employee_id, conv_id)
-        step_results.append(result)
-        all_tools.extend(result.get("tools_used", []))
-
-        if result.get("answer"):
-            cumulative_context += f"\n{agent_name} Agent: {result['answer']}"
-
-        logger.info(f"✅ Step {i+1} ({agent_name}) done: {result['answer'][:80]}...")
-
-        # ── ReAct re-evaluation after each step ──────────────────────────────
-        # Only bother if there are more steps remaining in the plan
-        remaining = plan[i+1:]
-        if remaining:
-            reeval_prompt = (
-                f"Original question: {original_query}\n\n"
-                f"Results so far:\n{cumulative_context}\n\n"
-                f"Remaining planned steps: {remaining}\n\n"
-                f"Thought: Do I already have sufficient information to fully answer "
-                f"the original question? Or do the remaining steps add essential value?\n\n"
-                f"Reply with ONLY one of:\n"
-                f"  CONTINUE — remaining steps are needed\n"
-                f"  DONE — I already have enough information"
-            )
-            try:
-                eval_resp = openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{"role": "user", "content": reeval_prompt}],
-                    temperature=0.0, max_tokens=20
-                )
-                decision = eval_resp.choices[0].message.content.strip().upper()
-                thoughts.append(f"Step {i+1} re-eval: {decision}")
-                logger.info(f"🤔 Re-evaluation after step {i+1}: {decision}")
-
-                if "DONE" in decision:
-                    logger.info(
-                        f"⚡ Short-circuiting plan at step {i+1} — "
-                        f"skipping {remaining}"
-                    )
-                    break   # goal already achieved — skip remaining agents
-
-            except Exception as e:
-                logger.warning(f"⚠️ Re-evaluation failed: {str(e)} — continuing plan")
-
+        logger.info(f"▶️  Calling {agent_name} agent (depends on {step['depends_on'] or 'nothing'})")
+        if on_token and len(plan) == 1:
+            result = await stream_agent(agent_name, enriched_query, employee_id, conv_id, on_token)
+        else:
+            result = await AGENT_DISPATCH[agent_name](enriched_query, employee_id, conv_id)
+        logger.info(f"✅ {agent_name} done: {result['answer'][:80]}...")
+        if on_step:
+            await on_step(result)
+        return result
+
+    for step in plan:
+        tasks[step["agent"]] = asyncio.create_task(run_step(step))
+    results = await asyncio.gather(*tasks.values())
+
+    step_results = [r for r in results if r is not None]
+    all_tools    = [t for r in step_results for t in r.get("tools_used", [])]
     return {"step_results": step_results, "all_tools": all_tools, "thoughts": thoughts}
 
 
 # ─────────────────────────────────────────────
-# SYNTHESISER — ReAct Final Answer format
+# SYNTHESISER — template merge, LLM only for true merges
 # ─────────────────────────────────────────────
-async def synthesise_results(original_query: str, step_results: List[Dict]) -> str:
+# Tools whose result is a performed action; such a step's answer is a
+# confirmation and never needs merging with the other answers.
+ACTION_TOOLS = {"submit_leave_request", "approve_leave_request", "approve_leave_requests",
+                "create_goal", "update_goal_progress", "create_job_posting", "escalate_to_hr"}
+
+SYNTHESIS_SECTION_TITLES = {
+    "FAQ":         "Policy",
+    "Payroll":     "Payroll",
+    "Leave":       "Leave",
+    "Recruitment": "Recruitment",
+    "Performance": "Performance",
+}
+
+_WORD_RE    = re.compile(r"[a-z][a-z0-9']{3,}")
+_STOP_WORDS = {"your", "have", "that", "this", "with", "will", "from", "please", "which",
+               "there", "their", "would", "could", "should", "about", "these", "those"}
+
+synthesis_metrics = {
+    "syntheses": {"single": 0, "template": 0, "llm": 0},
+    "llm_calls_avoided": 0,
+    "llm_failures": 0,
+    "llm_total_ms": 0.0,
+}
+
+
+def _content_words(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in _STOP_WORDS}
+
+
+def is_action_confirmation(result: Dict) -> bool:
+    return any(t in ACTION_TOOLS for t in result.get("tools_used", []))
+
+
+def choose_synthesis(step_results: List[Dict]) -> Tuple[str, str]:
     """
-    If only one step ran, return its answer directly.
-    If multiple steps ran, use a ReAct-style synthesis prompt that forces
-    explicit reasoning before the final answer.
+    Pick how to combine the step answers, from signals we already have:
+      - one step                              → single (its answer is final)
+      - a step failed                         → llm (gaps need explaining)
+      - at most one informational answer, the
+        rest are action confirmations         → template
+      - informational answers barely overlap
+        (word Jaccard < SYNTHESIS_OVERLAP)    → template (disjoint aspects)
+      - otherwise                             → llm (true merge)
+    Returns (method, reason). SYNTHESIS_STRATEGY=llm keeps every merge on the LLM.
     """
     if len(step_results) == 1:
-        return step_results[0].get("answer", "I was unable to generate a response.")
+        return "single", "one step ran"
+    if SYNTHESIS_STRATEGY == "llm":
+        return "llm", "SYNTHESIS_STRATEGY=llm"
+    if not all(r.get("success") and r.get("answer") for r in step_results):
+        return "llm", "a step failed"
+    informational = [r for r in step_results if not is_action_confirmation(r)]
+    if len(informational) <= 1:
+        return "template", "action confirmation alongside one answer"
+    words = [_content_words(r["answer"]) for r in informational]
+    overlap = max(
+        len(a & b) / len(a | b) if a | b else 0.0
+        for i, a in enumerate(words) for b in words[i + 1:]
+    )
+    if overlap < SYNTHESIS_OVERLAP:
+        return "template", f"answers cover disjoint aspects (overlap {overlap:.2f})"
+    return "llm", f"answers overlap (overlap {overlap:.2f})"
 
+
+def template_sections(step_results: List[Dict]) -> List[str]:
+    """One section per step, informational answers first, confirmations last."""
+    ordered = ([r for r in step_results if not is_action_confirmation(r)] +
+               [r for r in step_results if is_action_confirmation(r)])
+    return [f"**{SYNTHESIS_SECTION_TITLES.get(r['agent'], r['agent'])}**\n{r['answer'].strip()}"
+            for r in ordered]
+
+
+async def synthesise_results(
+    original_query: str,
+    step_results: List[Dict],
+    thoughts: Optional[List[str]] = None,
+    on_token=None,
+) -> Tuple[str, str]:
+    """
+    Combine the step answers into the final answer; returns (answer, method).
+
+    choose_synthesis() decides between passing a single answer through,
+    a deterministic template merge (disjoint aspects, action confirmations)
+    and a ReAct-style LLM synthesis for true merges. With `on_token` the
+    template is streamed section by section, and the LLM synthesis call is
+    streamed with its Final Answer forwarded as produced.
+    """
+    method, reason = choose_synthesis(step_results)
+    synthesis_metrics["syntheses"][method] += 1
+    if thoughts is not None:
+        thoughts.append(f"Synthesis: {method} ({reason})")
+    logger.info(f"🧩 Synthesis: {method} — {reason}")
+
+    if method == "single":
+        answer = step_results[0].get("answer", "I was unable to generate a response.")
+        if on_token and not step_results[0].get("streamed"):
+            await on_token(answer)   # e.g. a multi-step plan short-circuited to one step
+        return answer, method
+
+    if method == "template":
+        synthesis_metrics["llm_calls_avoided"] += 1
+        sections = template_sections(step_results)
+        if on_token:
+            for i, section in enumerate(sections):
+                await on_token(section if i == 0 else "\n\n" + section)
+        return "\n\n".join(sections), method
+
+    started = time.perf_counter()
+    try:
+        return await synthesise_with_llm(original_query, step_results, on_token), method
+    except Exception as e:
+        synthesis_metrics["llm_failures"] += 1
+        logger.error(f"❌ Synthesis failed: {str(e)}")
+        return "\n\n".join([f"**{r['agent']}:** {r['answer']}" for r in step_results]), method
+    finally:
+        synthesis_metrics["llm_total_ms"] += (time.perf_counter() - started) * 1000
+
+
+async def synthesise_with_llm(original_query: str, step_results: List[Dict], on_token=None) -> str:
+    """ReAct-style synthesis prompt that forces explicit reasoning before the final answer."""
     results_text = "\n\n".join([
         f"--- {r['agent']} Agent ---\n{r['answer']}"
         for r in step_results if r.get("answer")
@@ -456,29 +892,40 @@ async def synthesise_results(original_query: str, step_results: List[Dict]) -> s
         f"Now produce your Thought and Final Answer:"
     )
 
-    try:
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": synthesis_prompt}],
-            temperature=0.2, max_tokens=800
-        )
-        raw = resp.choices[0].message.content.strip()
+    request = dict(model="gpt-4o-mini", messages=[{"role": "user", "content": synthesis_prompt}],
+                   temperature=0.2, max_tokens=800)
+    if on_token:
+        resp = await chat_completion_stream(openai_client, on_token, **request)
+    else:
+        resp = await chat_completion(openai_client, **request)
+    raw = resp.choices[0].message.content.strip()
 
-        # Log the synthesis Thought
-        if "Thought:" in raw:
-            thought = raw.split("Thought:")[1].split("Final Answer:")[0].strip()
-            logger.info(f"💭 Synthesis Thought: {thought[:150]}")
+    # Log the synthesis Thought
+    if "Thought:" in raw:
+        thought = raw.split("Thought:")[1].split("Final Answer:")[0].strip()
+        logger.info(f"💭 Synthesis Thought: {thought[:150]}")
 
-        # Extract Final Answer
-        if FINAL_ANSWER_MARKER in raw:
-            return raw.split(FINAL_ANSWER_MARKER, 1)[-1].strip()
+    # Extract Final Answer
+    if FINAL_ANSWER_MARKER in raw:
+        return raw.split(FINAL_ANSWER_MARKER, 1)[-1].strip()
 
-        # Fallback — model responded without the marker
-        return raw.strip()
+    # Fallback — model responded without the marker
+    return raw.strip()
 
-    except Exception as e:
-        logger.error(f"❌ Synthesis failed: {str(e)}")
-        return "\n\n".join([f"**{r['agent']}:** {r['answer']}" for r in step_results])
+
+
+def synthesis_stats() -> Dict:
+    """How often the synthesis LLM call was avoided, and what the remaining calls cost."""
+    syntheses = synthesis_metrics["syntheses"]
+    merges    = syntheses["template"] + syntheses["llm"]
+    return {
+        "strategy": SYNTHESIS_STRATEGY,
+        "syntheses": dict(syntheses),
+        "llm_calls_avoided": synthesis_metrics["llm_calls_avoided"],
+        "avoided_rate": round(synthesis_metrics["llm_calls_avoided"] / merges, 3) if merges else None,
+        "llm_failures": synthesis_metrics["llm_failures"],
+        "llm_avg_ms": round(synthesis_metrics["llm_total_ms"] / syntheses["llm"], 1) if syntheses["llm"] else None,
+    }
 
 # ─────────────────────────────────────────────
 # Startup / Shutdown
@@ -493,8 +940,15 @@ async def startup_event():
         db = mongo_client[DB_NAME]
         await mongo_client.admin.command("ping")
         logger.info("✅ MongoDB connected")
+        await ensure_indexes(db, "coordinator")
+        chat_writer.start(db.chat_history)
     except Exception as e:
         logger.error(f"❌ MongoDB failed: {str(e)}")
+    if FAST_ROUTER_ENABLED and FAST_ROUTER_KNN and db is not None:
+        try:
+            await fast_router.train_from_history(db, limit=FAST_ROUTER_KNN_LIMIT)
+        except Exception as e:
+            logger.warning(f"⚠️ Fast router k-NN training skipped: {str(e)}")
     try:
         redis_client = await aioredis.from_url(REDIS_URL, decode_responses=True)
         await redis_client.ping()
@@ -505,6 +959,9 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     await http_client.aclose()
+    if openai_client:
+        await openai_client.close()
+    await chat_writer.stop()
     if mongo_client:
         mongo_client.close()
     if redis_client:
@@ -533,16 +990,95 @@ async def health_check():
         "mode": "react-plan-and-execute",
         "openai_status": "configured" if OPENAI_API_KEY else "missing",
         "mongodb_status": mongo_status, "redis_status": redis_status,
+        "reeval": reeval_stats(),
+        "synthesis": synthesis_stats(),
+        "routing": fast_router.stats(),
+        "plan_cache": plan_cache_health(),
+        "chat_logger": chat_writer.stats(),
+        "streaming": stream_stats(),
         "agents": {k: url for k, url in [("faq", FAQ_URL), ("payroll", PAYROLL_URL),
                                            ("leave", LEAVE_URL), ("recruitment", RECRUITMENT_URL),
                                            ("performance", PERFORMANCE_URL)]}
     }
 
+# ─────────────────────────────────────────────
+# Streaming — time-to-first-byte metrics
+# ttfb_ms is the first content event (plan/step/token); the `start` ack is
+# sent before any work and would always read ~0.
+# ─────────────────────────────────────────────
+stream_metrics = {"streams": 0, "ttfb_streams": 0, "ttfb_ms_total": 0.0,
+                  "first_token_streams": 0, "first_token_ms_total": 0.0}
+
+def record_stream_timings(timings: Dict):
+    stream_metrics["streams"] += 1
+    if "ttfb_ms" in timings:
+        stream_metrics["ttfb_streams"]  += 1
+        stream_metrics["ttfb_ms_total"] += timings["ttfb_ms"]
+    if "first_token_ms" in timings:
+        stream_metrics["first_token_streams"]  += 1
+        stream_metrics["first_token_ms_total"] += timings["first_token_ms"]
+
+def stream_stats() -> Dict:
+    streams, token_streams = stream_metrics["streams"], stream_metrics["first_token_streams"]
+    ttfb_streams = stream_metrics["ttfb_streams"]
+    return {
+        "streams": streams,
+        "avg_ttfb_ms": round(stream_metrics["ttfb_ms_total"] / ttfb_streams, 1) if ttfb_streams else None,
+        "avg_first_token_ms": (round(stream_metrics["first_token_ms_total"] / token_streams, 1)
+                               if token_streams else None),
+    }
+
 # ─────────────────────────────────────────────
 # Main Endpoint — Plan-and-Execute
 # ─────────────────────────────────────────────
 @app.post("/api/coordinator/ask", response_model=CoordinatorResponse)
 async def ask_coordinator(request: CoordinatorRequest):
+    return await run_coordinator(request)
+
+@app.post("/api/coordinator/ask/stream")
+async def ask_coordinator_stream(request: CoordinatorRequest):
+    """
+    Server-Sent Events variant of /api/coordinator/ask. Events, in order:
+      start  — conversation_id, sent immediately
+      plan   — planned steps, dependency graph and routing tier
+      step   — one per agent step as it finishes
+      token  — Final Answer text as it is generated
+      done   — the full CoordinatorResponse (metadata.stream holds timings)
+      error  — status_code and detail, instead of done
+    A client that shows `token` text and then replaces it with done.answer
+    always ends with the same answer as the non-streaming endpoint.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    request.conversation_id = request.conversation_id or str(uuid.uuid4())
+
+    async def run(emit):
+        async def timed_emit(event, data):
+            elapsed = round((time.perf_counter() - started) * 1000, 1)
+            if event != "start":
+                timings.setdefault("ttfb_ms", elapsed)
+            if event == "token":
+                timings.setdefault("first_token_ms", elapsed)
+            await emit(event, data)
+
+        await timed_emit("start", {"conversation_id": request.conversation_id})
+        response = await run_coordinator(request, emit=timed_emit)
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        record_stream_timings(timings)
+        logger.info(f"📡 Stream complete: {timings}")
+        response.metadata = {**(response.metadata or {}), "stream": dict(timings)}
+        return response
+
+    return StreamingResponse(sse_stream(run), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def run_coordinator(request: CoordinatorRequest, emit=None) -> CoordinatorResponse:
+    """
+    The plan → execute → synthesise pipeline behind both ask endpoints.
+    `emit(event, data)` is only passed by the streaming endpoint.
+    """
+    on_token = (lambda text: emit("token", {"text": text})) if emit else None
+    on_step  = (lambda r: emit("step", {"agent": r["agent"], "success": r.get("success", False),
+                                        "tools_used": r.get("tools_used", [])})) if emit else None
     try:
         logger.info(f"📥 Coordinator received: {request.query}")
         conv_id     = request.conversation_id or str(uuid.uuid4())
@@ -580,12 +1116,24 @@ async def ask_coordinator(request: CoordinatorRequest):
                 metadata={"routing_method": "meta_query"}
             )
 
-        # ── PLAN — decide which agents to call and in what order ──────────────
-        plan = await create_plan(request.query, session, history)
+        # ── PLAN — local fast path, then Redis plan cache, then LLM planner ───
+        routed = fast_router.route(request.query) if FAST_ROUTER_ENABLED else None
+        if routed:
+            agent, routing_tier = routed
+            plan = normalise_plan([agent])
+            logger.info(f"⚡ Fast-path routed to {agent} ({routing_tier}) — planner skipped")
+        else:
+            plan = await get_cached_plan(request.query, session, history)
+            routing_tier = "cache" if plan else "planner"
+            if not plan:
+                plan = await create_plan(request.query, session, history)
         logger.info(f"📋 Execution plan: {plan}")
+        if emit:
+            await emit("plan", {"steps": plan_agents(plan), "graph": plan, "routing_tier": routing_tier})
 
-        # ── EXECUTE — run each step with ReAct re-evaluation between steps ─────
-        execution    = await execute_plan(plan, request.query, employee_id, conv_id)
+        # ── EXECUTE — independent steps concurrently, re-evaluate before dependent ones
+        execution    = await execute_plan(plan, request.query, employee_id, conv_id,
+                                          on_token=on_token, on_step=on_step)
         step_results = execution["step_results"]
         all_tools    = execution["all_tools"]
         plan_thoughts= execution.get("thoughts", [])
@@ -593,8 +1141,9 @@ async def ask_coordinator(request: CoordinatorRequest):
         if not step_results or not any(r.get("success") for r in step_results):
             raise HTTPException(status_code=500, detail="All agent steps failed")
 
-        # ── SYNTHESISE — ReAct Thought + Final Answer format ───────────────────
-        final_answer = await synthesise_results(request.query, step_results)
+        # ── SYNTHESISE — template merge, ReAct LLM synthesis only for true merges
+        final_answer, synthesis = await synthesise_results(request.query, step_results,
+                                                           thoughts=plan_thoughts, on_token=on_token)
         agents_used  = [r["agent"] for r in step_results]
         agent_label  = " + ".join(agents_used)
 
@@ -625,9 +1174,13 @@ async def ask_coordinator(request: CoordinatorRequest):
             thoughts=all_thoughts,
             metadata={
                 "routing_method":  "react_plan_and_execute",
-                "planned_steps":   plan,
+                "routing_tier":    routing_tier,
+                "planned_steps":   plan_agents(plan),
+                "plan_graph":      plan,
                 "executed_steps":  len(step_results),
                 "short_circuited": len(plan) > len(step_results),
+                "reeval_strategy": REEVAL_STRATEGY,
+                "synthesis":       synthesis,
                 "timestamp":       datetime.now().isoformat(),
                 "employee_id":     employee_id,
                 "history_used":    len(history),
@@ -654,13 +1207,14 @@ async def list_agents():
             {"name": "Recruitment", "url": RECRUITMENT_URL, "description": "Job openings and hiring"},
             {"name": "Performance", "url": PERFORMANCE_URL, "description": "Goals, KPIs, reviews"},
         ],
-        "routing_strategy": "ReAct plan-and-execute: Thought → Plan → Execute (with re-evaluation) → Synthesise (Final Answer)"
+        "routing_strategy": "ReAct plan-and-execute: Thought → Plan (dependency graph) → Execute (independent steps concurrently, re-evaluation before dependent steps) → Synthesise (Final Answer)"
     }
 
 @app.get("/api/coordinator/history/chat")
 async def get_chat_history(employee_id: str, limit: int = 50):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush()
     cursor = db.chat_history.find(
         {"employee_id": employee_id, "service": "coordinator"}, sort=[("timestamp", -1)]
     ).limit(limit)
@@ -675,6 +1229,7 @@ async def get_chat_history(employee_id: str, limit: int = 50):
 async def get_conversation(conversation_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush(conversation_id)
     cursor = db.chat_history.find({"conversation_id": conversation_id}, sort=[("timestamp", 1)])
     messages = await cursor.to_list(length=200)
     def ser(d):
@@ -690,5 +1245,11 @@ async def get_employee_session(employee_id: str):
         return {"employee_id": employee_id, "session": None, "message": "No active session"}
     return {"employee_id": employee_id, "session": session}
 
+@app.get("/api/coordinator/admin/indexes")
+async def get_index_report():
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await index_report(db, "coordinator")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8007)))
\ No newline at end of file
@@ -66,3 +66,744 @@ def test_openai_configuration():
     data = response.json()
     # In tests, we might not have OpenAI configured
     assert "openai_status" in data
+
+
+# ─────────────────────────────────────────────
+# ReAct engine — async LLM client
+# ─────────────────────────────────────────────
+import asyncio
+from types import SimpleNamespace
+from react_engine import chat_completion, run_react_loop
+
+
+def _fake_response(content, tool_calls=None):
+    msg = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+
+def _fake_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_supports_sync_and_async_clients():
+    async def async_create(**kwargs):
+        return _fake_response("async")
+
+    def sync_create(**kwargs):
+        return _fake_response("sync")
+
+    resp = await chat_completion(_fake_client(async_create), model="gpt-4o-mini", messages=[])
+    assert resp.choices[0].message.content == "async"
+    resp = await chat_completion(_fake_client(sync_create), model="gpt-4o-mini", messages=[])
+    assert resp.choices[0].message.content == "sync"
+
+
+@pytest.mark.asyncio
+async def test_react_loop_times_out_slow_completion():
+    async def slow_create(**kwargs):
+        await asyncio.sleep(5)
+        return _fake_response("Final Answer: too late")
+
+    async def no_tools(name, args):
+        return "{}"
+
+    result = await run_react_loop(
+        openai_client=_fake_client(slow_create),
+        messages=[{"role": "user", "content": "hi"}],
+        tools=[], tool_executor=no_tools, service_name="Test", timeout=0.05,
+    )
+    assert "too long" in result["answer"]
+    assert result["iterations"] == 1
+
+
+def _tool_call(call_id, name, args="{}"):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=args))
+
+
+@pytest.mark.asyncio
+async def test_react_loop_runs_read_tools_concurrently_and_writes_alone():
+    replies = iter([
+        _fake_response("Thought: need data.", tool_calls=[
+            _tool_call("c1", "read_slow"), _tool_call("c2", "read_fast"),
+            _tool_call("c3", "write"),     _tool_call("c4", "read_fast"),
+        ]),
+        _fake_response("Final Answer: done"),
+    ])
+
+    async def create(**kwargs):
+        return next(replies)
+
+    in_flight, peak, events = 0, 0, []
+
+    async def executor(name, args):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        if name == "write":
+            events.append(("write", in_flight))
+        await asyncio.sleep(0.05 if name == "read_slow" else 0.01)
+        in_flight -= 1
+        return name
+
+    messages = [{"role": "user", "content": "hi"}]
+    result = await run_react_loop(
+        openai_client=_fake_client(create), messages=messages, tools=[],
+        tool_executor=executor, service_name="Test", mutating_tools={"write"},
+    )
+    tool_msgs = [m for m in messages if isinstance(m, dict) and m.get("role") == "tool"]
+    assert [m["tool_call_id"] for m in tool_msgs] == ["c1", "c2", "c3", "c4"]
+    assert [m["content"] for m in tool_msgs] == ["read_slow", "read_fast", "write", "read_fast"]
+    assert result["tools_used"] == ["read_slow", "read_fast", "write", "read_fast"]
+    assert peak == 2
+    assert events == [("write", 1)]
+
+
+import json
+from react_engine import fit_to_budget, compact_observation, estimate_tokens, REEVAL_PROMPT
+
+
+def test_compact_observation_keeps_leading_json_items():
+    jobs = [{"id": i, "title": f"Engineer {i}", "description": "x" * 200} for i in range(50)]
+    compacted = json.loads(compact_observation(json.dumps({"total": 50, "jobs": jobs}), 400))
+    assert 0 < len(compacted["jobs"]) < 50
+    assert compacted["jobs"][0] == jobs[0]
+    assert compacted["_omitted_jobs"] == 50 - len(compacted["jobs"])
+    assert compacted["total"] == 50
+    text = compact_observation("y" * 4000, 100)
+    assert text.startswith("y" * 300) and "omitted" in text
+    assert estimate_tokens(text) <= 100
+
+
+def test_fit_to_budget_dedupes_reeval_and_compacts_oldest_first():
+    big = json.dumps([{"goal": "g" * 100} for _ in range(100)])
+    messages = [
+        {"role": "system", "content": "S" * 400},
+        {"role": "user", "content": "hi"},
+        {"role": "tool", "tool_call_id": "c1", "content": big},
+        {"role": "user", "content": REEVAL_PROMPT},
+        {"role": "tool", "tool_call_id": "c2", "content": "small"},
+        {"role": "user", "content": REEVAL_PROMPT},
+    ]
+    window, tokens = fit_to_budget(messages, budget=1500)
+    assert [m["content"] for m in window].count(REEVAL_PROMPT) == 1
+    assert window[-1]["content"] == REEVAL_PROMPT
+    assert window[0] is messages[0]
+    assert [m.get("tool_call_id") for m in window if m["role"] == "tool"] == ["c1", "c2"]
+    assert estimate_tokens(window[2]["content"]) < estimate_tokens(big)
+    assert window[3]["content"] == "small"
+    assert tokens <= 1500
+    assert messages[2]["content"] == big
+
+
+@pytest.mark.asyncio
+async def test_react_loop_reports_token_usage_per_iteration():
+    replies = iter([
+        _fake_response("Thought: look it up.", tool_calls=[_tool_call("c1", "lookup")]),
+        _fake_response("Final Answer: done"),
+    ])
+    sent = []
+
+    async def create(**kwargs):
+        sent.append(kwargs["messages"])
+        resp = next(replies)
+        resp.usage = SimpleNamespace(prompt_tokens=100 * len(sent), completion_tokens=20)
+        return resp
+
+    async def executor(name, args):
+        return "x" * 8000
+
+    result = await run_react_loop(
+        openai_client=_fake_client(create), messages=[{"role": "user", "content": "hi"}], tools=[],
+        tool_executor=executor, service_name="Test", prompt_budget=600,
+    )
+    assert [u["prompt_tokens"] for u in result["token_usage"]] == [100, 200]
+    assert all(u["completion_tokens"] == 20 for u in result["token_usage"])
+    assert result["token_usage"][1]["estimated_prompt"] <= 600
+    assert len(sent[1][2]["content"]) < 8000
+
+
+from react_engine import ToolResultCache, SharedToolCache
+
+
+@pytest.mark.asyncio
+async def test_tool_cache_memoizes_reads_and_invalidates_on_write():
+    calls = []
+
+    async def executor(name, args):
+        calls.append((name, args.get("employee_id")))
+        await asyncio.sleep(0.01)
+        return '{"error": "nope"}' if name == "broken" else f"{name}:{args}"
+
+    memo = ToolResultCache(executor, "Leave", {"submit_leave_request", "approve_leave_request"})
+    first, second = await asyncio.gather(memo("get_leave_balance", {"employee_id": "E1"}),
+                                         memo("get_leave_balance", {"employee_id": "E1"}))
+    assert first == second and calls.count(("get_leave_balance", "E1")) == 1
+    await memo("get_leave_balance", {"employee_id": "E2"})
+    await memo("submit_leave_request", {"employee_id": "E2", "days": 2})
+    await memo("get_leave_balance", {"employee_id": "E1"})     # other employee: still cached
+    await memo("get_leave_balance", {"employee_id": "E2"})     # written: fetched again
+    assert calls.count(("get_leave_balance", "E1")) == 1
+    assert calls.count(("get_leave_balance", "E2")) == 2
+    await memo("approve_leave_request", {"request_id": "LR-1"})  # unknown employee: drop all
+    await memo("get_leave_balance", {"employee_id": "E1"})
+    assert calls.count(("get_leave_balance", "E1")) == 2
+    await memo("broken", {})
+    await memo("broken", {})
+    assert calls.count(("broken", None)) == 2
+
+    shared = SharedToolCache(ttl=60, max_entries=10)
+    for _ in range(2):
+        await ToolResultCache(executor, "Payroll", (), shared)("get_employee_info", {"employee_id": "E1"})
+    assert calls.count(("get_employee_info", "E1")) == 1
+    assert shared.stats()["hits"] == 1
+
+
+# ─────────────────────────────────────────────
+# Plan dependency graph + concurrent executor
+# ─────────────────────────────────────────────
+import time
+import src.main as coordinator
+
+
+def test_normalise_plan_builds_acyclic_graph():
+    plan = coordinator.normalise_plan([
+        {"agent": "Leave", "depends_on": ["FAQ"]},   # FAQ not yet seen → dropped
+        "Payroll",
+        {"agent": "Nope"},
+        {"agent": "FAQ", "depends_on": ["Leave", "Payroll"]},
+        "Leave",                                     # duplicate
+    ])
+    assert plan == [
+        {"agent": "Leave",   "depends_on": []},
+        {"agent": "Payroll", "depends_on": []},
+        {"agent": "FAQ",     "depends_on": ["Leave", "Payroll"]},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_execute_plan_runs_independent_steps_concurrently(monkeypatch):
+    queries = {}
+
+    def fake_agent(name):
+        async def call(q, eid, cid):
+            queries[name] = q
+            await asyncio.sleep(0.1)
+            return {"answer": f"{name} answer", "agent": name, "tools_used": [name.lower()], "success": True}
+        return lambda q, eid, cid: call(q, eid, cid)
+
+    async def never_done(*args):
+        return False
+
+    monkeypatch.setattr(coordinator, "AGENT_DISPATCH",
+                        {n: fake_agent(n) for n in ["FAQ", "Payroll", "Leave"]})
+    monkeypatch.setattr(coordinator, "reevaluate_before_step", never_done)
+
+    plan = coordinator.normalise_plan([
+        {"agent": "Leave"}, {"agent": "Payroll"},
+        {"agent": "FAQ", "depends_on": ["Leave"]},
+    ])
+    start = time.perf_counter()
+    execution = await coordinator.execute_plan(plan, "balance and payslip?", "EMP000001", "c1")
+    elapsed = time.perf_counter() - start
+
+    assert [r["agent"] for r in execution["step_results"]] == ["Leave", "Payroll", "FAQ"]
+    assert execution["all_tools"] == ["leave", "payroll", "faq"]
+    assert elapsed < 0.28                          # critical path (2 steps), not the sum (3)
+    assert queries["Payroll"] == "balance and payslip?"
+    assert "Leave Agent: Leave answer" in queries["FAQ"]
+    assert "Payroll" not in queries["FAQ"]
+
+
+# ─────────────────────────────────────────────
+# Re-evaluation strategies
+# ─────────────────────────────────────────────
+def _step(agent, success=True, tools=("tool",)):
+    return {"agent": agent, "answer": f"{agent} answer", "success": success, "tools_used": list(tools)}
+
+
+CARRY_QUERY    = "How many leave days do I have, and can unused days be carried forward?"
+CARRY_ANSWER   = "You have 12 annual leave days remaining. Up to 5 unused days can be carried forward."
+POLICY_QUERY   = "What's my leave balance and what's the WFH policy?"
+BALANCE_ANSWER = "You have 12 annual leave days remaining."
+
+
+def _leave_step(answer, success=True, tools=("get_leave_balance",)):
+    return _step("Leave", success, tools) | {"answer": answer}
+
+
+@pytest.mark.asyncio
+async def test_heuristic_reeval_decisions():
+    """Dependency shapes a real plan produces: Leave → FAQ, Leave → Performance"""
+    thoughts = []
+    heuristic = coordinator.reeval_heuristic
+    assert await heuristic(CARRY_QUERY, [_leave_step(CARRY_ANSWER)], ["FAQ"], thoughts) is True
+    assert await heuristic(POLICY_QUERY, [_leave_step(BALANCE_ANSWER)], ["FAQ"], thoughts) is False
+    assert "wfh" in thoughts[-1] and "polic" in thoughts[-1]
+    assert await heuristic(CARRY_QUERY, [_leave_step(CARRY_ANSWER, success=False)], ["FAQ"], thoughts) is False
+    assert await heuristic(CARRY_QUERY, [_leave_step(CARRY_ANSWER, tools=())], ["FAQ"], thoughts) is False
+    assert await heuristic(CARRY_QUERY, [_leave_step(CARRY_ANSWER)], ["Performance"], thoughts) is False
+    assert len(thoughts) == 5
+
+
+@pytest.mark.asyncio
+async def test_heuristic_short_circuits_only_covered_steps_in_execute_plan(monkeypatch):
+    calls = []
+
+    def fake_agent(name, answer):
+        async def call(q, eid, cid):
+            calls.append(name)
+            return {"answer": answer, "agent": name, "tools_used": [name.lower()], "success": True}
+        return call
+
+    monkeypatch.setattr(coordinator, "REEVAL_STRATEGY", "heuristic")
+    plan = coordinator.normalise_plan([{"agent": "Leave"}, {"agent": "FAQ", "depends_on": ["Leave"]}])
+
+    monkeypatch.setattr(coordinator, "AGENT_DISPATCH",
+                        {"Leave": fake_agent("Leave", CARRY_ANSWER), "FAQ": fake_agent("FAQ", "Policy")})
+    execution = await coordinator.execute_plan(plan, CARRY_QUERY, "EMP000001", "c1")
+    assert calls == ["Leave"] and [r["agent"] for r in execution["step_results"]] == ["Leave"]
+
+    calls.clear()
+    monkeypatch.setattr(coordinator, "AGENT_DISPATCH",
+                        {"Leave": fake_agent("Leave", BALANCE_ANSWER), "FAQ": fake_agent("FAQ", "WFH policy")})
+    execution = await coordinator.execute_plan(plan, POLICY_QUERY, "EMP000001", "c1")
+    assert calls == ["Leave", "FAQ"]
+
+
+@pytest.mark.asyncio
+async def test_skip_reeval_strategy_always_runs_planned_steps(monkeypatch):
+    monkeypatch.setattr(coordinator, "REEVAL_STRATEGY", "skip")
+    assert await coordinator.reevaluate_before_step(CARRY_QUERY, [_leave_step(CARRY_ANSWER)], ["FAQ"], []) is False
+
+
+@pytest.mark.asyncio
+async def test_reeval_metrics_count_short_circuits(monkeypatch):
+    monkeypatch.setattr(coordinator, "REEVAL_STRATEGY", "heuristic")
+    before = coordinator.reeval_metrics["short_circuits"]["heuristic"]
+    assert await coordinator.reevaluate_before_step(CARRY_QUERY, [_leave_step(CARRY_ANSWER)], ["FAQ"], [])
+    assert coordinator.reeval_metrics["short_circuits"]["heuristic"] == before + 1
+    assert "reeval" in client.get("/health").json()
+
+
+# ─────────────────────────────────────────────
+# Synthesis strategies
+# ─────────────────────────────────────────────
+@pytest.mark.asyncio
+async def test_template_synthesis_skips_llm_for_disjoint_answers(monkeypatch):
+    async def no_llm(*args, **kwargs):
+        raise AssertionError("synthesis LLM should not be called")
+
+    monkeypatch.setattr(coordinator, "SYNTHESIS_STRATEGY", "template")
+    monkeypatch.setattr(coordinator, "synthesise_with_llm", no_llm)
+    policy  = {"agent": "FAQ", "answer": "Annual leave needs two weeks notice.", "success": True,
+               "tools_used": ["search_faq"]}
+    confirm = {"agent": "Leave", "answer": "Submitted LR-42 for 3 days.", "success": True,
+               "tools_used": ["submit_leave_request"]}
+    before = coordinator.synthesis_metrics["llm_calls_avoided"]
+    tokens, thoughts = [], []
+
+    async def on_token(text):
+        tokens.append(text)
+
+    answer, method = await coordinator.synthesise_results("q", [confirm, policy], thoughts, on_token)
+    assert method == "template"
+    assert answer.index("two weeks notice") < answer.index("LR-42")
+    assert "".join(tokens) == answer and len(tokens) == 2
+    assert coordinator.synthesis_metrics["llm_calls_avoided"] == before + 1
+    assert thoughts[0].startswith("Synthesis: template")
+
+    bulk = {"agent": "Leave", "answer": "Approved 4 of 5 requests; LR-9 lacked balance.", "success": True,
+            "tools_used": ["approve_leave_requests"]}
+    assert coordinator.is_action_confirmation(bulk)
+    answer, method = await coordinator.synthesise_results("q", [bulk, policy], [], on_token)
+    assert method == "template"
+    assert answer.index("two weeks notice") < answer.index("LR-9")
+
+
+def test_choose_synthesis_falls_back_to_llm_for_true_merges(monkeypatch):
+    monkeypatch.setattr(coordinator, "SYNTHESIS_STRATEGY", "template")
+    pay   = _step("Payroll") | {"answer": "Your monthly salary is 5000 and your bonus is paid in March."}
+    perf  = _step("Performance") | {"answer": "Your rating affects your bonus paid in March with salary."}
+    leave = _step("Leave") | {"answer": "You have 12 annual leave days remaining."}
+    assert coordinator.choose_synthesis([pay])[0] == "single"
+    assert coordinator.choose_synthesis([pay, leave])[0] == "template"
+    assert coordinator.choose_synthesis([pay, perf])[0] == "llm"
+    assert coordinator.choose_synthesis([pay, _step("Leave", success=False)])[0] == "llm"
+    monkeypatch.setattr(coordinator, "SYNTHESIS_STRATEGY", "llm")
+    assert coordinator.choose_synthesis([pay, leave])[0] == "llm"
+
+
+# ─────────────────────────────────────────────
+# Fast-path router
+# ─────────────────────────────────────────────
+from fast_router import FastRouter
+
+
+def test_fast_router_rules_and_fallthrough():
+    router = FastRouter(coordinator.AGENT_DISPATCH.keys())
+    assert router.route("What's my leave balance?") == ("Leave", "rules")
+    assert router.route("Show me my latest payslip") == ("Payroll", "rules")
+    assert router.route("What's my leave balance and my latest payslip?") is None
+    assert router.route("Check the leave policy then apply for annual leave") is None
+    assert router.stats()["planner"] == 2
+
+
+def test_fast_router_sends_policy_questions_to_faq():
+    router = FastRouter(coordinator.AGENT_DISPATCH.keys())
+    assert router.route("What is the annual leave policy?") == ("FAQ", "rules")
+    assert router.route("What is the sick leave policy?") == ("FAQ", "rules")
+    assert router.route("Are employees allowed to carry over annual leave?") == ("FAQ", "rules")
+    assert router.route("What are the rules on salary deductions?") == ("FAQ", "rules")
+    # about the employee's own record — the planner decides
+    assert router.route("How many days of annual leave am I entitled to?") is None
+    assert router.route("How many sick days do I get?") == ("Leave", "rules")
+
+
+def test_fast_router_knn_learns_from_logged_plans():
+    router = FastRouter(coordinator.AGENT_DISPATCH.keys())
+    assert router.route("when do we get paid") is None
+    router.train([("when do we get paid", "Payroll"), ("when do we get paid this month", "Payroll"),
+                  ("what should I wear to work", "FAQ"), ("FAQ + Leave answer", "FAQ + Leave")])
+    assert router.route("when do we get paid?") == ("Payroll", "knn")
+    assert router.stats()["knn_examples"] == 3
+
+
+# ─────────────────────────────────────────────
+# Redis plan cache
+# ─────────────────────────────────────────────
+class _FakeRedis:
+    """Just enough of redis.asyncio for the plan cache helpers."""
+
+    def __init__(self):
+        self.kv, self.zset = {}, {}
+
+    async def get(self, key):
+        return self.kv.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.kv[key] = value
+
+    async def zadd(self, name, mapping):
+        self.zset.update(mapping)
+
+    async def zrem(self, name, *members):
+        for m in members:
+            self.zset.pop(m, None)
+
+    async def zremrangebyscore(self, name, low, high):
+        stale = [m for m, score in self.zset.items() if score <= high]
+        for m in stale:
+            del self.zset[m]
+        return len(stale)
+
+    async def zcard(self, name):
+        return len(self.zset)
+
+    async def zpopmin(self, name, count):
+        oldest = sorted(self.zset.items(), key=lambda kv: kv[1])[:count]
+        for k, _ in oldest:
+            del self.zset[k]
+        return oldest
+
+    async def delete(self, *keys):
+        for k in keys:
+            self.kv.pop(k, None)
+
+    def pipeline(self, transaction=False):
+        redis, calls = self, []
+
+        class _Pipe:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            def __getattr__(self, name):
+                return lambda *a, **kw: calls.append(getattr(redis, name)(*a, **kw))
+
+            async def execute(self):
+                return [await c for c in calls]
+
+        return _Pipe()
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_normalises_query_and_evicts_lru(monkeypatch):
+    monkeypatch.setattr(coordinator, "redis_client", _FakeRedis())
+    monkeypatch.setattr(coordinator, "PLAN_CACHE_MAX_ENTRIES", 2)
+    plan = coordinator.normalise_plan(["FAQ"])
+
+    await coordinator.cache_plan("How many sick days do I get?", {}, [], plan)
+    assert await coordinator.get_cached_plan("how many SICK days do i get", {}, []) == plan
+    # session hint changes the key
+    assert await coordinator.get_cached_plan("how many sick days do i get",
+                                             {"last_service": "leave", "last_topic": "x"}, []) is None
+
+    await coordinator.cache_plan("when is payday", {}, [], coordinator.normalise_plan(["Payroll"]))
+    await coordinator.cache_plan("show my goals", {}, [], coordinator.normalise_plan(["Performance"]))
+    assert await coordinator.get_cached_plan("How many sick days do I get?", {}, []) is None
+    assert coordinator.plan_cache_stats["evictions"] >= 1
+    assert "hit_rate" in client.get("/health").json()["plan_cache"]
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_bypassed_for_follow_ups_and_prunes_expired(monkeypatch):
+    redis = _FakeRedis()
+    monkeypatch.setattr(coordinator, "redis_client", redis)
+    history = [{"role": "assistant", "message": "Shall I submit 3 days of annual leave?"}]
+    leave   = coordinator.normalise_plan(["Leave"])
+
+    # A follow-up planned with history is never stored or served
+    await coordinator.cache_plan("yes, go ahead", {}, history, leave)
+    assert redis.kv == {} and redis.zset == {}
+    await coordinator.cache_plan("yes, go ahead", {}, [], leave)
+    assert await coordinator.get_cached_plan("yes, go ahead", {}, history) is None
+    assert coordinator.plan_cache_stats["bypassed"] >= 2
+
+    # LRU members outlive neither their TTL nor their (expired) key
+    key = coordinator.plan_cache_key("yes, go ahead", {})
+    redis.zset[key] -= coordinator.PLAN_CACHE_TTL + 1
+    await coordinator.cache_plan("when is payday", {}, [], coordinator.normalise_plan(["Payroll"]))
+    assert key not in redis.zset
+    payday = coordinator.plan_cache_key("when is payday", {})
+    del redis.kv[payday]
+    assert await coordinator.get_cached_plan("when is payday", {}, []) is None
+    assert payday not in redis.zset
+
+
+# ─────────────────────────────────────────────
+# Conversation history window
+# ─────────────────────────────────────────────
+@pytest.mark.asyncio
+async def test_conversation_history_returns_latest_messages_in_order(monkeypatch):
+    rows = [{"conversation_id": "c1", "timestamp": f"2025-01-01T10:00:{i:02d}", "message": str(i)}
+            for i in range(15)]
+
+    class _Cursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        def limit(self, n):
+            return _Cursor(self.docs[:n])
+
+        async def to_list(self, length):
+            return self.docs[:length]
+
+    class _Collection:
+        def find(self, flt, sort):
+            (field, direction), = sort
+            docs = sorted(rows, key=lambda d: d[field], reverse=direction == -1)
+            return _Cursor(docs)
+
+    monkeypatch.setattr(coordinator, "db", SimpleNamespace(chat_history=_Collection()))
+    history = await coordinator.get_conversation_history("c1", limit=10)
+    assert [m["message"] for m in history] == [str(i) for i in range(5, 15)]
+
+
+# ─────────────────────────────────────────────
+# Index registry
+# ─────────────────────────────────────────────
+import mongo_indexes
+
+
+def test_index_registry_covers_every_hot_query_collection():
+    for service, queries in mongo_indexes.HOT_QUERIES.items():
+        registered = mongo_indexes.INDEX_REGISTRY[service]
+        for q in queries:
+            assert q["collection"] in registered, (service, q)
+
+
+def test_plan_stages_detects_collection_scan():
+    plan = {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}}
+    assert "COLLSCAN" in mongo_indexes._plan_stages(plan)
+    plan = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}}}
+    assert mongo_indexes._plan_stages(plan) == ["LIMIT", "FETCH", "IXSCAN"]
+
+
+# ─────────────────────────────────────────────
+# Write-behind chat logger
+# ─────────────────────────────────────────────
+from chat_logger import ChatHistoryWriter
+
+
+class _FakeCollection:
+    def __init__(self):
+        self.batches = []
+
+    async def insert_many(self, docs, ordered=True):
+        self.batches.append(list(docs))
+
+
+@pytest.mark.asyncio
+async def test_chat_writer_batches_by_size_and_flushes_on_stop():
+    coll   = _FakeCollection()
+    writer = ChatHistoryWriter(max_queue=100, batch_size=3, flush_interval=60)
+    writer.start(coll)
+    for i in range(7):
+        assert writer.enqueue({"message": i})
+    await asyncio.sleep(0.05)
+    assert [len(b) for b in coll.batches] == [3, 3]
+    await writer.stop()
+    assert [d["message"] for b in coll.batches for d in b] == list(range(7))
+    assert writer.stats()["written"] == 7 and writer.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_chat_writer_flushes_on_interval_and_counts_drops():
+    coll   = _FakeCollection()
+    writer = ChatHistoryWriter(max_queue=2, batch_size=100, flush_interval=0.05)
+    assert not writer.enqueue({"message": "before start"})
+    writer.start(coll)
+    results = [writer.enqueue({"message": i}) for i in range(3)]
+    assert results == [True, True, False]
+    assert writer.stats()["dropped"] == 2     # one before start, one on a full queue
+    await asyncio.sleep(0.2)
+    assert [len(b) for b in coll.batches] == [2]
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_chat_writer_flush_makes_a_conversation_readable():
+    coll   = _FakeCollection()
+    writer = ChatHistoryWriter(max_queue=100, batch_size=100, flush_interval=60)
+    writer.start(coll)
+    await writer.flush("conv-1")               # nothing pending: returns at once
+    writer.enqueue({"conversation_id": "conv-2", "message": "other"})
+    await asyncio.wait_for(writer.flush("conv-1"), timeout=0.1)
+    assert coll.batches == []
+    writer.enqueue({"conversation_id": "conv-1", "message": "mine"})
+    await asyncio.wait_for(writer.flush("conv-1"), timeout=1)
+    assert [d["message"] for b in coll.batches for d in b] == ["other", "mine"]
+    writer.enqueue({"conversation_id": "conv-1", "message": "later"})
+    await writer.stop()
+    assert writer.stats()["written"] == 3 and not writer._pending
+
+
+@pytest.mark.asyncio
+async def test_chat_history_endpoints_flush_before_reading(monkeypatch):
+    events = []
+
+    class _Writer:
+        async def flush(self, conversation_id=None):
+            events.append(("flush", conversation_id))
+
+    class _History:
+        def find(self, query, sort=None):
+            events.append(("find", query))
+            return SimpleNamespace(limit=lambda n: self, to_list=self.to_list)
+
+        async def to_list(self, length=None):
+            return []
+
+    monkeypatch.setattr(coordinator, "chat_writer", _Writer())
+    monkeypatch.setattr(coordinator, "db", SimpleNamespace(chat_history=_History()))
+    await coordinator.get_conversation("conv-1")
+    await coordinator.get_chat_history("EMP000001")
+    assert [e[0] for e in events] == ["flush", "find", "flush", "find"]
+    assert events[0] == ("flush", "conv-1") and events[2] == ("flush", None)
+
+
+# ─────────────────────────────────────────────
+# Streaming (SSE)
+# ─────────────────────────────────────────────
+from react_engine import chat_completion_stream, sse_stream, parse_sse
+
+
+def _chunk(content=None, tool_calls=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+
+def _streaming_client(pieces):
+    async def create(stream=False, **kwargs):
+        assert stream
+
+        async def chunks():
+            for piece in pieces:
+                yield _chunk(piece)
+        return chunks()
+    return _fake_client(create)
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_stream_emits_only_after_final_answer_marker():
+    tokens = []
+
+    async def on_token(text):
+        tokens.append(text)
+
+    pieces = ["Thought: I know ", "this.\nFinal ", "Answer:", " You have ", "12 days", " left."]
+    resp = await chat_completion_stream(_streaming_client(pieces), on_token, model="m", messages=[])
+    assert "".join(tokens) == "You have 12 days left."
+    assert len(tokens) > 1
+    assert resp.choices[0].message.content == "".join(pieces)
+    assert resp.choices[0].message.tool_calls is None
+
+
+@pytest.mark.asyncio
+async def test_react_loop_streams_final_answer_tokens():
+    tokens = []
+
+    async def on_token(text):
+        tokens.append(text)
+
+    async def no_tools(name, args):
+        return "{}"
+
+    result = await run_react_loop(
+        openai_client=_streaming_client(["Thought: easy.\nFinal Answer: ", "Hello ", "there."]),
+        messages=[{"role": "user", "content": "hi"}], tools=[], tool_executor=no_tools,
+        service_name="Test", on_token=on_token,
+    )
+    assert result["answer"] == "Hello there."
+    assert tokens == ["Hello ", "there."]
+
+
+@pytest.mark.asyncio
+async def test_sse_stream_round_trips_events_and_errors():
+    async def ok(emit):
+        await emit("token", {"text": "hi"})
+        return {"answer": "hi"}
+
+    async def failing(emit):
+        raise coordinator.HTTPException(status_code=503, detail="down")
+
+    async def lines(run):
+        async for frame in sse_stream(run):
+            for line in frame.split("\n")[:-1]:
+                yield line
+
+    assert [e async for e in parse_sse(lines(ok))] == [("token", {"text": "hi"}), ("done", {"answer": "hi"})]
+    assert [e async for e in parse_sse(lines(failing))] == [("error", {"status_code": 503, "detail": "down"})]
+
+
+@pytest.mark.asyncio
+async def test_stream_ttfb_counts_from_first_content_event(monkeypatch):
+    """The immediate `start` ack must not count as the first byte"""
+    import asyncio
+
+    async def slow_coordinator(request, emit=None):
+        await asyncio.sleep(0.05)
+        await emit("plan", {"steps": ["FAQ"]})
+        await emit("token", {"text": "Hi"})
+        return coordinator.CoordinatorResponse(answer="Hi", agent_used="FAQ", confidence=1.0,
+                                               conversation_id=request.conversation_id)
+
+    monkeypatch.setattr(coordinator, "run_coordinator", slow_coordinator)
+    monkeypatch.setattr(coordinator, "stream_metrics", {**coordinator.stream_metrics})
+    response = await coordinator.ask_coordinator_stream(coordinator.CoordinatorRequest(query="hi"))
+    frames = [frame async for frame in response.body_iterator]
+
+    async def lines():
+        for frame in frames:
+            for line in frame.split("\n")[:-1]:
+                yield line
+
+    events = [e async for e in parse_sse(lines())]
+    assert [name for name, _ in events] == ["start", "plan", "token", "done"]
+    timings = events[-1][1]["metadata"]["stream"]
+    assert timings["ttfb_ms"] >= 50
+    assert timings["first_token_ms"] >= timings["ttfb_ms"]
+    assert coordinator.stream_stats()["avg_ttfb_ms"] is not None
@@ -8,20 +8,27 @@ calls more tools if needed, then generates a grounded final answer.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict
 import sys, os
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 import uvicorn
 import traceback
 import uuid
 import json
+import asyncio
+import hashlib
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from react_engine import run_react_loop, build_react_system_prompt
+from react_engine import (run_react_loop, build_react_system_prompt, sse_stream,
+                          tool_cache_stats, SSE_HEADERS, LLM_TIMEOUT_SECONDS)
+from mongo_indexes import ensure_indexes, index_report
+from chat_logger import ChatHistoryWriter
+from semantic_cache import SemanticCache
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -31,13 +38,27 @@ app = FastAPI(title="FAQ Agent", description="HR Knowledge Base ReAct AI Agent",
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS) if OPENAI_API_KEY else None
 
 MONGODB_URL = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 DB_NAME     = os.getenv("DB_NAME", "faq_db")
 mongo_client = None
 db = None
 
+# Semantic answer cache — near-duplicate questions skip the ReAct loop
+ANSWER_CACHE_ENABLED      = os.getenv("FAQ_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_POLL_SECONDS = int(os.getenv("FAQ_CACHE_POLL_SECONDS", "60"))
+answer_cache = SemanticCache(
+    threshold=float(os.getenv("FAQ_CACHE_THRESHOLD", "0.85")),
+    max_entries=int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "2000")),
+    ttl_seconds=int(os.getenv("FAQ_CACHE_TTL", "86400")),
+)
+answer_cache_watcher = None
+faq_sources_fingerprint = None
+
+# Longest keyword string passed to the question_logs text search
+LOG_SEARCH_MAX_CHARS = int(os.getenv("FAQ_LOG_SEARCH_MAX_CHARS", "200"))
+
 # ─────────────────────────────────────────────
 # Pydantic Models
 # ─────────────────────────────────────────────
@@ -52,12 +73,15 @@ class QuestionResponse(BaseModel):
     confidence: float = 0.95
     conversation_id: str
     tools_used: List[str] = []
+    cached: bool = False
 
 # ─────────────────────────────────────────────
 # Guardrails
 # ─────────────────────────────────────────────
 SENSITIVE_KEYWORDS = ['salary', 'fire', 'terminate', 'lawsuit', 'harassment', 'discrimination']
 CONTEXT_MARKER     = "[Prior conversation context:"
+# Added by the coordinator to dependent plan steps; carries other agents' answers
+STEP_CONTEXT_MARKER = "[Context from previous steps:"
 
 _FAQ_BASE_PROMPT = """You are ResourcefulAI's HR Knowledge Assistant — a professional virtual assistant for employees.
 
@@ -113,7 +137,7 @@ FAQ_TOOLS = [
             "parameters": {
                 "type": "object",
                 "properties": {
-                    "keyword": {"type": "string", "description": "Keyword to search for in past questions"}
+                    "keyword": {"type": "string", "description": "Keywords to search for in past questions (plain words, ranked by relevance)"}
                 },
                 "required": ["keyword"]
             }
@@ -136,6 +160,9 @@ FAQ_TOOLS = [
     }
 ]
 
+# Tools that write to MongoDB — never run concurrently with other tool calls
+FAQ_MUTATING_TOOLS = {"escalate_to_hr"}
+
 # ─────────────────────────────────────────────
 # Tool Executor
 # ─────────────────────────────────────────────
@@ -153,12 +180,17 @@ async def execute_tool(tool_name: str, tool_args: dict, user_id: str = None) ->
             return json.dumps(cats)
 
         elif tool_name == "search_question_logs":
-            keyword = tool_args.get("keyword", "")
-            cursor = db.question_logs.find(
-                {"question": {"$regex": keyword, "$options": "i"}},
-                {"_id": 0, "question": 1, "timestamp": 1}
-            ).sort("timestamp", -1).limit(5)
-            logs = await cursor.to_list(length=5)
+            # Served by the question_text index: relevance-ranked, newest first on ties.
+            # Keywords are search terms, not a pattern, so nothing here can backtrack.
+            keyword = tool_args.get("keyword", "").strip()[:LOG_SEARCH_MAX_CHARS]
+            logs = []
+            if keyword:
+                cursor = db.question_logs.find(
+                    {"$text": {"$search": keyword}},
+                    {"_id": 0, "question": 1, "timestamp": 1, "score": {"$meta": "textScore"}}
+                ).sort([("score", {"$meta": "textScore"}), ("timestamp", -1)]).limit(5)
+                logs = [{"question": l["question"], "timestamp": l.get("timestamp")}
+                        for l in await cursor.to_list(length=5)]
             return json.dumps(logs if logs else [{"message": "No similar questions found"}])
 
         elif tool_name == "escalate_to_hr":
@@ -180,24 +212,29 @@ async def execute_tool(tool_name: str, tool_args: dict, user_id: str = None) ->
 # ─────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────
+chat_writer = ChatHistoryWriter()
+
 async def log_message(conv_id, role, message, user_id=None, flagged=False):
     if db is None:
         return
-    try:
-        await db.chat_history.insert_one({
-            "conversation_id": conv_id, "service": "faq",
-            "user_id": user_id, "role": role, "message": message,
-            "flagged": flagged, "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.warning(f"⚠️ log_message failed: {str(e)}")
+    # Write-behind: the background writer batches these into insert_many
+    chat_writer.enqueue({
+        "conversation_id": conv_id, "service": "faq",
+        "user_id": user_id, "role": role, "message": message,
+        "flagged": flagged, "timestamp": datetime.now().isoformat()
+    })
 
 async def get_conversation_history(conv_id, limit=10):
     if db is None:
         return []
     try:
-        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", 1)]).limit(limit)
-        return await cursor.to_list(length=limit)
+        # Write-behind logging: make this conversation's queued messages readable first
+        await chat_writer.flush(conv_id)
+        # Newest `limit` messages via the (conversation_id, timestamp) index,
+        # then flipped back to chronological order for the prompt
+        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", -1)]).limit(limit)
+        recent = await cursor.to_list(length=limit)
+        return recent[::-1]
     except Exception as e:
         logger.warning(f"⚠️ get_history failed: {str(e)}")
         return []
@@ -208,6 +245,36 @@ def serialize_doc(doc):
         del doc["_id"]
     return doc
 
+# ─────────────────────────────────────────────
+# Answer cache invalidation
+# ─────────────────────────────────────────────
+async def fingerprint_faq_sources() -> str:
+    """Hash of the knowledge the FAQ tools read (view counts excluded)."""
+    questions  = await db.popular_questions.find({}, {"_id": 0, "question": 1, "category": 1}).to_list(length=1000)
+    categories = await db.categories.find({}, {"_id": 0}).to_list(length=1000)
+    payload = json.dumps([sorted(questions, key=lambda d: d.get("question", "")),
+                          sorted(categories, key=lambda d: d.get("id", ""))], sort_keys=True)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+async def refresh_answer_cache() -> bool:
+    """Clear the answer cache if popular_questions / categories changed. Returns True if cleared."""
+    global faq_sources_fingerprint
+    fingerprint = await fingerprint_faq_sources()
+    changed = faq_sources_fingerprint is not None and fingerprint != faq_sources_fingerprint
+    faq_sources_fingerprint = fingerprint
+    if changed:
+        answer_cache.clear()
+        logger.info("🧹 FAQ sources changed — answer cache cleared")
+    return changed
+
+async def watch_faq_sources():
+    while True:
+        await asyncio.sleep(ANSWER_CACHE_POLL_SECONDS)
+        try:
+            await refresh_answer_cache()
+        except Exception as e:
+            logger.warning(f"⚠️ Answer cache refresh failed: {str(e)}")
+
 # ─────────────────────────────────────────────
 # Seed Data
 # ─────────────────────────────────────────────
@@ -235,22 +302,32 @@ SEED_CATEGORIES = [
 # ─────────────────────────────────────────────
 @app.on_event("startup")
 async def startup_event():
-    global mongo_client, db
+    global mongo_client, db, answer_cache_watcher
     logger.info("🚀 FAQ Agent v2 Starting (with tool calling)")
     try:
         mongo_client = AsyncIOMotorClient(MONGODB_URL)
         db = mongo_client[DB_NAME]
         await mongo_client.admin.command("ping")
         logger.info("✅ MongoDB connected")
+        await ensure_indexes(db, "faq")
+        chat_writer.start(db.chat_history)
         if await db.popular_questions.count_documents({}) == 0:
             await db.popular_questions.insert_many(SEED_POPULAR)
         if await db.categories.count_documents({}) == 0:
             await db.categories.insert_many(SEED_CATEGORIES)
+        if ANSWER_CACHE_ENABLED:
+            await refresh_answer_cache()
+            answer_cache_watcher = asyncio.create_task(watch_faq_sources())
     except Exception as e:
         logger.error(f"❌ MongoDB failed: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if answer_cache_watcher:
+        answer_cache_watcher.cancel()
+    if client:
+        await client.close()
+    await chat_writer.stop()
     if mongo_client:
         mongo_client.close()
 
@@ -268,13 +345,25 @@ async def health_check():
         mongo_status = "error"
     return {"status": "healthy", "service": "faq-agent", "version": "2.0.0",
             "openai_status": "configured" if OPENAI_API_KEY else "missing",
-            "mongodb_status": mongo_status, "mode": "agentic-tool-calling"}
+            "mongodb_status": mongo_status, "mode": "agentic-tool-calling",
+            "answer_cache": {**answer_cache.stats(), "enabled": ANSWER_CACHE_ENABLED},
+            "chat_logger": chat_writer.stats(), "tool_cache": tool_cache_stats()}
 
 # ─────────────────────────────────────────────
 # AI Ask Endpoint — Agentic Loop
 # ─────────────────────────────────────────────
 @app.post("/api/faq/ask", response_model=QuestionResponse)
 async def ask_question(request: QuestionRequest):
+    return await answer_question(request)
+
+@app.post("/api/faq/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """SSE variant: `token` events carry the Final Answer as it is generated, then `done`."""
+    async def run(emit):
+        return await answer_question(request, on_token=lambda text: emit("token", {"text": text}))
+    return StreamingResponse(sse_stream(run), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def answer_question(request: QuestionRequest, on_token=None) -> QuestionResponse:
     try:
         logger.info(f"📥 FAQ question: {request.question}")
         if not OPENAI_API_KEY or not client:
@@ -302,6 +391,24 @@ async def ask_question(request: QuestionRequest):
         # ── Build messages with history ───────────────────────────────────────
         messages = [{"role": "system", "content": SYSTEM_PROMPT}]
         history  = await get_conversation_history(conv_id, limit=10)
+
+        # ── Semantic answer cache (self-contained questions only) ─────────────
+        # Follow-ups can lean on earlier turns, and coordinator-supplied context
+        # can carry another agent's employee-specific answer, so only first
+        # questions with no attached context are served from — or stored in — the cache.
+        has_context = CONTEXT_MARKER in request.question or STEP_CONTEXT_MARKER in request.question
+        use_cache   = ANSWER_CACHE_ENABLED and not history and not has_context
+        if use_cache:
+            hit = answer_cache.lookup(original_question)
+            if hit:
+                logger.info(f"⚡ FAQ answer cache hit ({hit['similarity']}) ← \"{hit['question']}\"")
+                await log_message(conv_id, "user",      request.question, request.user_id)
+                await log_message(conv_id, "assistant", hit["answer"],    request.user_id)
+                return QuestionResponse(
+                    answer=hit["answer"], question=request.question,
+                    confidence=0.95, conversation_id=conv_id, tools_used=[], cached=True
+                )
+
         for msg in history:
             messages.append({"role": msg["role"], "content": msg["message"]})
         messages.append({"role": "user", "content": request.question})
@@ -312,13 +419,17 @@ async def ask_question(request: QuestionRequest):
             openai_client=client,
             messages=messages,
             tools=FAQ_TOOLS,
+            mutating_tools=FAQ_MUTATING_TOOLS,
             tool_executor=lambda name, args: execute_tool(name, args, request.user_id),
             service_name="FAQ",
             max_iterations=8,
+            on_token=on_token,
         )
 
         answer     = result["answer"]
         tools_used = result["tools_used"]
+        if use_cache and result["final_answer"] and "escalate_to_hr" not in tools_used:
+            answer_cache.store(original_question, answer)
 
         logger.info(
             f"✅ FAQ ReAct complete — {result['iterations']} iteration(s), "
@@ -342,6 +453,12 @@ async def ask_question(request: QuestionRequest):
 # ─────────────────────────────────────────────
 # Supporting Endpoints
 # ─────────────────────────────────────────────
+@app.post("/api/faq/cache/invalidate")
+async def invalidate_answer_cache():
+    cleared = len(answer_cache)
+    answer_cache.clear()
+    return {"status": "cleared", "entries_removed": cleared}
+
 @app.get("/api/faq/categories")
 async def get_categories():
     if db is None:
@@ -361,6 +478,7 @@ async def get_popular_questions():
 async def get_chat_history(user_id: str, limit: int = 50):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush()
     cursor = db.chat_history.find(
         {"user_id": user_id, "service": "faq"}, sort=[("timestamp", -1)]
     ).limit(limit)
@@ -371,9 +489,16 @@ async def get_chat_history(user_id: str, limit: int = 50):
 async def get_conversation(conversation_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush(conversation_id)
     cursor = db.chat_history.find({"conversation_id": conversation_id}, sort=[("timestamp", 1)])
     messages = await cursor.to_list(length=200)
     return {"conversation_id": conversation_id, "messages": [serialize_doc(m) for m in messages]}
 
+@app.get("/api/faq/admin/indexes")
+async def get_index_report():
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await index_report(db, "faq")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8002)))
\ No newline at end of file
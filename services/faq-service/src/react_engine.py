@@ -10,15 +10,52 @@ Fixes applied vs previous version:
      the Thought/Action/Observation trace before returning to the user
   3. REACT_INSTRUCTION now explicitly bans markdown on the Final Answer line
   4. Thoughts are stored separately and never shown to the user
+  5. LLM calls are awaited on an async client with a per-call timeout,
+     so a slow completion no longer freezes the service's event loop
+  6. Several tool calls in one turn run concurrently (read-only tools only);
+     tools that write are serialized and observations keep the model's order
+  7. Each call is fitted to a prompt token budget: only the latest
+     re-evaluation prompt is sent, old observations are compacted first and
+     the system prompt is never touched. Tokens sent/received are reported
+     per iteration
+  8. Optional streaming: with `on_token`, completions are streamed and the
+     answer text is forwarded as soon as the Final Answer marker appears
+     in the token stream (see also sse_event / sse_stream / parse_sse)
+  9. Read-only tool results are memoized per request on (tool, canonical
+     args) and dropped when a mutating tool touches the same entity; an
+     optional short-TTL tier (TOOL_CACHE_TTL) shares them across requests
 """
 
+import os
 import re
 import json
+import asyncio
+import inspect
+import time
 import logging
-from typing import List, Dict, Callable, Awaitable, Any
+from collections import OrderedDict
+from types import SimpleNamespace
+from typing import (List, Dict, Callable, Awaitable, Any, Optional, Iterable, Tuple,
+                    AsyncIterator)
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for a single chat completion round-trip (seconds)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+
+# Max read-only tool calls executed at once within a single ReAct iteration
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+
+# Estimated prompt tokens allowed per LLM call before old observations are compacted
+REACT_PROMPT_TOKEN_BUDGET = int(os.getenv("REACT_PROMPT_TOKEN_BUDGET", "12000"))
+
+# A compacted observation is never squeezed below this many tokens
+OBSERVATION_MIN_TOKENS = int(os.getenv("OBSERVATION_MIN_TOKENS", "200"))
+
+# Cross-request tool result cache: seconds a read stays valid (0 = per-request only)
+TOOL_CACHE_TTL         = float(os.getenv("TOOL_CACHE_TTL", "0"))
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1000"))
+
 # ─────────────────────────────────────────────────────────────────────────────
 # ReAct system prompt fragment
 # ─────────────────────────────────────────────────────────────────────────────
@@ -115,6 +152,463 @@ def _strip_trace(text: str) -> str:
     return "\n".join(clean_lines).strip()
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Async LLM client abstraction
+# ─────────────────────────────────────────────────────────────────────────────
+async def chat_completion(
+    openai_client: Any,
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> Any:
+    """
+    Await one chat completion without blocking the event loop.
+
+    Works with both client flavours:
+      - AsyncOpenAI  — the coroutine is awaited directly
+      - OpenAI (sync) — the blocking call is pushed to a worker thread
+
+    The call is bounded by `timeout` (default LLM_TIMEOUT_SECONDS) and raises
+    asyncio.TimeoutError when exceeded. Cancelling the awaiting task (e.g. the
+    HTTP client disconnected) cancels the in-flight request as well.
+    """
+    create = openai_client.chat.completions.create
+    if inspect.iscoroutinefunction(inspect.unwrap(create)):
+        call = create(**kwargs)
+    else:
+        call = asyncio.to_thread(create, **kwargs)
+    return await asyncio.wait_for(call, timeout=timeout or LLM_TIMEOUT_SECONDS)
+
+
+async def chat_completion_stream(
+    openai_client: Any,
+    on_token: Callable[[str], Awaitable[None]],
+    timeout: Optional[float] = None,
+    **kwargs,
+) -> Any:
+    """
+    Streaming counterpart of chat_completion().
+
+    Reasoning text is buffered; once the Final Answer marker shows up in the
+    stream, everything after it is passed to `on_token` as it arrives.
+    Returns a response shaped like a non-streamed one (choices[0].message
+    with content and tool_calls, plus usage when the API reports it).
+
+    Sync clients cannot be streamed from here: the call falls back to
+    chat_completion() and the whole answer is forwarded in one piece.
+    `timeout` bounds the complete stream, not each chunk.
+    """
+    create = openai_client.chat.completions.create
+    if not inspect.iscoroutinefunction(inspect.unwrap(create)):
+        response = await chat_completion(openai_client, timeout=timeout, **kwargs)
+        answer   = _extract_final_answer(response.choices[0].message.content or "")
+        if answer:
+            await on_token(answer)
+        return response
+
+    async def consume():
+        stream = await create(stream=True, stream_options={"include_usage": True}, **kwargs)
+        text, calls, usage = "", {}, None
+        emitted = None          # offset in `text` up to which answer tokens were sent
+        async for chunk in stream:
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                text += delta.content
+                if emitted is None:
+                    match = _FINAL_ANSWER_RE.search(text)
+                    # Wait until the marker's trailing whitespace is complete
+                    if match and match.end() < len(text):
+                        emitted = match.end()
+                if emitted is not None and emitted < len(text):
+                    await on_token(text[emitted:])
+                    emitted = len(text)
+            for tc in delta.tool_calls or []:
+                slot = calls.setdefault(tc.index, {"id": None, "name": "", "arguments": ""})
+                slot["id"] = tc.id or slot["id"]
+                if tc.function:
+                    slot["name"]      += tc.function.name or ""
+                    slot["arguments"] += tc.function.arguments or ""
+
+        tool_calls = [
+            SimpleNamespace(id=c["id"], type="function",
+                            function=SimpleNamespace(name=c["name"], arguments=c["arguments"]))
+            for _, c in sorted(calls.items())
+        ]
+        message = SimpleNamespace(content=text or None, tool_calls=tool_calls or None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    return await asyncio.wait_for(consume(), timeout=timeout or LLM_TIMEOUT_SECONDS)
+
+
+def _assistant_message(msg: Any) -> Dict:
+    """Plain-dict form of an assistant message (streamed or not) for the next call."""
+    message = {"role": "assistant", "content": msg.content}
+    if msg.tool_calls:
+        message["tool_calls"] = [
+            {"id": tc.id, "type": "function",
+             "function": {"name": tc.function.name, "arguments": tc.function.arguments}}
+            for tc in msg.tool_calls
+        ]
+    return message
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Server-Sent Events
+# ─────────────────────────────────────────────────────────────────────────────
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_stream(
+    run: Callable[[Callable[[str, Any], Awaitable[None]]], Awaitable[Any]],
+) -> AsyncIterator[str]:
+    """
+    Drive `run(emit)` and yield what it emits as SSE frames, followed by a
+    `done` event carrying its return value (pydantic models are dumped) or
+    an `error` event with the exception's status_code/detail. If the client
+    disconnects, the run is cancelled.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def emit(event: str, data: Any):
+        await queue.put(sse_event(event, data))
+
+    async def runner():
+        try:
+            result = await run(emit)
+            await emit("done", result.model_dump() if hasattr(result, "model_dump") else result)
+        except Exception as e:
+            await emit("error", {"status_code": getattr(e, "status_code", 500),
+                                 "detail": getattr(e, "detail", str(e))})
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(runner())
+    try:
+        while (frame := await queue.get()) is not None:
+            yield frame
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def parse_sse(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """Turn an SSE line stream (e.g. httpx aiter_lines()) into (event, data) pairs."""
+    event, data = "message", []
+    async for line in lines:
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = "message", []
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Context window — token budget
+# Estimates use ~4 characters per token (no tokenizer dependency); they only
+# decide when to compact. Actual usage is read from each response.
+# ─────────────────────────────────────────────────────────────────────────────
+_CHARS_PER_TOKEN  = 4
+_MESSAGE_OVERHEAD = 4
+_TRUNCATION_NOTE  = "… [{} chars omitted to fit the context budget]"
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+
+def _message_tokens(message: Any) -> int:
+    """Estimated tokens for a dict message or an SDK assistant message."""
+    if isinstance(message, dict):
+        content    = message.get("content") or ""
+        tool_calls = message.get("tool_calls") or []
+    else:
+        content    = getattr(message, "content", None) or ""
+        tool_calls = getattr(message, "tool_calls", None) or []
+    tokens = _MESSAGE_OVERHEAD + estimate_tokens(str(content))
+    for tc in tool_calls:
+        fn = tc["function"] if isinstance(tc, dict) else tc.function
+        name, args = (fn["name"], fn["arguments"]) if isinstance(fn, dict) else (fn.name, fn.arguments)
+        tokens += _MESSAGE_OVERHEAD + estimate_tokens(name) + estimate_tokens(args or "")
+    return tokens
+
+
+def compact_observation(content: str, max_tokens: int) -> str:
+    """
+    Shrink a tool result to roughly `max_tokens`. JSON lists (or the largest
+    list inside a JSON object) keep their leading items plus an omitted
+    count, so the model still sees well-formed records; anything else is
+    truncated with a note.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return content
+    try:
+        data = json.loads(content)
+    except (json.JSONDecodeError, TypeError):
+        data = None
+
+    key = None
+    if isinstance(data, dict):
+        lists = [k for k, v in data.items() if isinstance(v, list) and v]
+        key   = max(lists, key=lambda k: len(json.dumps(data[k])), default=None)
+    if isinstance(data, list) or key is not None:
+        items = data if key is None else data[key]
+
+        def render(keep: int) -> str:
+            omitted = len(items) - keep
+            if key is None:
+                return json.dumps(items[:keep] + [{"_omitted_items": omitted}])
+            return json.dumps({**data, key: items[:keep], f"_omitted_{key}": omitted})
+
+        keep = len(items) // 2
+        while keep > 0 and estimate_tokens(render(keep)) > max_tokens:
+            keep //= 2
+        if keep > 0:
+            return render(keep)
+
+    max_chars = max(0, max_tokens * _CHARS_PER_TOKEN - len(_TRUNCATION_NOTE.format(len(content))))
+    return content[:max_chars] + _TRUNCATION_NOTE.format(len(content) - max_chars)
+
+
+def fit_to_budget(messages: List[Any], budget: int = REACT_PROMPT_TOKEN_BUDGET) -> Tuple[List[Any], int]:
+    """
+    Build the message list for the next LLM call. Returns (window, tokens).
+
+    `messages` is left untouched. In the window:
+      - only the most recent REEVAL_PROMPT is kept (earlier copies add nothing)
+      - when the estimate exceeds `budget`, tool observations are compacted
+        oldest first, each no smaller than OBSERVATION_MIN_TOKENS
+      - system, user and assistant messages are sent as-is, so the system
+        prompt prefix stays identical across calls
+    Tool messages are shortened, never dropped, because every tool_call id
+    in an assistant message must keep its matching response.
+    """
+    reevals = [i for i, m in enumerate(messages)
+               if isinstance(m, dict) and m.get("role") == "user" and m.get("content") == REEVAL_PROMPT]
+    stale   = set(reevals[:-1])
+    window  = [m for i, m in enumerate(messages) if i not in stale]
+    tokens  = sum(_message_tokens(m) for m in window)
+
+    for i, message in enumerate(window):
+        if tokens <= budget:
+            break
+        if not (isinstance(message, dict) and message.get("role") == "tool"):
+            continue
+        before = _message_tokens(message)
+        target = max(OBSERVATION_MIN_TOKENS, before - _MESSAGE_OVERHEAD - (tokens - budget))
+        window[i] = {**message, "content": compact_observation(str(message.get("content") or ""), target)}
+        tokens += _message_tokens(window[i]) - before
+    return window, tokens
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tool execution — concurrent reads, serialized writes
+# ─────────────────────────────────────────────────────────────────────────────
+async def _execute_tool_calls(
+    tool_calls: List[Any],
+    tool_executor: Callable[[str, Dict], Awaitable[str]],
+    service_name: str,
+    mutating_tools: Iterable[str],
+    max_concurrency: int,
+) -> List[str]:
+    """
+    Execute one turn's tool calls and return their results in call order.
+
+    Consecutive read-only calls are gathered concurrently (at most
+    `max_concurrency` in flight). A call to a tool in `mutating_tools` acts
+    as a barrier: everything before it finishes first, and it runs alone,
+    so writes keep the ordering the model asked for.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    mutating  = set(mutating_tools)
+
+    async def run_one(tool_call) -> str:
+        tool_name = tool_call.function.name
+        try:
+            tool_args = json.loads(tool_call.function.arguments)
+        except json.JSONDecodeError:
+            tool_args = {}
+
+        logger.info(f"🔧 [{service_name}] Action → {tool_name}({tool_args})")
+        async with semaphore:
+            tool_result = await tool_executor(tool_name, tool_args)
+        logger.info(f"📊 [{service_name}] Observation ← {tool_name}: {str(tool_result)[:120]}")
+        return tool_result
+
+    results: List[str] = []
+    batch:   List[Any] = []
+    for tool_call in tool_calls:
+        if tool_call.function.name in mutating:
+            if batch:
+                results.extend(await asyncio.gather(*[run_one(tc) for tc in batch]))
+                batch = []
+            results.append(await run_one(tool_call))
+        else:
+            batch.append(tool_call)
+    if batch:
+        results.extend(await asyncio.gather(*[run_one(tc) for tc in batch]))
+    return results
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Tool result memoization
+# Entities are the *_id arguments of a call. A write invalidates a cached
+# read unless both name the same kind of id with different values — when in
+# doubt (no id kind in common) the read is dropped.
+# ─────────────────────────────────────────────────────────────────────────────
+def _canonical_args(tool_args: Dict) -> str:
+    return json.dumps(tool_args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _tool_entities(tool_args: Dict) -> Dict[str, str]:
+    return {k: str(v) for k, v in tool_args.items()
+            if (k == "id" or k.endswith("_id")) and isinstance(v, (str, int))}
+
+
+def _may_touch(read_entities: Dict[str, str], write_entities: Dict[str, str]) -> bool:
+    shared = read_entities.keys() & write_entities.keys()
+    return not shared or any(read_entities[k] == write_entities[k] for k in shared)
+
+
+def _is_error_result(result: Any) -> bool:
+    try:
+        parsed = json.loads(result)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(parsed, dict) and "error" in parsed
+
+
+class SharedToolCache:
+    """Process-wide TTL/LRU tier for read-only tool results (hot employees)."""
+
+    def __init__(self, ttl: float = TOOL_CACHE_TTL, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.ttl         = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict[str, str], str]]" = OrderedDict()
+        self.hits = self.misses = self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Tuple) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: Tuple, entities: Dict[str, str], result: str):
+        self._entries[key] = (time.monotonic() + self.ttl, entities, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, service_name: str, write_entities: Dict[str, str]):
+        stale = [k for k, (_, entities, _) in self._entries.items()
+                 if k[0] == service_name and _may_touch(entities, write_entities)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+        }
+
+
+shared_tool_cache = SharedToolCache()
+
+
+def tool_cache_stats() -> Dict:
+    return shared_tool_cache.stats()
+
+
+class ToolResultCache:
+    """
+    Per-request memoization around a tool_executor, keyed on
+    (tool_name, canonical args). Only read-only tools are cached; identical
+    calls in flight at the same time share one execution. A mutating tool
+    runs uncached and then drops the reads (here and in the shared tier)
+    that may involve the same entity. Error results are never cached.
+    """
+
+    def __init__(
+        self,
+        tool_executor: Callable[[str, Dict], Awaitable[str]],
+        service_name: str,
+        mutating_tools: Iterable[str] = (),
+        shared: Optional[SharedToolCache] = None,
+    ):
+        self.tool_executor = tool_executor
+        self.service_name  = service_name
+        self.mutating      = set(mutating_tools)
+        self.shared        = shared if shared is not None and shared.enabled else None
+        self._entries: Dict[Tuple[str, str], Tuple[Dict[str, str], asyncio.Future]] = {}
+        self.hits = self.misses = self.invalidations = 0
+
+    async def __call__(self, tool_name: str, tool_args: Dict) -> str:
+        entities = _tool_entities(tool_args)
+        if tool_name in self.mutating:
+            result = await self.tool_executor(tool_name, tool_args)
+            self.invalidate(entities)
+            return result
+
+        key = (tool_name, _canonical_args(tool_args))
+        if key in self._entries:
+            self.hits += 1
+            logger.info(f"♻️ [{self.service_name}] Memoized → {tool_name}")
+            return await asyncio.shield(self._entries[key][1])
+        self.misses += 1
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (entities, future)
+        shared_key = (self.service_name,) + key
+        try:
+            result = self.shared.get(shared_key) if self.shared else None
+            if result is None:
+                result = await self.tool_executor(tool_name, tool_args)
+                if self.shared and not _is_error_result(result):
+                    self.shared.put(shared_key, entities, result)
+        except BaseException as e:
+            self._entries.pop(key, None)
+            future.set_exception(e)
+            future.exception()          # mark retrieved for waiters that never come
+            raise
+        if _is_error_result(result):
+            self._entries.pop(key, None)
+        future.set_result(result)
+        return result
+
+    def invalidate(self, write_entities: Dict[str, str]):
+        stale = [k for k, (entities, _) in self._entries.items() if _may_touch(entities, write_entities)]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        if self.shared:
+            self.shared.invalidate(self.service_name, write_entities)
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "invalidations": self.invalidations}
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Main ReAct loop
 # ─────────────────────────────────────────────────────────────────────────────
@@ -125,31 +619,93 @@ async def run_react_loop(
     tool_executor: Callable[[str, Dict], Awaitable[str]],
     service_name: str,
     max_iterations: int = 8,
+    timeout: float = LLM_TIMEOUT_SECONDS,
+    mutating_tools: Iterable[str] = (),
+    max_tool_concurrency: int = TOOL_CONCURRENCY,
+    prompt_budget: int = REACT_PROMPT_TOKEN_BUDGET,
+    on_token: Optional[Callable[[str], Awaitable[None]]] = None,
+    memoize_tools: bool = True,
 ) -> Dict:
     """
     Run a ReAct loop until the model produces a Final Answer or
     the iteration limit is reached.
 
+    `timeout` bounds each individual LLM call, not the whole loop.
+    Tools named in `mutating_tools` are never run concurrently with others;
+    the rest run up to `max_tool_concurrency` at a time.
+    Each call sends fit_to_budget(messages, prompt_budget); `messages` itself
+    keeps the full, uncompacted trace.
+    With `on_token`, each call is streamed and the Final Answer text is
+    forwarded token by token (the returned `answer` is unchanged).
+    With `memoize_tools`, tool_executor is wrapped in a ToolResultCache for
+    the duration of the loop (and the shared tier when TOOL_CACHE_TTL > 0).
+
     Returns:
         answer      — clean user-facing text (no trace labels)
         tools_used  — ordered list of tool names called
         thoughts    — raw reasoning trace (for audit logs only)
         iterations  — number of cycles completed
+        final_answer — True only when the model produced a Final Answer
+                       (False for timeouts, fallbacks and the iteration cap)
+        token_usage  — per iteration: estimated prompt tokens, plus the
+                       prompt/completion tokens the API reported
+        tool_cache   — memoization hits/misses/invalidations for this loop
     """
-    tools_used = []
-    thoughts   = []
+    tools_used  = []
+    thoughts    = []
+    token_usage = []
+    memo        = ToolResultCache(tool_executor, service_name, mutating_tools,
+                                  shared_tool_cache) if memoize_tools else None
+    executor    = memo or tool_executor
+    tool_cache  = memo.stats if memo else dict
 
     for iteration in range(max_iterations):
         logger.info(f"🔄 [{service_name}] ReAct iteration {iteration + 1}/{max_iterations}")
 
-        response = openai_client.chat.completions.create(
+        window, estimated = fit_to_budget(messages, prompt_budget)
+        request = dict(
             model="gpt-4o-mini",
-            messages=messages,
+            messages=window,
             tools=tools,
             tool_choice="auto",
             temperature=0.2,
             max_tokens=900
         )
+        try:
+            if on_token:
+                response = await chat_completion_stream(openai_client, on_token, timeout=timeout, **request)
+            else:
+                response = await chat_completion(openai_client, timeout=timeout, **request)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"⏱️ [{service_name}] LLM call timed out after {timeout}s "
+                f"at iteration {iteration + 1}."
+            )
+            return {
+                "answer": (
+                    "The assistant took too long to respond. "
+                    "Please try again in a moment or contact HR at hr@company.com."
+                ),
+                "tools_used": tools_used,
+                "thoughts":   thoughts,
+                "iterations": iteration + 1,
+                "token_usage": token_usage,
+                "tool_cache": tool_cache(),
+                "final_answer": False,
+            }
+
+        usage = getattr(response, "usage", None)
+        spent = {
+            "iteration":         iteration + 1,
+            "estimated_prompt":  estimated,
+            "prompt_tokens":     getattr(usage, "prompt_tokens", None),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+        }
+        token_usage.append(spent)
+        logger.info(
+            f"🧮 [{service_name}] Tokens sent={spent['prompt_tokens']} (est. {estimated}) "
+            f"received={spent['completion_tokens']}"
+        )
 
         msg          = response.choices[0].message
         thought_text = msg.content or ""
@@ -171,10 +727,13 @@ async def run_react_loop(
                     "tools_used": tools_used,
                     "thoughts":   thoughts,
                     "iterations": iteration + 1,
+                    "token_usage": token_usage,
+                    "tool_cache": tool_cache(),
+                    "final_answer": True,
                 }
 
         # Append assistant message before checking tool calls
-        messages.append(msg)
+        messages.append(_assistant_message(msg))
 
         # ── No tool calls and no Final Answer ─────────────────────────────────
         # Fallback: strip the trace labels and return whatever clean text remains.
@@ -193,21 +752,18 @@ async def run_react_loop(
                 "tools_used": tools_used,
                 "thoughts":   thoughts,
                 "iterations": iteration + 1,
+                "token_usage": token_usage,
+                "tool_cache": tool_cache(),
+                "final_answer": False,
             }
 
         # ── Execute tool calls ────────────────────────────────────────────────
-        for tool_call in msg.tool_calls:
-            tool_name = tool_call.function.name
-            try:
-                tool_args = json.loads(tool_call.function.arguments)
-            except json.JSONDecodeError:
-                tool_args = {}
-
-            logger.info(f"🔧 [{service_name}] Action → {tool_name}({tool_args})")
-            tool_result = await tool_executor(tool_name, tool_args)
-            tools_used.append(tool_name)
-            logger.info(f"📊 [{service_name}] Observation ← {tool_name}: {str(tool_result)[:120]}")
-
+        tool_results = await _execute_tool_calls(
+            msg.tool_calls, executor, service_name,
+            mutating_tools, max_tool_concurrency,
+        )
+        for tool_call, tool_result in zip(msg.tool_calls, tool_results):
+            tools_used.append(tool_call.function.name)
             messages.append({
                 "role":         "tool",
                 "tool_call_id": tool_call.id,
@@ -227,6 +783,9 @@ async def run_react_loop(
         "tools_used": tools_used,
         "thoughts":   thoughts,
         "iterations": max_iterations,
+        "token_usage": token_usage,
+        "tool_cache": tool_cache(),
+        "final_answer": False,
     }
 
 
@@ -0,0 +1,106 @@
+"""
+semantic_cache.py — In-memory semantic answer cache for the FAQ agent.
+
+FAQ answers do not depend on who is asking, so a question that is a near
+duplicate of one already answered can be served without a ReAct loop.
+
+Questions are embedded locally as L2-normalised hashed unigram + bigram
+vectors (no model download, no network). Lookups score only entries that
+share at least one n-gram with the query via an inverted index, and return
+the best match at or above the similarity threshold. Entries expire after a
+TTL and the least-recently-used entry is evicted beyond max_entries.
+"""
+
+import re
+import math
+import time
+import hashlib
+from collections import Counter, OrderedDict, defaultdict
+from typing import Dict, Optional, Set
+
+_TOKEN_RE  = re.compile(r"[a-z0-9']+")
+_HASH_DIM  = 1 << 18
+_STOPWORDS = {"a", "an", "the", "my", "i", "me", "is", "are", "do", "does", "what",
+              "can", "to", "of", "for", "in", "on", "and", "please", "you", "our"}
+
+
+def embed(text: str) -> Dict[int, float]:
+    """L2-normalised sparse vector of hashed unigrams and bigrams."""
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+    grams  = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    counts = Counter(int(hashlib.md5(g.encode()).hexdigest()[:8], 16) % _HASH_DIM for g in grams)
+    norm   = math.sqrt(sum(v * v for v in counts.values())) or 1.0
+    return {k: v / norm for k, v in counts.items()}
+
+
+class SemanticCache:
+    """Near-duplicate question → answer cache with TTL and LRU eviction."""
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 2000, ttl_seconds: int = 86400):
+        self.threshold   = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries:  "OrderedDict[int, Dict]" = OrderedDict()
+        self._postings: Dict[int, Set[int]] = defaultdict(set)
+        self._next_id   = 0
+        self.counters   = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for dim in entry["vector"]:
+            ids = self._postings.get(dim)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._postings[dim]
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        """Return {"answer", "question", "similarity"} for the best match, or None."""
+        vector = embed(question)
+        scores: Dict[int, float] = defaultdict(float)
+        for dim, weight in vector.items():
+            for entry_id in self._postings.get(dim, ()):
+                scores[entry_id] += weight * self._entries[entry_id]["vector"][dim]
+
+        now = time.time()
+        for entry_id, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True):
+            if score < self.threshold:
+                break
+            entry = self._entries[entry_id]
+            if now - entry["stored_at"] > self.ttl_seconds:
+                self._remove(entry_id)
+                continue
+            self._entries.move_to_end(entry_id)
+            self.counters["hits"] += 1
+            return {"answer": entry["answer"], "question": entry["question"],
+                    "similarity": round(score, 3)}
+        self.counters["misses"] += 1
+        return None
+
+    def store(self, question: str, answer: str):
+        vector = embed(question)
+        if not vector:
+            return
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = {"question": question, "answer": answer,
+                                   "vector": vector, "stored_at": time.time()}
+        for dim in vector:
+            self._postings[dim].add(entry_id)
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._postings.clear()
+        self.counters["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {**self.counters, "entries": len(self._entries), "threshold": self.threshold,
+                "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else None}
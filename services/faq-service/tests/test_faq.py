@@ -88,4 +88,114 @@ def test_various_questions(question):
     assert response.status_code in [200, 500]
 
 
-# To run: pytest test_faq.py -v
\ No newline at end of file
+# To run: pytest test_faq.py -v
+
+# ─────────────────────────────────────────────
+# Semantic answer cache
+# ─────────────────────────────────────────────
+from semantic_cache import SemanticCache
+
+
+def test_semantic_cache_serves_near_duplicates_only():
+    cache = SemanticCache(threshold=0.85)
+    cache.store("What are the working hours?", "Mon-Fri 9AM-6PM SGT.")
+    hit = cache.lookup("what are the working hours")
+    assert hit["answer"] == "Mon-Fri 9AM-6PM SGT."
+    assert cache.lookup("What is the dress code?") is None
+    cache.store("How many sick days do I get?", "14 days per year.")
+    assert cache.lookup("How many annual leave days do I get?") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_semantic_cache_evicts_lru_and_clears():
+    cache = SemanticCache(max_entries=2)
+    cache.store("What are the working hours?", "a")
+    cache.store("What is the dress code?", "b")
+    cache.lookup("What are the working hours?")           # refresh recency
+    cache.store("Where is the office located?", "c")
+    assert cache.lookup("What is the dress code?") is None
+    assert cache.lookup("What are the working hours?")["answer"] == "a"
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_invalidate_answer_cache_endpoint():
+    response = client.post("/api/faq/cache/invalidate")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cleared"
+    assert "answer_cache" in client.get("/health").json()
+
+
+# ─────────────────────────────────────────────
+# Question log search
+# ─────────────────────────────────────────────
+@pytest.mark.asyncio
+async def test_search_question_logs_uses_text_index(monkeypatch):
+    import json
+    from types import SimpleNamespace
+    import src.main as faq_main
+
+    calls = []
+
+    class Cursor:
+        def sort(self, spec):
+            calls.append(("sort", spec))
+            return self
+
+        def limit(self, n):
+            return self
+
+        async def to_list(self, length=None):
+            return [{"question": "How do I request leave?", "timestamp": "2026-01-05", "score": 1.5}]
+
+    def find(query, projection):
+        calls.append(("find", query))
+        return Cursor()
+
+    monkeypatch.setattr(faq_main, "db", SimpleNamespace(question_logs=SimpleNamespace(find=find)))
+
+    result = json.loads(await faq_main.execute_tool("search_question_logs", {"keyword": "(a+)+$ leave"}))
+    assert result == [{"question": "How do I request leave?", "timestamp": "2026-01-05"}]
+    assert calls[0] == ("find", {"$text": {"$search": "(a+)+$ leave"}})
+    assert calls[1][1][0] == ("score", {"$meta": "textScore"})
+
+    calls.clear()
+    result = json.loads(await faq_main.execute_tool("search_question_logs", {"keyword": "  "}))
+    assert result == [{"message": "No similar questions found"}] and calls == []
+
+
+@pytest.mark.asyncio
+async def test_dependent_step_questions_bypass_answer_cache(monkeypatch):
+    """Coordinator step context carries employee-specific answers — never cache on it"""
+    import src.main as faq_main
+
+    cache = SemanticCache(threshold=0.5)
+    cache.store("What is the leave policy?", "Cached answer for someone else.")
+    loop_calls = []
+
+    async def fake_loop(**kwargs):
+        loop_calls.append(kwargs["messages"][-1]["content"])
+        return {"answer": "Fresh answer.", "tools_used": [], "final_answer": True,
+                "iterations": 1, "thoughts": []}
+
+    async def no_history(conv_id, limit=10):
+        return []
+
+    async def no_log(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(faq_main, "answer_cache", cache)
+    monkeypatch.setattr(faq_main, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(faq_main, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(faq_main, "client", object())
+    monkeypatch.setattr(faq_main, "run_react_loop", fake_loop)
+    monkeypatch.setattr(faq_main, "get_conversation_history", no_history)
+    monkeypatch.setattr(faq_main, "log_message", no_log)
+
+    question = ("What is the leave policy?\n\n"
+                "[Context from previous steps:\nLeave Agent: EMP000001 has 13 annual days left.]")
+    response = await faq_main.answer_question(faq_main.QuestionRequest(question=question))
+
+    assert response.answer == "Fresh answer." and not response.cached
+    assert loop_calls == [question]
+    assert len(cache) == 1                      # the context-bearing answer was not stored
@@ -6,18 +6,25 @@ and approve leave — not just describe how to do it.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
-import sys, os, json, uuid, traceback
+import sys, os, json, uuid, asyncio, traceback
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
-from datetime import datetime, timedelta
+from openai import AsyncOpenAI
+from datetime import datetime
 import uvicorn
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from react_engine import run_react_loop, build_react_system_prompt
+from react_engine import (run_react_loop, build_react_system_prompt, sse_stream,
+                          tool_cache_stats, shared_tool_cache, SSE_HEADERS, LLM_TIMEOUT_SECONDS)
+from mongo_indexes import ensure_indexes, index_report
+from chat_logger import ChatHistoryWriter
+from working_days import HolidayCalendar, parse_date
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -27,11 +34,19 @@ app = FastAPI(title="Leave Management Agent", description="Leave AI Agent with t
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client         = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client         = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS) if OPENAI_API_KEY else None
 MONGODB_URL    = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 DB_NAME        = os.getenv("DB_NAME", "leave_db")
+# Public holidays deducted from leave day counts when no region is given
+HOLIDAY_REGION = os.getenv("LEAVE_HOLIDAY_REGION", "SG").upper()
+# Optional JSON file of extra {"region", "date", "name"} holiday records
+HOLIDAYS_FILE  = os.getenv("LEAVE_HOLIDAYS_FILE")
 mongo_client   = None
 db             = None
+# Most request IDs accepted by one bulk approval
+BULK_APPROVE_MAX = int(os.getenv("LEAVE_BULK_APPROVE_MAX", "500"))
+# Set at startup: multi-document transactions need a replica set or mongos
+transactions_supported = False
 
 CONTEXT_MARKER = "[Prior conversation context:"
 
@@ -40,6 +55,9 @@ class LeaveQueryRequest(BaseModel):
     employee_id: Optional[str] = None
     conversation_id: Optional[str] = None
 
+class BulkApproveRequest(BaseModel):
+    request_ids: List[str]
+
 class LeaveQueryResponse(BaseModel):
     answer: str
     data: Optional[Dict] = None
@@ -121,7 +139,8 @@ LEAVE_TOOLS = [
                     "type":        {"type": "string", "enum": ["annual", "sick", "personal"], "description": "Type of leave"},
                     "start_date":  {"type": "string", "description": "Start date in YYYY-MM-DD format"},
                     "end_date":    {"type": "string", "description": "End date in YYYY-MM-DD format"},
-                    "reason":      {"type": "string", "description": "Reason for the leave request"}
+                    "reason":      {"type": "string", "description": "Reason for the leave request"},
+                    "region":      {"type": "string", "description": "Public holiday region code (defaults to the company region)"}
                 },
                 "required": ["employee_id", "type", "start_date", "end_date"]
             }
@@ -131,12 +150,13 @@ LEAVE_TOOLS = [
         "type": "function",
         "function": {
             "name": "calculate_leave_days",
-            "description": "Calculate number of working days (weekdays only) between two dates. Use this before submitting to confirm day count with the employee.",
+            "description": "Calculate number of working days (weekdays minus public holidays) between two dates. Use this before submitting to confirm day count with the employee.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "start_date": {"type": "string", "description": "YYYY-MM-DD"},
-                    "end_date":   {"type": "string", "description": "YYYY-MM-DD"}
+                    "end_date":   {"type": "string", "description": "YYYY-MM-DD"},
+                    "region":     {"type": "string", "description": "Public holiday region code, e.g. SG (defaults to the company region)"}
                 },
                 "required": ["start_date", "end_date"]
             }
@@ -155,9 +175,28 @@ LEAVE_TOOLS = [
                 "required": ["request_id"]
             }
         }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "approve_leave_requests",
+            "description": "Approve several pending leave requests at once (manager/HR action). Prefer this over repeated approve_leave_request calls; returns a result per request.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "request_ids": {"type": "array", "items": {"type": "string"}, "description": "The leave request IDs to approve"}
+                },
+                "required": ["request_ids"]
+            }
+        }
     }
 ]
 
+# Tools that write to MongoDB — never run concurrently with other tool calls
+LEAVE_MUTATING_TOOLS = {"submit_leave_request", "approve_leave_request", "approve_leave_requests"}
+
+LEAVE_TYPES = ("annual", "sick", "personal")
+
 # ─────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────
@@ -167,35 +206,211 @@ def serialize_doc(doc):
         del doc["_id"]
     return doc
 
-def _count_weekdays(start_date: str, end_date: str) -> int:
-    start = datetime.strptime(start_date, "%Y-%m-%d")
-    end   = datetime.strptime(end_date,   "%Y-%m-%d")
-    days, current = 0, start
-    while current <= end:
-        if current.weekday() < 5:
-            days += 1
-        current += timedelta(days=1)
-    return days
+holiday_calendar = HolidayCalendar()
+
+def _count_working_days(start_date: str, end_date: str, region: Optional[str] = None) -> int:
+    return holiday_calendar.working_days(parse_date(start_date), parse_date(end_date),
+                                         region or HOLIDAY_REGION)
+
+async def load_holiday_calendar():
+    """Index public holidays from the seed list, `public_holidays` and LEAVE_HOLIDAYS_FILE."""
+    holiday_calendar.load(SEED_PUBLIC_HOLIDAYS)
+    if db is not None:
+        try:
+            holiday_calendar.load(await db.public_holidays.find({}, {"_id": 0}).to_list(length=None))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load public_holidays: {str(e)}")
+    if HOLIDAYS_FILE:
+        try:
+            holiday_calendar.load_file(HOLIDAYS_FILE)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load {HOLIDAYS_FILE}: {str(e)}")
+    logger.info(f"📅 {len(holiday_calendar)} public holidays indexed for {', '.join(holiday_calendar.regions)}")
+
+# ─────────────────────────────────────────────
+# Leave approval
+# ─────────────────────────────────────────────
+async def _approve_leave(oid: ObjectId, session=None) -> Dict:
+    # Claim: only one concurrent approval of a request can flip its status
+    req = await db.leave_history.find_one_and_update(
+        {"_id": oid, "status": {"$ne": "approved"}},
+        {"$set": {"status": "approved", "approved_at": datetime.now().isoformat()}},
+        projection={"employee_id": 1, "type": 1, "days": 1, "status": 1},
+        session=session,
+    )
+    if req is None:
+        exists = await db.leave_history.count_documents({"_id": oid}, limit=1, session=session)
+        return {"error": "Already approved" if exists else "Leave request not found"}
+
+    # Deduct only if the balance still covers it — the guard is evaluated by Mongo
+    leave_type, days = req["type"], req["days"]
+    deducted = await db.leave_balances.update_one(
+        {"employee_id": req["employee_id"], f"{leave_type}.remaining": {"$gte": days}},
+        {"$inc": {f"{leave_type}.used": days, f"{leave_type}.remaining": -days}},
+        session=session,
+    )
+    if deducted.matched_count == 0:
+        # Hand the request back in the state it was claimed from
+        await db.leave_history.update_one(
+            {"_id": oid, "status": "approved"},
+            {"$set": {"status": req["status"]}, "$unset": {"approved_at": ""}},
+            session=session,
+        )
+        return {"error": f"Insufficient {leave_type} leave to approve {days} day(s)."}
+    return {"success": True, "request_id": str(oid), "status": "approved"}
+
+async def approve_leave(request_id: str) -> Dict:
+    """
+    Approve a leave request and deduct its days from the balance, atomically
+    per document: a conditional claim on the request, then a guarded $inc
+    on the balance (undone if the balance no longer covers it). Runs in a
+    transaction when the deployment supports one.
+    """
+    try:
+        oid = ObjectId(request_id)
+    except Exception:
+        return {"error": "Invalid request ID"}
+    if not transactions_supported:
+        return await _approve_leave(oid)
+    async with await mongo_client.start_session() as session:
+        # with_transaction retries transient write conflicts between approvers
+        return await session.with_transaction(lambda s: _approve_leave(oid, s))
+
+async def _approve_leaves(oids: List[ObjectId], session=None) -> Dict[ObjectId, Dict]:
+    results: Dict[ObjectId, Dict] = {}
+    cursor = db.leave_history.find({"_id": {"$in": oids}},
+                                   {"employee_id": 1, "type": 1, "days": 1, "status": 1}, session=session)
+    requests = {r["_id"]: r for r in await cursor.to_list(length=None)}
+    for oid in oids:
+        if oid not in requests:
+            results[oid] = {"error": "Leave request not found"}
+        elif requests[oid]["status"] == "approved":
+            results[oid] = {"error": "Already approved"}
+
+    # Accept requests per (employee, type) in the order given while the balance covers them
+    pending  = [requests[oid] for oid in oids if oid not in results]
+    cursor   = db.leave_balances.find({"employee_id": {"$in": list({r["employee_id"] for r in pending})}},
+                                      {"_id": 0, "employee_id": 1, **{f"{t}.remaining": 1 for t in LEAVE_TYPES}},
+                                      session=session)
+    balances = {b["employee_id"]: b for b in await cursor.to_list(length=None)}
+    groups: Dict[tuple, List[Dict]] = {}
+    totals: Dict[tuple, int] = {}
+    for r in pending:
+        key     = (r["employee_id"], r["type"])
+        balance = balances.get(r["employee_id"])
+        if balance is None:
+            results[r["_id"]] = {"error": "Employee not found"}
+        elif totals.get(key, 0) + r["days"] > balance[r["type"]]["remaining"]:
+            results[r["_id"]] = {"error": f"Insufficient {r['type']} leave to approve {r['days']} day(s)."}
+        else:
+            totals[key] = totals.get(key, 0) + r["days"]
+            groups.setdefault(key, []).append(r)
+    if not groups:
+        return results
+
+    # Claim every accepted request in one bulk_write; the batch id tells our claims apart
+    batch_id = str(uuid.uuid4())
+    accepted = [r for rs in groups.values() for r in rs]
+    claimed  = await db.leave_history.bulk_write([
+        UpdateOne({"_id": r["_id"], "status": {"$ne": "approved"}},
+                  {"$set": {"status": "approved", "approved_at": datetime.now().isoformat(),
+                            "approval_batch": batch_id}})
+        for r in accepted
+    ], ordered=False, session=session)
+    if claimed.modified_count < len(accepted):
+        # Some were approved concurrently since the read — keep only our own claims
+        cursor = db.leave_history.find({"approval_batch": batch_id}, {"_id": 1}, session=session)
+        ours   = {r["_id"] for r in await cursor.to_list(length=None)}
+        for key in list(groups):
+            for r in groups[key]:
+                if r["_id"] not in ours:
+                    results[r["_id"]] = {"error": "Already approved"}
+            groups[key] = [r for r in groups[key] if r["_id"] in ours]
+            totals[key] = sum(r["days"] for r in groups[key])
+            if not groups[key]:
+                del groups[key]
+
+    # One guarded $inc per (employee, type); a group that no longer fits is handed back
+    def deduct(employee_id: str, leave_type: str):
+        days = totals[(employee_id, leave_type)]
+        return db.leave_balances.update_one(
+            {"employee_id": employee_id, f"{leave_type}.remaining": {"$gte": days}},
+            {"$inc": {f"{leave_type}.used": days, f"{leave_type}.remaining": -days}},
+            session=session)
+
+    keys = list(groups)
+    if session is None:
+        deducted = await asyncio.gather(*(deduct(*key) for key in keys))
+    else:
+        # Operations in one transaction's session must not overlap
+        deducted = [await deduct(*key) for key in keys]
+    revert = []
+    for key, result in zip(keys, deducted):
+        for r in groups[key]:
+            if result.matched_count:
+                results[r["_id"]] = {"success": True, "request_id": str(r["_id"]),
+                                     "employee_id": r["employee_id"], "status": "approved"}
+            else:
+                results[r["_id"]] = {"error": f"Insufficient {key[1]} leave to approve {r['days']} day(s)."}
+                revert.append(UpdateOne({"_id": r["_id"], "approval_batch": batch_id},
+                                        {"$set": {"status": r["status"]},
+                                         "$unset": {"approved_at": "", "approval_batch": ""}}))
+    if revert:
+        await db.leave_history.bulk_write(revert, ordered=False, session=session)
+    return results
+
+async def approve_leaves(request_ids: List[str]) -> Dict:
+    """
+    Approve many leave requests: one $in read of the requests, one of the
+    balances, one bulk_write of status changes and one guarded $inc per
+    (employee, leave type). Returns a result per request ID, in order.
+    """
+    if len(request_ids) > BULK_APPROVE_MAX:
+        return {"error": f"At most {BULK_APPROVE_MAX} requests can be approved at once."}
+    parsed: Dict[str, Optional[ObjectId]] = {}
+    for request_id in request_ids:
+        try:
+            parsed[request_id] = ObjectId(request_id)
+        except Exception:
+            parsed[request_id] = None
+    oids = list(dict.fromkeys(oid for oid in parsed.values() if oid is not None))
+
+    outcome: Dict[ObjectId, Dict] = {}
+    if oids and transactions_supported:
+        async with await mongo_client.start_session() as session:
+            outcome = await session.with_transaction(lambda s: _approve_leaves(oids, s))
+    elif oids:
+        outcome = await _approve_leaves(oids)
+
+    results = [{"request_id": rid, **({"error": "Invalid request ID"} if oid is None else outcome[oid])}
+               for rid, oid in parsed.items()]
+    approved = sum(1 for r in results if r.get("success"))
+    return {"approved": approved, "failed": len(results) - approved, "results": results}
+
+chat_writer = ChatHistoryWriter()
 
 async def log_message(conv_id, role, message, employee_id=None, flagged=False):
     if db is None:
         return
-    try:
-        await db.chat_history.insert_one({
-            "conversation_id": conv_id, "service": "leave",
-            "employee_id": employee_id, "role": role,
-            "message": message, "flagged": flagged,
-            "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.warning(f"⚠️ log_message failed: {str(e)}")
+    # Write-behind: the background writer batches these into insert_many
+    chat_writer.enqueue({
+        "conversation_id": conv_id, "service": "leave",
+        "employee_id": employee_id, "role": role,
+        "message": message, "flagged": flagged,
+        "timestamp": datetime.now().isoformat()
+    })
 
 async def get_conversation_history(conv_id, limit=10):
     if db is None:
         return []
     try:
-        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", 1)]).limit(limit)
-        return await cursor.to_list(length=limit)
+        # Write-behind logging: make this conversation's queued messages readable first
+        await chat_writer.flush(conv_id)
+        # Newest `limit` messages via the (conversation_id, timestamp) index,
+        # then flipped back to chronological order for the prompt
+        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", -1)]).limit(limit)
+        recent = await cursor.to_list(length=limit)
+        return recent[::-1]
     except Exception as e:
         logger.warning(f"⚠️ get_history failed: {str(e)}")
         return []
@@ -232,14 +447,19 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             end_date    = tool_args["end_date"]
             reason      = tool_args.get("reason", "")
 
-            # Check balance
-            balance_doc = await db.leave_balances.find_one({"employee_id": employee_id})
+            if leave_type not in LEAVE_TYPES:
+                return json.dumps({"error": f"Unknown leave type: {leave_type}"})
+            days = _count_working_days(start_date, end_date, tool_args.get("region"))
+            if days <= 0:
+                return json.dumps({"error": "The requested dates contain no working days."})
+
+            # Balance is only read here — it is deducted, under a guard, on approval
+            balance_doc = await db.leave_balances.find_one(
+                {"employee_id": employee_id}, {"_id": 0, f"{leave_type}.remaining": 1})
             if not balance_doc:
                 return json.dumps({"error": "Employee not found"})
 
-            days      = _count_weekdays(start_date, end_date)
             remaining = balance_doc[leave_type]["remaining"]
-
             if remaining < days:
                 return json.dumps({
                     "error": f"Insufficient {leave_type} leave. Remaining: {remaining} days, requested: {days} days."
@@ -255,7 +475,13 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
                 "submitted_at": datetime.now().isoformat(),
                 "reason":       reason
             }
-            result     = await db.leave_history.insert_one(entry)
+            # The unique pending_request index turns a repeated submit into a DuplicateKeyError
+            try:
+                result = await db.leave_history.insert_one(entry)
+            except DuplicateKeyError:
+                return json.dumps({
+                    "error": f"A {leave_type} leave request for {start_date} to {end_date} is already pending."
+                })
             request_id = str(result.inserted_id)
             logger.info(f"✅ Leave request {request_id} submitted by agent")
             return json.dumps({
@@ -267,35 +493,23 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             })
 
         elif tool_name == "calculate_leave_days":
-            days = _count_weekdays(tool_args["start_date"], tool_args["end_date"])
+            region = (tool_args.get("region") or HOLIDAY_REGION).upper()
+            start  = parse_date(tool_args["start_date"])
+            end    = parse_date(tool_args["end_date"])
             return json.dumps({
                 "start_date": tool_args["start_date"],
                 "end_date":   tool_args["end_date"],
-                "working_days": days,
-                "note": "Excludes weekends. Public holidays not deducted automatically."
+                "working_days": holiday_calendar.working_days(start, end, region),
+                "public_holidays": [{"date": d, "name": n}
+                                    for d, n in holiday_calendar.holidays_between(start, end, region)],
+                "note": f"Excludes weekends and {region} public holidays."
             })
 
         elif tool_name == "approve_leave_request":
-            try:
-                oid = ObjectId(tool_args["request_id"])
-            except Exception:
-                return json.dumps({"error": "Invalid request ID"})
-
-            req = await db.leave_history.find_one({"_id": oid})
-            if not req:
-                return json.dumps({"error": "Leave request not found"})
-            if req["status"] == "approved":
-                return json.dumps({"error": "Already approved"})
-
-            await db.leave_history.update_one({"_id": oid}, {"$set": {"status": "approved"}})
-            await db.leave_balances.update_one(
-                {"employee_id": req["employee_id"]},
-                {"$inc": {
-                    f"{req['type']}.used": req["days"],
-                    f"{req['type']}.remaining": -req["days"]
-                }}
-            )
-            return json.dumps({"success": True, "request_id": tool_args["request_id"], "status": "approved"})
+            return json.dumps(await approve_leave(tool_args["request_id"]))
+
+        elif tool_name == "approve_leave_requests":
+            return json.dumps(await approve_leaves(tool_args["request_ids"]))
 
         else:
             return json.dumps({"error": f"Unknown tool: {tool_name}"})
@@ -322,25 +536,50 @@ SEED_HISTORY = [
      "start_date": "2024-12-25", "end_date": "2024-12-29",
      "days": 5, "status": "approved", "submitted_at": "2024-12-01T10:00:00"},
 ]
+SEED_PUBLIC_HOLIDAYS = [
+    {"region": "SG", "date": d, "name": n} for d, n in [
+        ("2025-01-01", "New Year's Day"), ("2025-01-29", "Chinese New Year"),
+        ("2025-01-30", "Chinese New Year"), ("2025-03-31", "Hari Raya Puasa"),
+        ("2025-04-18", "Good Friday"), ("2025-05-01", "Labour Day"),
+        ("2025-05-12", "Vesak Day"), ("2025-06-07", "Hari Raya Haji"),
+        ("2025-08-09", "National Day"), ("2025-10-20", "Deepavali"),
+        ("2025-12-25", "Christmas Day"),
+        ("2026-01-01", "New Year's Day"), ("2026-02-17", "Chinese New Year"),
+        ("2026-02-18", "Chinese New Year"), ("2026-03-21", "Hari Raya Puasa"),
+        ("2026-04-03", "Good Friday"), ("2026-05-01", "Labour Day"),
+        ("2026-05-27", "Hari Raya Haji"), ("2026-06-01", "Vesak Day (observed)"),
+        ("2026-08-10", "National Day (observed)"), ("2026-11-09", "Deepavali (observed)"),
+        ("2026-12-25", "Christmas Day"),
+    ]
+]
 
 @app.on_event("startup")
 async def startup_event():
-    global mongo_client, db
+    global mongo_client, db, transactions_supported
     logger.info("🚀 Leave Agent v2 Starting (with tool calling)")
     try:
         mongo_client = AsyncIOMotorClient(MONGODB_URL)
         db = mongo_client[DB_NAME]
-        await mongo_client.admin.command("ping")
+        hello = await mongo_client.admin.command("hello")
         logger.info("✅ MongoDB connected")
+        transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+        await ensure_indexes(db, "leave")
+        chat_writer.start(db.chat_history)
         if await db.leave_balances.count_documents({}) == 0:
             await db.leave_balances.insert_many(SEED_BALANCES)
         if await db.leave_history.count_documents({}) == 0:
             await db.leave_history.insert_many(SEED_HISTORY)
+        if await db.public_holidays.count_documents({}) == 0:
+            await db.public_holidays.insert_many([dict(h) for h in SEED_PUBLIC_HOLIDAYS])
     except Exception as e:
         logger.error(f"❌ MongoDB failed: {str(e)}")
+    await load_holiday_calendar()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if client:
+        await client.close()
+    await chat_writer.stop()
     if mongo_client:
         mongo_client.close()
 
@@ -355,13 +594,25 @@ async def health_check():
         mongo_status = "error"
     return {"status": "healthy", "service": "leave-agent", "version": "2.0.0",
             "openai_status": "configured" if OPENAI_API_KEY else "missing",
-            "mongodb_status": mongo_status, "mode": "agentic-tool-calling"}
+            "mongodb_status": mongo_status, "mode": "agentic-tool-calling",
+            "transactions": transactions_supported,
+            "chat_logger": chat_writer.stats(), "tool_cache": tool_cache_stats()}
 
 # ─────────────────────────────────────────────
 # AI Query Endpoint — Agentic Loop
 # ─────────────────────────────────────────────
 @app.post("/api/leave/query", response_model=LeaveQueryResponse)
 async def query_leave(request: LeaveQueryRequest):
+    return await answer_leave_query(request)
+
+@app.post("/api/leave/query/stream")
+async def query_leave_stream(request: LeaveQueryRequest):
+    """SSE variant: `token` events carry the Final Answer as it is generated, then `done`."""
+    async def run(emit):
+        return await answer_leave_query(request, on_token=lambda text: emit("token", {"text": text}))
+    return StreamingResponse(sse_stream(run), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def answer_leave_query(request: LeaveQueryRequest, on_token=None) -> LeaveQueryResponse:
     try:
         logger.info(f"📥 Leave query: {request.query}")
         if not client:
@@ -398,9 +649,11 @@ async def query_leave(request: LeaveQueryRequest):
             openai_client=client,
             messages=messages,
             tools=LEAVE_TOOLS,
+            mutating_tools=LEAVE_MUTATING_TOOLS,
             tool_executor=execute_tool,
             service_name="Leave",
             max_iterations=8,
+            on_token=on_token,
         )
         answer     = result["answer"]
         tools_used = result["tools_used"]
@@ -437,10 +690,24 @@ async def get_leave_history(employee_id: str):
     history = await cursor.to_list(length=100)
     return {"employee_id": employee_id, "history": [serialize_doc(h) for h in history]}
 
+@app.post("/api/leave/approve")
+async def bulk_approve_leave(request: BulkApproveRequest):
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    outcome = await approve_leaves(request.request_ids)
+    if "error" in outcome:
+        raise HTTPException(status_code=400, detail=outcome["error"])
+    # Cached balance/history tool reads of the approved employees are now stale
+    for r in outcome["results"]:
+        if r.get("success"):
+            shared_tool_cache.invalidate("Leave", {"employee_id": r["employee_id"], "request_id": r["request_id"]})
+    return outcome
+
 @app.get("/api/leave/history/chat")
 async def get_chat_history(employee_id: str, limit: int = 50):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush()
     cursor = db.chat_history.find(
         {"employee_id": employee_id, "service": "leave"}, sort=[("timestamp", -1)]
     ).limit(limit)
@@ -451,9 +718,16 @@ async def get_chat_history(employee_id: str, limit: int = 50):
 async def get_conversation(conversation_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush(conversation_id)
     cursor = db.chat_history.find({"conversation_id": conversation_id}, sort=[("timestamp", 1)])
     messages = await cursor.to_list(length=200)
     return {"conversation_id": conversation_id, "messages": [serialize_doc(m) for m in messages]}
 
+@app.get("/api/leave/admin/indexes")
+async def get_index_report():
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await index_report(db, "leave")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8004)))
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+working_days.py — Constant-time working-day counts for leave requests.
+
+count_weekdays() counts Monday–Friday dates in an inclusive range from the
+number of full weeks plus the remainder, so the cost does not grow with
+the length of the range.
+
+HolidayCalendar keeps each region's public holidays as a sorted list of
+date ordinals (weekend holidays are dropped — they are not working days
+anyway). Holidays inside a range are found with two bisects, so
+working_days() is weekdays minus holidays in O(log holidays).
+Holidays come from the `public_holidays` collection or a JSON file, as
+records of {"region", "date": "YYYY-MM-DD", "name"}.
+"""
+
+import json
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def count_weekdays(start: date, end: date) -> int:
+    """Monday–Friday dates between start and end, inclusive (0 if end < start)."""
+    if end < start:
+        return 0
+    full_weeks, extra = divmod((end - start).days + 1, 7)
+    first = start.weekday()
+    # The `extra` trailing days start on the same weekday as `start`
+    return full_weeks * 5 + sum(1 for i in range(extra) if (first + i) % 7 < 5)
+
+
+class HolidayCalendar:
+    """Per-region public holidays, bisect-indexed by date ordinal."""
+
+    def __init__(self, holidays: Iterable[Dict] = ()):
+        self._days:  Dict[str, List[int]] = {}
+        self._names: Dict[str, List[str]] = {}
+        self.load(holidays)
+
+    def load(self, holidays: Iterable[Dict]):
+        """Add holiday records and rebuild the sorted per-region index."""
+        merged: Dict[str, Dict[int, str]] = defaultdict(dict)
+        for region, days in self._days.items():
+            merged[region].update(zip(days, self._names[region]))
+        for h in holidays:
+            day = parse_date(h["date"])
+            if day.weekday() < 5:
+                merged[h["region"].upper()][day.toordinal()] = h.get("name", "Public holiday")
+        for region, by_day in merged.items():
+            ordered = sorted(by_day.items())
+            self._days[region]  = [d for d, _ in ordered]
+            self._names[region] = [n for _, n in ordered]
+
+    def load_file(self, path: str):
+        """Add the holiday records of a JSON file (a list of records)."""
+        with open(path) as f:
+            self.load(json.load(f))
+
+    @property
+    def regions(self) -> List[str]:
+        return sorted(self._days)
+
+    def holidays_between(self, start: date, end: date, region: str) -> List[Tuple[str, str]]:
+        """(date, name) of the weekday holidays in [start, end] for `region`."""
+        days = self._days.get(region.upper(), [])
+        lo   = bisect_left(days, start.toordinal())
+        hi   = bisect_right(days, end.toordinal())
+        names = self._names.get(region.upper(), [])
+        return [(date.fromordinal(days[i]).isoformat(), names[i]) for i in range(lo, hi)]
+
+    def working_days(self, start: date, end: date, region: str) -> int:
+        """Weekdays in [start, end] minus the region's public holidays on weekdays."""
+        if end < start:
+            return 0
+        days = self._days.get(region.upper(), [])
+        holidays = bisect_right(days, end.toordinal()) - bisect_left(days, start.toordinal())
+        return count_weekdays(start, end) - holidays
+
+    def __len__(self) -> int:
+        return sum(len(days) for days in self._days.values())
@@ -217,4 +217,242 @@ def test_health_includes_openai_status():
     """Test health check includes OpenAI status"""
     response = client.get("/health")
     data = response.json()
-    assert "openai_configured" in data or "openai_status" in data
\ No newline at end of file
+    assert "openai_configured" in data or "openai_status" in data
+
+def test_working_days_match_day_by_day_count():
+    """O(1) weekday count and bisect holiday lookup agree with walking every date"""
+    from datetime import date, timedelta
+    from src.working_days import HolidayCalendar, count_weekdays
+
+    calendar = HolidayCalendar([
+        {"region": "SG", "date": "2026-02-17", "name": "Chinese New Year"},
+        {"region": "SG", "date": "2026-02-18", "name": "Chinese New Year"},
+        {"region": "SG", "date": "2026-03-21", "name": "Hari Raya Puasa"},   # Saturday
+        {"region": "MY", "date": "2026-02-19", "name": "Chinese New Year"},
+    ])
+    holidays = {date(2026, 2, 17), date(2026, 2, 18)}
+    start = date(2026, 2, 9)
+    for offset in range(-1, 60):
+        end = start + timedelta(days=offset)
+        days = [start + timedelta(days=i) for i in range(offset + 1)]
+        assert count_weekdays(start, end) == sum(d.weekday() < 5 for d in days)
+        assert calendar.working_days(start, end, "sg") == \
+            sum(d.weekday() < 5 and d not in holidays for d in days)
+
+    assert calendar.holidays_between(date(2026, 2, 1), date(2026, 3, 31), "SG") == [
+        ("2026-02-17", "Chinese New Year"), ("2026-02-18", "Chinese New Year")]
+    assert calendar.working_days(date(2026, 2, 16), date(2026, 2, 20), "MY") == 4
+    assert calendar.working_days(date(2026, 2, 16), date(2026, 2, 20), "XX") == 5
+
+
+# ─────────────────────────────────────────────
+# Concurrent approvals
+# ─────────────────────────────────────────────
+class _FakeCollection:
+    """Single-document atomic ops over dicts; every call yields to the loop first."""
+
+    def __init__(self, docs, unique_pending=()):
+        self.docs = docs
+        self.unique_pending = unique_pending    # fields of a unique index partial on status "pending"
+
+    @staticmethod
+    def _get(doc, path):
+        for key in path.split("."):
+            doc = doc.get(key, {}) if isinstance(doc, dict) else None
+        return doc
+
+    def _match(self, doc, query):
+        for path, cond in query.items():
+            value = self._get(doc, path)
+            if isinstance(cond, dict):
+                if "$in" in cond and value not in cond["$in"]:
+                    return False
+                if "$ne" in cond and value == cond["$ne"]:
+                    return False
+                if "$gte" in cond and not value >= cond["$gte"]:
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    def _apply(self, doc, update):
+        for path, value in update.get("$set", {}).items():
+            doc[path] = value
+        for path in update.get("$unset", {}):
+            doc.pop(path, None)
+        for path, delta in update.get("$inc", {}).items():
+            parent, _, key = path.rpartition(".")
+            target = self._get(doc, parent) if parent else doc
+            target[key] = target.get(key, 0) + delta
+
+    async def find_one_and_update(self, query, update, projection=None, session=None):
+        import asyncio
+        await asyncio.sleep(0)
+        for doc in self.docs:
+            if self._match(doc, query):
+                before = {k: (dict(v) if isinstance(v, dict) else v) for k, v in doc.items()}
+                self._apply(doc, update)
+                return before
+        return None
+
+    async def update_one(self, query, update, session=None):
+        import asyncio
+        from types import SimpleNamespace
+        await asyncio.sleep(0)
+        for doc in self.docs:
+            if self._match(doc, query):
+                self._apply(doc, update)
+                return SimpleNamespace(matched_count=1)
+        return SimpleNamespace(matched_count=0)
+
+    async def insert_one(self, doc, session=None):
+        import asyncio
+        from types import SimpleNamespace
+        from bson import ObjectId
+        from pymongo.errors import DuplicateKeyError
+        await asyncio.sleep(0)
+        if self.unique_pending and doc.get("status") == "pending":
+            key = {field: doc.get(field) for field in self.unique_pending}
+            if any(self._match(d, {**key, "status": "pending"}) for d in self.docs):
+                raise DuplicateKeyError("E11000 duplicate key error")
+        doc.setdefault("_id", ObjectId())
+        self.docs.append(doc)
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def find_one(self, query, projection=None, session=None):
+        import asyncio
+        await asyncio.sleep(0)
+        return next((dict(doc) for doc in self.docs if self._match(doc, query)), None)
+
+    async def count_documents(self, query, limit=0, session=None):
+        return sum(self._match(doc, query) for doc in self.docs)
+
+    def find(self, query, projection=None, session=None):
+        from types import SimpleNamespace
+        matched = [dict(doc) for doc in self.docs if self._match(doc, query)]
+
+        async def to_list(length=None):
+            return matched
+        return SimpleNamespace(to_list=to_list)
+
+    async def bulk_write(self, operations, ordered=True, session=None):
+        from types import SimpleNamespace
+        modified = 0
+        for op in operations:
+            query, update = op._filter, op._doc
+            modified += (await self.update_one(query, update)).matched_count
+        return SimpleNamespace(modified_count=modified)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_approvals_never_over_deduct(monkeypatch):
+    """Hundreds of parallel approvals, many duplicated, leave a consistent balance"""
+    import asyncio
+    from types import SimpleNamespace
+    from bson import ObjectId
+    import src.main as leave_main
+
+    requests = [{"_id": ObjectId(), "employee_id": "EMP000001", "type": "annual",
+                 "days": 1 + i % 3, "status": "pending"} for i in range(150)]
+    balance = {"employee_id": "EMP000001", "annual": {"total": 60, "used": 0, "remaining": 60}}
+    fake_db = SimpleNamespace(leave_history=_FakeCollection(requests),
+                              leave_balances=_FakeCollection([balance]))
+    monkeypatch.setattr(leave_main, "db", fake_db)
+    monkeypatch.setattr(leave_main, "transactions_supported", False)
+
+    ids     = [str(r["_id"]) for r in requests] * 3
+    results = await asyncio.gather(*(leave_main.approve_leave(i) for i in ids))
+
+    approved = [r for r in requests if r["status"] == "approved"]
+    assert sum(r.get("success", False) for r in results) == len(approved)
+    assert balance["annual"]["used"] == sum(r["days"] for r in approved)
+    assert balance["annual"]["remaining"] == 60 - balance["annual"]["used"]
+    assert 0 <= balance["annual"]["remaining"] < 3
+    assert all(r["status"] in ("approved", "pending") for r in requests)
+    assert all("approved_at" not in r for r in requests if r["status"] == "pending")
+
+
+@pytest.mark.asyncio
+async def test_bulk_approval_returns_per_item_results(monkeypatch):
+    """One bulk call approves what the balance covers and reports every other ID"""
+    from types import SimpleNamespace
+    from bson import ObjectId
+    import src.main as leave_main
+
+    def leave(employee_id, days, status="pending", leave_type="annual"):
+        return {"_id": ObjectId(), "employee_id": employee_id, "type": leave_type,
+                "days": days, "status": status}
+
+    requests = [leave("EMP000001", 3), leave("EMP000001", 4), leave("EMP000001", 5),
+                leave("EMP000002", 2, leave_type="sick"), leave("EMP000002", 1, status="approved")]
+    balances = [{"employee_id": "EMP000001", "annual": {"used": 0, "remaining": 8}},
+                {"employee_id": "EMP000002", "sick": {"used": 0, "remaining": 5}}]
+    fake_db = SimpleNamespace(leave_history=_FakeCollection(requests),
+                              leave_balances=_FakeCollection(balances))
+    monkeypatch.setattr(leave_main, "db", fake_db)
+    monkeypatch.setattr(leave_main, "transactions_supported", False)
+
+    ids = [str(r["_id"]) for r in requests] + ["not-an-id", str(ObjectId())]
+    outcome = await leave_main.approve_leaves(ids)
+
+    assert [r["request_id"] for r in outcome["results"]] == ids
+    assert [bool(r.get("success")) for r in outcome["results"]] == [True, True, False, True, False, False, False]
+    assert "Insufficient" in outcome["results"][2]["error"]
+    assert outcome["results"][4]["error"] == "Already approved"
+    assert outcome["results"][5]["error"] == "Invalid request ID"
+    assert outcome["results"][6]["error"] == "Leave request not found"
+    assert (outcome["approved"], outcome["failed"]) == (3, 4)
+    assert balances[0]["annual"] == {"used": 7, "remaining": 1}
+    assert balances[1]["sick"] == {"used": 2, "remaining": 3}
+    assert [r["status"] for r in requests] == ["approved", "approved", "pending", "approved", "approved"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_submits_create_one_request(monkeypatch):
+    """A double-clicked or retried submit leaves exactly one pending request"""
+    import json
+    import asyncio
+    from types import SimpleNamespace
+    import src.main as leave_main
+
+    history = []
+    fake_db = SimpleNamespace(
+        leave_history=_FakeCollection(history, unique_pending=("employee_id", "type", "start_date", "end_date")),
+        leave_balances=_FakeCollection([{"employee_id": "EMP000001", "annual": {"used": 0, "remaining": 10}}]))
+    monkeypatch.setattr(leave_main, "db", fake_db)
+
+    args = {"employee_id": "EMP000001", "type": "annual", "start_date": "2026-03-02", "end_date": "2026-03-04"}
+    results = await asyncio.gather(*(leave_main.execute_tool("submit_leave_request", dict(args)) for _ in range(20)))
+    results = [json.loads(r) for r in results]
+
+    assert len(history) == 1 and history[0]["days"] == 3
+    assert [r["request_id"] for r in results if r.get("success")] == [str(history[0]["_id"])]
+    assert all("already pending" in r["error"] for r in results if not r.get("success"))
+
+    other = await leave_main.execute_tool("submit_leave_request", {**args, "end_date": "2026-03-05"})
+    assert json.loads(other)["success"] and len(history) == 2
+
+
+def test_rest_bulk_approval_invalidates_shared_tool_cache(monkeypatch):
+    """Approving over REST drops the approved employee's cached tool reads, not others'"""
+    from types import SimpleNamespace
+    from bson import ObjectId
+    import src.main as leave_main
+    from react_engine import SharedToolCache
+
+    request  = {"_id": ObjectId(), "employee_id": "EMP000001", "type": "annual", "days": 2, "status": "pending"}
+    balances = [{"employee_id": "EMP000001", "annual": {"used": 0, "remaining": 10}}]
+    fake_db  = SimpleNamespace(leave_history=_FakeCollection([request]),
+                               leave_balances=_FakeCollection(balances))
+    cache = SharedToolCache(ttl=60)
+    for employee_id in ("EMP000001", "EMP000002"):
+        key = ("Leave", "get_leave_balance", f'{{"employee_id":"{employee_id}"}}')
+        cache.put(key, {"employee_id": employee_id}, "{}")
+    monkeypatch.setattr(leave_main, "db", fake_db)
+    monkeypatch.setattr(leave_main, "transactions_supported", False)
+    monkeypatch.setattr(leave_main, "shared_tool_cache", cache)
+
+    response = client.post("/api/leave/approve", json={"request_ids": [str(request["_id"])]})
+    assert response.status_code == 200 and response.json()["approved"] == 1
+    assert cache.get(("Leave", "get_leave_balance", '{"employee_id":"EMP000001"}')) is None
+    assert cache.get(("Leave", "get_leave_balance", '{"employee_id":"EMP000002"}')) == "{}"
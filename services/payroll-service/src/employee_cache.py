@@ -0,0 +1,92 @@
+"""
+employee_cache.py — Bounded async LRU + TTL cache of employee documents.
+
+Every payroll tool and REST endpoint starts from the employee document, which
+changes at most monthly. get() serves it from memory; concurrent misses for
+the same employee_id share a single loader call (single flight), so a burst
+of requests issues one Mongo query.
+
+Entries expire after a TTL and the least-recently-used entry is evicted
+beyond max_entries. invalidate() drops one employee (or everything); a load
+that was already in flight when its employee was invalidated is returned to
+its callers but not stored. Callers get a copy and may mutate it freely.
+"""
+
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+
+class EmployeeCache:
+    """employee_id → employee document, with TTL, LRU eviction and single-flight loads."""
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries:  "OrderedDict[str, tuple]" = OrderedDict()   # id → (stored_at, doc)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stale:    Set[str] = set()     # in-flight loads invalidated before they finished
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, employee_id: str, loader: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """Cached document for `employee_id`, calling `loader()` on a miss. None if not found."""
+        entry = self._entries.get(employee_id)
+        if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+            self._entries.move_to_end(employee_id)
+            self.counters["hits"] += 1
+            return dict(entry[1])
+        self._entries.pop(employee_id, None)
+
+        pending = self._inflight.get(employee_id)
+        if pending is not None:
+            self.counters["coalesced"] += 1
+            doc = await asyncio.shield(pending)
+            return dict(doc) if doc is not None else None
+
+        self.counters["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[employee_id] = future
+        try:
+            doc = await loader()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()          # waiters re-raise; nobody left is fine too
+            raise
+        finally:
+            self._inflight.pop(employee_id, None)
+            stale = employee_id in self._stale
+            self._stale.discard(employee_id)
+
+        if doc is not None and not stale:
+            self._store(employee_id, doc)
+        future.set_result(doc)
+        return dict(doc) if doc is not None else None
+
+    def _store(self, employee_id: str, doc: Dict):
+        self._entries[employee_id] = (time.monotonic(), dict(doc))
+        self._entries.move_to_end(employee_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def invalidate(self, employee_id: Optional[str] = None) -> int:
+        """Drop one employee, or every entry when `employee_id` is None. Returns entries removed."""
+        self.counters["invalidations"] += 1
+        if employee_id is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._stale.update(self._inflight)
+            return removed
+        if employee_id in self._inflight:
+            self._stale.add(employee_id)
+        return 1 if self._entries.pop(employee_id, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["coalesced"]
+        return {**self.counters, "entries": len(self._entries), "ttl_seconds": self.ttl_seconds,
+                "hit_rate": round((self.counters["hits"] + self.counters["coalesced"]) / lookups, 3)
+                            if lookups else None}
@@ -5,18 +5,24 @@ Upgraded to true AI agent with OpenAI tool calling.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
-import sys, os, json, uuid, traceback
+import sys, os, json, uuid, asyncio, traceback
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from datetime import datetime
 import uvicorn
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from react_engine import run_react_loop, build_react_system_prompt
+from react_engine import (run_react_loop, build_react_system_prompt, sse_stream,
+                          tool_cache_stats, shared_tool_cache, SSE_HEADERS, LLM_TIMEOUT_SECONDS)
+from mongo_indexes import ensure_indexes, index_report
+from chat_logger import ChatHistoryWriter
+from employee_cache import EmployeeCache
+from payroll_batch import PayrollRun, run_payroll, payslip_history, PAYROLL_CHUNK_SIZE
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -26,12 +32,26 @@ app = FastAPI(title="Payroll Agent", description="Salary and Compensation AI Age
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client         = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client         = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS) if OPENAI_API_KEY else None
 MONGODB_URL    = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 DB_NAME        = os.getenv("DB_NAME", "payroll_db")
 mongo_client   = None
 db             = None
 
+# Employee documents change at most monthly — served from memory, invalidated
+# by a change stream on `employees` (replica sets) or the admin endpoint
+EMPLOYEE_CACHE_WATCH = os.getenv("EMPLOYEE_CACHE_WATCH", "true").lower() == "true"
+employee_cache = EmployeeCache(
+    max_entries=int(os.getenv("EMPLOYEE_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("EMPLOYEE_CACHE_TTL", "3600")),
+)
+employee_cache_watcher = None
+
+# Month-end payroll runs (most recent first out), kept for progress polling
+PAYROLL_RUNS_KEPT = 20
+payroll_runs: Dict[str, PayrollRun] = {}
+payroll_run_tasks = set()
+
 CONTEXT_MARKER = "[Prior conversation context:"
 
 class PayrollQueryRequest(BaseModel):
@@ -50,6 +70,11 @@ class PayslipRequest(BaseModel):
     month: Optional[str] = None
     year: Optional[int] = None
 
+class PayrollRunRequest(BaseModel):
+    month: Optional[str] = None
+    year: Optional[int] = None
+    chunk_size: Optional[int] = None
+
 PAYROLL_SENSITIVE_KEYWORDS = [
     "other employee", "everyone's salary", "salary of", "how much does",
     "retrench", "terminate", "lawsuit", "underpaid", "discrimination",
@@ -141,6 +166,12 @@ PAYROLL_TOOLS = [
     }
 ]
 
+# Tools that write to MongoDB — never run concurrently with other tool calls.
+# get_salary_history is deliberately not one: its only write is payslip_history's
+# lazy fill, a duplicate-tolerant insert of exactly the rows it returns (never an
+# overwrite), so concurrent calls store the same payslips and no read changes.
+PAYROLL_MUTATING_TOOLS = set()
+
 # ─────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────
@@ -150,29 +181,52 @@ def serialize_doc(doc):
         del doc["_id"]
     return doc
 
+chat_writer = ChatHistoryWriter()
+
 async def log_message(conv_id, role, message, employee_id=None, flagged=False):
     if db is None:
         return
-    try:
-        await db.chat_history.insert_one({
-            "conversation_id": conv_id, "service": "payroll",
-            "employee_id": employee_id, "role": role,
-            "message": message, "flagged": flagged,
-            "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.warning(f"⚠️ log_message failed: {str(e)}")
+    # Write-behind: the background writer batches these into insert_many
+    chat_writer.enqueue({
+        "conversation_id": conv_id, "service": "payroll",
+        "employee_id": employee_id, "role": role,
+        "message": message, "flagged": flagged,
+        "timestamp": datetime.now().isoformat()
+    })
 
 async def get_conversation_history(conv_id, limit=10):
     if db is None:
         return []
     try:
-        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", 1)]).limit(limit)
-        return await cursor.to_list(length=limit)
+        # Write-behind logging: make this conversation's queued messages readable first
+        await chat_writer.flush(conv_id)
+        # Newest `limit` messages via the (conversation_id, timestamp) index,
+        # then flipped back to chronological order for the prompt
+        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", -1)]).limit(limit)
+        recent = await cursor.to_list(length=limit)
+        return recent[::-1]
     except Exception as e:
         logger.warning(f"⚠️ get_history failed: {str(e)}")
         return []
 
+async def get_employee(employee_id: str) -> Optional[dict]:
+    """Employee document via the in-process cache; one find_one per miss."""
+    return await employee_cache.get(employee_id, lambda: db.employees.find_one({"employee_id": employee_id}))
+
+async def watch_employees():
+    """Invalidate cached employees from the `employees` change stream (needs a replica set)."""
+    try:
+        async with db.employees.watch(full_document="updateLookup") as stream:
+            logger.info("👀 Watching employees for cache invalidation")
+            async for change in stream:
+                employee_id = (change.get("fullDocument") or {}).get("employee_id")
+                employee_cache.invalidate(employee_id)   # None (e.g. delete) → clear all
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"⚠️ Employee change stream unavailable ({str(e)}) — "
+                       f"cache relies on TTL and /api/payroll/cache/invalidate")
+
 async def _compute_payslip(emp: dict, month: str = None, year: int = None) -> dict:
     if not month or not year:
         now   = datetime.now()
@@ -200,7 +254,7 @@ async def _compute_payslip(emp: dict, month: str = None, year: int = None) -> di
 async def execute_tool(tool_name: str, tool_args: dict) -> str:
     try:
         if tool_name == "get_employee_info":
-            emp = await db.employees.find_one({"employee_id": tool_args["employee_id"]})
+            emp = await get_employee(tool_args["employee_id"])
             if not emp:
                 return json.dumps({"error": "Employee not found"})
             emp = serialize_doc(emp)
@@ -210,7 +264,7 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             return json.dumps(emp)
 
         elif tool_name == "get_payslip":
-            emp = await db.employees.find_one({"employee_id": tool_args["employee_id"]})
+            emp = await get_employee(tool_args["employee_id"])
             if not emp:
                 return json.dumps({"error": "Employee not found"})
             payslip = await _compute_payslip(
@@ -221,25 +275,10 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             return json.dumps(payslip)
 
         elif tool_name == "get_salary_history":
-            emp = await db.employees.find_one({"employee_id": tool_args["employee_id"]})
+            emp = await get_employee(tool_args["employee_id"])
             if not emp:
                 return json.dumps({"error": "Employee not found"})
-            months = tool_args.get("months", 6)
-            history = []
-            now = datetime.now()
-            for i in range(months):
-                month_num = now.month - i
-                year = now.year
-                if month_num <= 0:
-                    month_num += 12
-                    year -= 1
-                month_date = datetime(year, month_num, 1)
-                payslip = await _compute_payslip(emp, month_date.strftime("%B"), year)
-                history.append({
-                    "month": payslip["month"], "year": payslip["year"],
-                    "gross": payslip["gross_salary"], "net": payslip["net_salary"],
-                    "payment_date": payslip["payment_date"]
-                })
+            history = await payslip_history(db, emp, tool_args.get("months", 6))
             return json.dumps({"employee_id": emp["employee_id"], "history": history})
 
         elif tool_name == "calculate_take_home":
@@ -279,21 +318,30 @@ SEED_EMPLOYEES = [
 
 @app.on_event("startup")
 async def startup_event():
-    global mongo_client, db
+    global mongo_client, db, employee_cache_watcher
     logger.info("🚀 Payroll Agent v2 Starting (with tool calling)")
     try:
         mongo_client = AsyncIOMotorClient(MONGODB_URL)
         db = mongo_client[DB_NAME]
         await mongo_client.admin.command("ping")
         logger.info("✅ MongoDB connected")
+        await ensure_indexes(db, "payroll")
+        chat_writer.start(db.chat_history)
         if await db.employees.count_documents({}) == 0:
             await db.employees.insert_many(SEED_EMPLOYEES)
             logger.info("🌱 Seeded employees")
+        if EMPLOYEE_CACHE_WATCH:
+            employee_cache_watcher = asyncio.create_task(watch_employees())
     except Exception as e:
         logger.error(f"❌ MongoDB failed: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if employee_cache_watcher:
+        employee_cache_watcher.cancel()
+    if client:
+        await client.close()
+    await chat_writer.stop()
     if mongo_client:
         mongo_client.close()
 
@@ -308,13 +356,25 @@ async def health_check():
         mongo_status = "error"
     return {"status": "healthy", "service": "payroll-agent", "version": "2.0.0",
             "openai_status": "configured" if OPENAI_API_KEY else "missing",
-            "mongodb_status": mongo_status, "mode": "agentic-tool-calling"}
+            "mongodb_status": mongo_status, "mode": "agentic-tool-calling",
+            "chat_logger": chat_writer.stats(), "tool_cache": tool_cache_stats(),
+            "employee_cache": employee_cache.stats()}
 
 # ─────────────────────────────────────────────
 # AI Query Endpoint — Agentic Loop
 # ─────────────────────────────────────────────
 @app.post("/api/payroll/query", response_model=PayrollQueryResponse)
 async def query_payroll(request: PayrollQueryRequest):
+    return await answer_payroll_query(request)
+
+@app.post("/api/payroll/query/stream")
+async def query_payroll_stream(request: PayrollQueryRequest):
+    """SSE variant: `token` events carry the Final Answer as it is generated, then `done`."""
+    async def run(emit):
+        return await answer_payroll_query(request, on_token=lambda text: emit("token", {"text": text}))
+    return StreamingResponse(sse_stream(run), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def answer_payroll_query(request: PayrollQueryRequest, on_token=None) -> PayrollQueryResponse:
     try:
         logger.info(f"📥 Payroll query: {request.query}")
         if not client:
@@ -355,9 +415,11 @@ async def query_payroll(request: PayrollQueryRequest):
             openai_client=client,
             messages=messages,
             tools=PAYROLL_TOOLS,
+            mutating_tools=PAYROLL_MUTATING_TOOLS,
             tool_executor=execute_tool,
             service_name="Payroll",
             max_iterations=8,
+            on_token=on_token,
         )
         answer     = result["answer"]
         tools_used = result["tools_used"]
@@ -379,40 +441,75 @@ async def query_payroll(request: PayrollQueryRequest):
 # ─────────────────────────────────────────────
 # Supporting Endpoints
 # ─────────────────────────────────────────────
+@app.post("/api/payroll/cache/invalidate")
+async def invalidate_employee_cache(employee_id: Optional[str] = None):
+    removed = employee_cache.invalidate(employee_id)
+    shared_tool_cache.invalidate("Payroll", {"employee_id": employee_id} if employee_id else {})
+    return {"status": "cleared", "employee_id": employee_id, "entries_removed": removed}
+
 @app.get("/api/payroll/payslip/{employee_id}")
 async def get_payslip_endpoint(employee_id: str, month: str = None, year: int = None):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
-    emp = await db.employees.find_one({"employee_id": employee_id})
+    emp = await get_employee(employee_id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     return await _compute_payslip(emp, month, year)
 
+@app.post("/api/payroll/run")
+async def start_payroll_run(request: PayrollRunRequest):
+    """
+    Start the month-end payroll run (all employees) in the background.
+    Defaults to the current month; poll GET /api/payroll/run/{run_id}.
+    """
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    now   = datetime.now()
+    month = request.month or now.strftime("%B")
+    year  = request.year or now.year
+    try:
+        datetime.strptime(month, "%B")
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid month: {month}")
+
+    for run in payroll_runs.values():
+        if run.status in ("pending", "running") and (run.month, run.year) == (month, year):
+            return run.to_dict()
+
+    run = PayrollRun(month, year, max(1, request.chunk_size or PAYROLL_CHUNK_SIZE))
+    payroll_runs[run.run_id] = run
+    while len(payroll_runs) > PAYROLL_RUNS_KEPT:
+        payroll_runs.pop(next(iter(payroll_runs)))
+    task = asyncio.create_task(run_payroll(db, run))
+    payroll_run_tasks.add(task)
+    task.add_done_callback(payroll_run_tasks.discard)
+    # The run rewrites every employee's payslip — drop all cached payroll tool reads, now and when it ends
+    shared_tool_cache.invalidate("Payroll", {})
+    task.add_done_callback(lambda _: shared_tool_cache.invalidate("Payroll", {}))
+    return run.to_dict()
+
+@app.get("/api/payroll/run/{run_id}")
+async def get_payroll_run(run_id: str):
+    run = payroll_runs.get(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Payroll run not found")
+    return run.to_dict()
+
 @app.get("/api/payroll/history/{employee_id}")
 async def get_salary_history(employee_id: str, months: int = 6):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
-    emp = await db.employees.find_one({"employee_id": employee_id})
+    emp = await get_employee(employee_id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
-    history = []
-    now = datetime.now()
-    for i in range(months):
-        month_num = now.month - i
-        year = now.year
-        if month_num <= 0:
-            month_num += 12
-            year -= 1
-        month_date = datetime(year, month_num, 1)
-        payslip = await _compute_payslip(emp, month_date.strftime("%B"), year)
-        history.append({"month": payslip["month"], "year": payslip["year"],
-                         "gross": payslip["gross_salary"], "net": payslip["net_salary"]})
+    history = await payslip_history(db, emp, months)
     return {"employee_id": employee_id, "employee_name": emp["name"], "history": history}
 
 @app.get("/api/payroll/history/chat")
 async def get_chat_history(employee_id: str, limit: int = 50):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush()
     cursor = db.chat_history.find(
         {"employee_id": employee_id, "service": "payroll"}, sort=[("timestamp", -1)]
     ).limit(limit)
@@ -423,9 +520,16 @@ async def get_chat_history(employee_id: str, limit: int = 50):
 async def get_conversation(conversation_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush(conversation_id)
     cursor = db.chat_history.find({"conversation_id": conversation_id}, sort=[("timestamp", 1)])
     messages = await cursor.to_list(length=200)
     return {"conversation_id": conversation_id, "messages": [serialize_doc(m) for m in messages]}
 
+@app.get("/api/payroll/admin/indexes")
+async def get_index_report():
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await index_report(db, "payroll")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8003)))
\ No newline at end of file
@@ -0,0 +1,176 @@
+"""
+mongo_indexes.py — Shared, declarative MongoDB index registry.
+
+Every service ships an identical copy of this file (like react_engine.py) and
+calls ensure_indexes(db, "<service>") from its startup_event. Index names are
+fixed, so re-running on every start is a no-op once the indexes exist.
+
+INDEX_REGISTRY  — the indexes each service's hot queries rely on
+HOT_QUERIES     — representative hot queries, explained by index_report()
+                  to flag any that fall back to a collection scan
+"""
+
+import logging
+from typing import Any, Dict, List
+
+from pymongo import IndexModel, TEXT
+
+logger = logging.getLogger(__name__)
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Registry
+# ─────────────────────────────────────────────────────────────────────────────
+_CHAT_HISTORY = [
+    IndexModel([("conversation_id", 1), ("timestamp", 1)], name="conversation_timestamp"),
+    IndexModel([("employee_id", 1), ("service", 1), ("timestamp", -1)], name="employee_service_timestamp"),
+    IndexModel([("service", 1), ("timestamp", -1)], name="service_timestamp"),
+]
+
+INDEX_REGISTRY: Dict[str, Dict[str, List[IndexModel]]] = {
+    "coordinator": {
+        "chat_history": _CHAT_HISTORY,
+    },
+    "faq": {
+        "chat_history": _CHAT_HISTORY + [
+            IndexModel([("user_id", 1), ("service", 1), ("timestamp", -1)], name="user_service_timestamp"),
+        ],
+        "popular_questions": [IndexModel([("views", -1)], name="views_desc")],
+        "question_logs":     [IndexModel([("timestamp", -1)], name="timestamp_desc"),
+                              IndexModel([("question", TEXT)], name="question_text")],
+    },
+    "leave": {
+        "chat_history":   _CHAT_HISTORY,
+        "leave_balances": [IndexModel([("employee_id", 1)], name="employee_id")],
+        "leave_history":  [IndexModel([("employee_id", 1), ("submitted_at", -1)], name="employee_submitted"),
+                           # At most one pending request per employee, type and date range
+                           IndexModel([("employee_id", 1), ("type", 1), ("start_date", 1), ("end_date", 1)],
+                                      name="pending_request", unique=True,
+                                      partialFilterExpression={"status": "pending"})],
+    },
+    "payroll": {
+        "chat_history": _CHAT_HISTORY,
+        "employees":    [IndexModel([("employee_id", 1)], name="employee_id")],
+        "payslips":     [IndexModel([("employee_id", 1), ("year", 1), ("month_num", 1)],
+                                    name="employee_period", unique=True),
+                         IndexModel([("year", 1), ("month_num", 1)], name="period")],
+    },
+    "performance": {
+        "chat_history":          _CHAT_HISTORY,
+        "goals":                 [IndexModel([("employee_id", 1)], name="employee_id")],
+        "performance_reviews":   [IndexModel([("employee_id", 1), ("date", -1)], name="employee_date")],
+        "performance_summaries": [IndexModel([("employee_id", 1)], name="employee_id", unique=True)],
+    },
+    "recruitment": {
+        "chat_history": _CHAT_HISTORY,
+        "job_openings": [
+            IndexModel([("status", 1), ("department", 1)], name="status_department"),
+            IndexModel([("status", 1), ("posted", -1)], name="status_posted"),
+        ],
+    },
+}
+
+HOT_QUERIES: Dict[str, List[Dict[str, Any]]] = {
+    "coordinator": [
+        {"collection": "chat_history", "filter": {"conversation_id": "x"}, "sort": {"timestamp": -1}},
+        {"collection": "chat_history", "filter": {"employee_id": "x", "service": "coordinator"},
+         "sort": {"timestamp": -1}},
+    ],
+    "faq": [
+        {"collection": "chat_history", "filter": {"conversation_id": "x"}, "sort": {"timestamp": -1}},
+        {"collection": "chat_history", "filter": {"user_id": "x", "service": "faq"}, "sort": {"timestamp": -1}},
+        {"collection": "popular_questions", "filter": {}, "sort": {"views": -1}},
+        {"collection": "question_logs", "filter": {"$text": {"$search": "x"}}},
+    ],
+    "leave": [
+        {"collection": "chat_history", "filter": {"conversation_id": "x"}, "sort": {"timestamp": -1}},
+        {"collection": "leave_balances", "filter": {"employee_id": "x"}},
+        {"collection": "leave_history", "filter": {"employee_id": "x"}, "sort": {"submitted_at": -1}},
+    ],
+    "payroll": [
+        {"collection": "chat_history", "filter": {"conversation_id": "x"}, "sort": {"timestamp": -1}},
+        {"collection": "employees", "filter": {"employee_id": "x"}},
+        {"collection": "payslips", "filter": {"employee_id": "x"}, "sort": {"year": -1, "month_num": -1}},
+    ],
+    "performance": [
+        {"collection": "chat_history", "filter": {"conversation_id": "x"}, "sort": {"timestamp": -1}},
+        {"collection": "goals", "filter": {"employee_id": "x"}},
+        {"collection": "performance_reviews", "filter": {"employee_id": "x"}},
+        {"collection": "performance_summaries", "filter": {"employee_id": "x"}},
+    ],
+    "recruitment": [
+        {"collection": "chat_history", "filter": {"conversation_id": "x"}, "sort": {"timestamp": -1}},
+        {"collection": "chat_history", "filter": {"service": "recruitment"}, "sort": {"timestamp": -1}},
+        {"collection": "job_openings", "filter": {"status": "open"}, "sort": {"posted": -1}},
+    ],
+}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Provisioning
+# ─────────────────────────────────────────────────────────────────────────────
+async def ensure_indexes(db, service: str) -> Dict[str, List[str]]:
+    """
+    Create every registered index for `service`. Idempotent; one
+    createIndexes round-trip per collection. Failures are logged per
+    collection and never block startup.
+    """
+    created = {}
+    for collection, indexes in INDEX_REGISTRY.get(service, {}).items():
+        try:
+            created[collection] = await db[collection].create_indexes(indexes)
+        except Exception as e:
+            logger.warning(f"⚠️ Index provisioning failed on {collection}: {str(e)}")
+    logger.info(f"🗂️ Indexes ensured for {service}: {created}")
+    return created
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────────────────────────────────────
+def _plan_stages(plan: Dict) -> List[str]:
+    """Flatten the stage names of an explain() winningPlan tree."""
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            stages += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def index_report(db, service: str) -> Dict:
+    """
+    Per-collection index usage ($indexStats) plus an explain() of each hot
+    query, flagging unused indexes and queries planned as COLLSCAN.
+    """
+    collections = {}
+    for collection in INDEX_REGISTRY.get(service, {}):
+        try:
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(length=100)
+            usage = {s["name"]: {"ops": s["accesses"]["ops"], "since": str(s["accesses"]["since"])}
+                     for s in stats}
+            collections[collection] = {
+                "indexes": usage,
+                "unused":  [name for name, u in usage.items() if u["ops"] == 0 and name != "_id_"],
+            }
+        except Exception as e:
+            collections[collection] = {"error": str(e)}
+
+    queries = []
+    for hot in HOT_QUERIES.get(service, []):
+        command = {"find": hot["collection"], "filter": hot["filter"]}
+        if hot.get("sort"):
+            command["sort"] = hot["sort"]
+        try:
+            explain = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            stages  = _plan_stages(explain["queryPlanner"]["winningPlan"])
+            queries.append({**hot, "stages": stages, "collection_scan": "COLLSCAN" in stages})
+        except Exception as e:
+            queries.append({**hot, "error": str(e)})
+
+    return {
+        "service": service,
+        "collections": collections,
+        "hot_queries": queries,
+        "collection_scans": [q for q in queries if q.get("collection_scan")],
+    }
@@ -0,0 +1,263 @@
+"""
+payroll_batch.py — Vectorized month-end payroll run.
+
+run_payroll() streams `employees` from Mongo in chunks (projected to the
+fields a payslip needs), computes gross / tax / CPF / insurance / net for the
+whole chunk as NumPy column operations, and upserts the chunk's payslips with
+one unordered bulk_write into `payslips`. Progress is kept on a PayrollRun.
+
+compute_payslips() is the pure per-chunk step; each payslip carries the same
+fields and numbers as _compute_payslip() in main.py, plus `month_num` and
+`run_id` so a month's payslips can be range-queried and traced to their run.
+
+payslip_history() serves salary history from the stored payslips with one
+indexed range query, computing (and storing) only the months still missing.
+"""
+
+import os
+import uuid
+import logging
+import calendar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+PAYROLL_CHUNK_SIZE = int(os.getenv("PAYROLL_CHUNK_SIZE", "5000"))
+
+EMPLOYEE_FIELDS = {"_id": 0, "employee_id": 1, "name": 1, "monthly_salary": 1,
+                   "tax_rate": 1, "cpf_rate": 1, "insurance": 1, "currency": 1}
+
+HISTORY_FIELDS = {"_id": 0, "month": 1, "year": 1, "month_num": 1,
+                  "gross_salary": 1, "net_salary": 1, "payment_date": 1}
+
+# Upper bound on months of history served in one request
+HISTORY_MAX_MONTHS = int(os.getenv("PAYROLL_HISTORY_MAX_MONTHS", "1200"))
+
+_DUPLICATE_KEY = 11000
+
+
+def payment_date(year: int, month_num: int) -> str:
+    return f"{year}-{month_num:02d}-25"
+
+
+def compute_payslips(employees: List[Dict], month: str, year: int,
+                     run_id: Optional[str] = None) -> List[Dict]:
+    """Payslips for a chunk of employee documents, computed column-wise."""
+    if not employees:
+        return []
+    month_num = datetime.strptime(month, "%B").month
+    count     = len(employees)
+    gross     = np.fromiter((e["monthly_salary"] for e in employees), dtype=np.float64, count=count)
+    tax_rate  = np.fromiter((e["tax_rate"] for e in employees), dtype=np.float64, count=count)
+    cpf_rate  = np.fromiter((e["cpf_rate"] for e in employees), dtype=np.float64, count=count)
+    insurance = np.fromiter((e["insurance"] for e in employees), dtype=np.float64, count=count)
+
+    tax   = gross * tax_rate
+    cpf   = gross * cpf_rate
+    total = tax + cpf + insurance
+    net   = gross - total
+
+    paid_on = payment_date(year, month_num)
+    return [
+        {
+            "employee_id":   emp["employee_id"],
+            "employee_name": emp["name"],
+            "month": month, "year": year, "month_num": month_num,
+            "gross_salary": g,
+            "deductions": {"income_tax": t, "cpf": c, "insurance": i, "total": d},
+            "net_salary": n,
+            "currency": emp["currency"],
+            "payment_date": paid_on,
+            "run_id": run_id,
+        }
+        for emp, g, t, c, i, d, n in zip(employees, gross.tolist(), tax.tolist(), cpf.tolist(),
+                                         insurance.tolist(), total.tolist(), net.tolist())
+    ]
+
+
+async def insert_payslips(collection, payslips: List[Dict]) -> int:
+    """
+    insert_many(ordered=False) that tolerates payslips already stored for the
+    same (employee, year, month) — returns how many were new.
+    """
+    if not payslips:
+        return 0
+    try:
+        result = await collection.insert_many(payslips, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != _DUPLICATE_KEY for err in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
+async def upsert_payslips(collection, payslips: List[Dict]) -> int:
+    """
+    Replace-or-insert each payslip on its (employee, year, month) key with one
+    unordered bulk_write — returns how many were written.
+    """
+    if not payslips:
+        return 0
+    result = await collection.bulk_write(
+        [ReplaceOne({"employee_id": p["employee_id"], "year": p["year"], "month_num": p["month_num"]},
+                    p, upsert=True) for p in payslips],
+        ordered=False,
+    )
+    return result.upserted_count + result.matched_count
+
+
+class PayrollRun:
+    """Progress of one month-end payroll run."""
+
+    def __init__(self, month: str, year: int, chunk_size: int = PAYROLL_CHUNK_SIZE):
+        self.run_id      = str(uuid.uuid4())
+        self.month       = month
+        self.year        = year
+        self.chunk_size  = chunk_size
+        self.status      = "pending"
+        self.total       = 0
+        self.processed   = 0
+        self.written     = 0
+        self.removed     = 0
+        self.chunks      = 0
+        self.error: Optional[str] = None
+        self.started_at  = datetime.now()
+        self.finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = ((self.finished_at or datetime.now()) - self.started_at).total_seconds()
+        return {
+            "run_id": self.run_id, "month": self.month, "year": self.year,
+            "status": self.status, "total": self.total, "processed": self.processed,
+            "written": self.written, "removed": self.removed,
+            "chunks": self.chunks, "chunk_size": self.chunk_size,
+            "progress": round(self.processed / self.total, 3) if self.total else None,
+            "employees_per_second": round(self.processed / elapsed, 1) if elapsed > 0 else None,
+            "error": self.error,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+async def run_payroll(db, run: PayrollRun) -> PayrollRun:
+    """
+    Compute and store every employee's payslip for run.month / run.year.
+    Each chunk replaces the month's stored payslips (an earlier run's, or a
+    lazily filled one) in place, so a failed run never leaves the month
+    emptier than before. Once every employee is written, the month's
+    payslips of employees that no longer exist are removed.
+    """
+    run.status = "running"
+    month_num  = datetime.strptime(run.month, "%B").month
+    logger.info(f"🧾 Payroll run {run.run_id} for {run.month} {run.year} started")
+
+    async def flush(chunk: List[Dict]):
+        payslips     = compute_payslips(chunk, run.month, run.year, run.run_id)
+        run.written += await upsert_payslips(db.payslips, payslips)
+        run.processed += len(chunk)
+        run.chunks    += 1
+
+    try:
+        run.total = await db.employees.count_documents({})
+        cursor = db.employees.find({}, EMPLOYEE_FIELDS, batch_size=run.chunk_size)
+        chunk: List[Dict] = []
+        async for emp in cursor:
+            chunk.append(emp)
+            if len(chunk) == run.chunk_size:
+                await flush(chunk)
+                chunk = []
+        if chunk:
+            await flush(chunk)
+        stale = await db.payslips.delete_many(
+            {"year": run.year, "month_num": month_num, "run_id": {"$ne": run.run_id}})
+        run.removed = stale.deleted_count
+        run.status  = "completed"
+    except Exception as e:
+        run.status = "failed"
+        run.error  = str(e)
+        logger.error(f"❌ Payroll run {run.run_id} failed: {str(e)}")
+    finally:
+        run.finished_at = datetime.now()
+    logger.info(f"🧾 Payroll run {run.run_id}: {run.status}, {run.processed}/{run.total} employees")
+    return run
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Salary history
+# ─────────────────────────────────────────────────────────────────────────────
+def recent_periods(months: int, now: Optional[datetime] = None) -> List[Tuple[int, int]]:
+    """(year, month_num) for the last `months` months, newest first."""
+    now   = now or datetime.now()
+    index = now.year * 12 + now.month - 1
+    count = max(0, min(months, HISTORY_MAX_MONTHS))
+    return [(year, month0 + 1) for year, month0 in (divmod(index - i, 12) for i in range(count))]
+
+
+def compute_employee_payslips(emp: Dict, periods: List[Tuple[int, int]]) -> List[Dict]:
+    """
+    One employee's payslips for several (year, month_num) periods. Pay is
+    derived from the current salary record, so it is computed once and
+    stamped onto each period.
+    """
+    gross = emp["monthly_salary"]
+    tax   = gross * emp["tax_rate"]
+    cpf   = gross * emp["cpf_rate"]
+    ins   = emp["insurance"]
+    total = tax + cpf + ins
+    return [
+        {
+            "employee_id":   emp["employee_id"],
+            "employee_name": emp["name"],
+            "month": calendar.month_name[month_num], "year": year, "month_num": month_num,
+            "gross_salary": gross,
+            "deductions": {"income_tax": tax, "cpf": cpf, "insurance": ins, "total": total},
+            "net_salary": gross - total,
+            "currency": emp["currency"],
+            "payment_date": payment_date(year, month_num),
+            "run_id": None,
+        }
+        for year, month_num in periods
+    ]
+
+
+async def payslip_history(db, emp: Dict, months: int, now: Optional[datetime] = None) -> List[Dict]:
+    """
+    The last `months` payslips of `emp`, newest first, as history rows
+    {month, year, gross, net, payment_date}.
+
+    One range query on the (employee_id, year, month_num) index reads what
+    payroll runs stored; months with no stored payslip are computed from the
+    current salary and written back with one insert_many, so the next
+    request finds them. At most two round-trips regardless of `months`.
+    """
+    periods = recent_periods(months, now)
+    if not periods:
+        return []
+    cursor = db.payslips.find(
+        {"employee_id": emp["employee_id"],
+         "year": {"$gte": periods[-1][0], "$lte": periods[0][0]}},
+        HISTORY_FIELDS,
+    )
+    stored = {(p["year"], p["month_num"]): p for p in await cursor.to_list(length=None)}
+
+    missing = [period for period in periods if period not in stored]
+    if missing:
+        filled = compute_employee_payslips(emp, missing)
+        try:
+            await insert_payslips(db.payslips, [dict(p) for p in filled])
+        except Exception as e:
+            logger.warning(f"⚠️ Could not store filled payslips for {emp['employee_id']}: {str(e)}")
+        stored.update({(p["year"], p["month_num"]): p for p in filled})
+
+    rows = []
+    for period in periods:
+        p = stored[period]
+        rows.append({"month": p["month"], "year": p["year"], "gross": p["gross_salary"],
+                     "net": p["net_salary"], "payment_date": p["payment_date"]})
+    return rows
@@ -128,4 +128,194 @@ def test_invalid_employee():
     """
     response = client.get("/api/payroll/history/INVALID999")
 
-    assert response.status_code in [200, 404]
\ No newline at end of file
+    assert response.status_code in [200, 404]
+
+# ─────────────────────────────────────────────
+# Employee document cache
+# ─────────────────────────────────────────────
+import asyncio
+from src.employee_cache import EmployeeCache
+
+
+@pytest.mark.asyncio
+async def test_employee_cache_single_flight_and_invalidation():
+    """
+    Test: concurrent misses share one load; invalidation during a load
+    keeps the (possibly stale) result out of the cache
+    """
+    loads = []
+
+    def loader(employee_id):
+        async def load():
+            loads.append(employee_id)
+            await asyncio.sleep(0.01)
+            return {"employee_id": employee_id, "monthly_salary": 8000}
+        return load
+
+    cache = EmployeeCache(max_entries=10, ttl_seconds=60)
+    docs = await asyncio.gather(*[cache.get("EMP000001", loader("EMP000001")) for _ in range(5)])
+    assert loads == ["EMP000001"]
+    assert all(d == docs[0] for d in docs)
+
+    docs[0]["monthly_salary"] = 0          # callers get copies
+    assert (await cache.get("EMP000001", loader("EMP000001")))["monthly_salary"] == 8000
+
+    pending = asyncio.create_task(cache.get("EMP000002", loader("EMP000002")))
+    await asyncio.sleep(0)
+    cache.invalidate("EMP000002")
+    await pending
+    await cache.get("EMP000002", loader("EMP000002"))
+    assert loads.count("EMP000002") == 2
+
+    stats = cache.stats()
+    assert stats["coalesced"] == 4 and stats["hits"] == 1
+    assert cache.invalidate() == 2 and len(cache) == 0
+
+
+# ─────────────────────────────────────────────
+# Vectorized payroll run
+# ─────────────────────────────────────────────
+from src.main import _compute_payslip, SEED_EMPLOYEES
+from src.payroll_batch import compute_payslips
+
+
+@pytest.mark.asyncio
+async def test_batch_payslips_match_per_employee_computation():
+    """
+    Test: compute_payslips() over a chunk gives the same payslip as
+    _compute_payslip() for each employee
+    """
+    batch = compute_payslips(SEED_EMPLOYEES, "March", 2025, run_id="run-1")
+    assert len(batch) == len(SEED_EMPLOYEES)
+    for emp, payslip in zip(SEED_EMPLOYEES, batch):
+        expected = await _compute_payslip(emp, "March", 2025)
+        assert payslip.pop("month_num") == 3
+        assert payslip.pop("run_id") == "run-1"
+        assert payslip == expected
+    assert compute_payslips([], "March", 2025) == []
+
+
+# ─────────────────────────────────────────────
+# Salary history from stored payslips
+# ─────────────────────────────────────────────
+from datetime import datetime
+from types import SimpleNamespace
+from src.payroll_batch import payslip_history, recent_periods
+
+
+class _FakePayslips:
+    def __init__(self, docs):
+        self.docs, self.finds, self.inserts = list(docs), 0, 0
+
+    def find(self, query, projection):
+        self.finds += 1
+        low, high = query["year"]["$gte"], query["year"]["$lte"]
+        hits = [dict(d) for d in self.docs
+                if d["employee_id"] == query["employee_id"] and low <= d["year"] <= high]
+
+        async def to_list(length=None):
+            return hits
+        return SimpleNamespace(to_list=to_list)
+
+    async def insert_many(self, docs, ordered=True):
+        self.inserts += 1
+        self.docs.extend(docs)
+        return SimpleNamespace(inserted_ids=list(range(len(docs))))
+
+
+@pytest.mark.asyncio
+async def test_salary_history_reads_stored_payslips_and_fills_gaps_once():
+    """
+    Test: history is one range query plus at most one insert, whatever
+    `months` is; stored payslips win over recomputation
+    """
+    emp = SEED_EMPLOYEES[0]
+    now = datetime(2025, 2, 10)
+    assert recent_periods(3, now) == [(2025, 2), (2025, 1), (2024, 12)]
+
+    stored = compute_payslips([{**emp, "monthly_salary": 9000}], "January", 2025)
+    db = SimpleNamespace(payslips=_FakePayslips(stored))
+
+    history = await payslip_history(db, emp, 24, now)
+    assert len(history) == 24
+    assert [(h["month"], h["year"]) for h in history[:3]] == [("February", 2025), ("January", 2025),
+                                                               ("December", 2024)]
+    assert history[1]["gross"] == 9000 and history[0]["gross"] == emp["monthly_salary"]
+    assert history[0]["payment_date"] == "2025-02-25"
+    assert (db.payslips.finds, db.payslips.inserts) == (1, 1)
+
+    assert await payslip_history(db, emp, 24, now) == history
+    assert (db.payslips.finds, db.payslips.inserts) == (2, 1)
+
+
+# ─────────────────────────────────────────────
+# Month-end payroll run
+# ─────────────────────────────────────────────
+from src.payroll_batch import PayrollRun, run_payroll
+
+
+class _FakeEmployees:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def count_documents(self, query):
+        return len(self.docs)
+
+    def find(self, query, projection, batch_size=None):
+        async def cursor():
+            for doc in self.docs:
+                yield dict(doc)
+        return cursor()
+
+
+class _FakeMonthPayslips:
+    """Payslips keyed on (employee_id, year, month_num), as the unique index enforces."""
+
+    def __init__(self, docs, fail_on_call=None):
+        self.docs  = {(d["employee_id"], d["year"], d["month_num"]): d for d in docs}
+        self.calls, self.fail_on_call = 0, fail_on_call
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("primary stepped down")
+        upserted = matched = 0
+        for op in operations:
+            key = (op._filter["employee_id"], op._filter["year"], op._filter["month_num"])
+            matched, upserted = matched + (key in self.docs), upserted + (key not in self.docs)
+            self.docs[key] = dict(op._doc)
+        return SimpleNamespace(upserted_count=upserted, matched_count=matched)
+
+    async def delete_many(self, query):
+        stale = [k for k, d in self.docs.items() if d["year"] == query["year"]
+                 and d["month_num"] == query["month_num"] and d["run_id"] != query["run_id"]["$ne"]]
+        for k in stale:
+            del self.docs[k]
+        return SimpleNamespace(deleted_count=len(stale))
+
+
+@pytest.mark.asyncio
+async def test_payroll_run_replaces_in_place_and_removes_departed_employees():
+    """
+    Test: a run overwrites earlier-run and lazily filled payslips, drops the
+    month's payslips of departed employees, and a failed run deletes nothing
+    """
+    employees = [{**emp, "monthly_salary": emp["monthly_salary"] + 100} for emp in SEED_EMPLOYEES]
+    earlier   = compute_payslips(SEED_EMPLOYEES, "March", 2025, run_id="old-run")
+    departed  = compute_payslips([{**SEED_EMPLOYEES[0], "employee_id": "EMP999999"}], "March", 2025, "old-run")
+    earlier[1]["run_id"] = None                     # filled lazily by salary history
+    previous  = earlier + departed
+
+    failing = SimpleNamespace(employees=_FakeEmployees(employees),
+                              payslips=_FakeMonthPayslips(previous, fail_on_call=2))
+    run = await run_payroll(failing, PayrollRun("March", 2025, chunk_size=1))
+    assert run.status == "failed" and len(failing.payslips.docs) == len(previous)
+
+    db  = SimpleNamespace(employees=_FakeEmployees(employees), payslips=_FakeMonthPayslips(previous))
+    run = await run_payroll(db, PayrollRun("March", 2025, chunk_size=2))
+    assert run.status == "completed"
+    assert run.written == run.processed == len(employees) and run.removed == 1
+    assert {d["employee_id"] for d in db.payslips.docs.values()} == {e["employee_id"] for e in employees}
+    assert all(d["run_id"] == run.run_id for d in db.payslips.docs.values())
+    assert all(d["gross_salary"] == e["monthly_salary"]
+               for e in employees for d in db.payslips.docs.values() if d["employee_id"] == e["employee_id"])
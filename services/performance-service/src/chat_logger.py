@@ -0,0 +1,157 @@
+"""
+chat_logger.py — Write-behind, batched chat_history persistence.
+
+Every service ships an identical copy of this file (like react_engine.py).
+log_message() only enqueues the record; a background task drains the
+bounded queue and writes with insert_many once `batch_size` records are
+waiting or `flush_interval` seconds have passed, whichever comes first.
+Chat persistence therefore never adds a Mongo round-trip to a response.
+
+When the queue is full, or the writer is not running, new records are
+dropped (and counted) rather than slowing requests down. stop() flushes
+everything still queued, so call it from the shutdown handler before
+closing the Mongo client.
+
+A record is only readable once its batch is written, up to
+`flush_interval` later. Readers that need their own conversation's latest
+messages call flush(conversation_id) first; it returns at once unless
+that conversation has records queued or in flight.
+"""
+
+import os
+import asyncio
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHAT_LOG_QUEUE_SIZE     = int(os.getenv("CHAT_LOG_QUEUE_SIZE", "10000"))
+CHAT_LOG_BATCH_SIZE     = int(os.getenv("CHAT_LOG_BATCH_SIZE", "100"))
+CHAT_LOG_FLUSH_INTERVAL = float(os.getenv("CHAT_LOG_FLUSH_INTERVAL", "0.25"))
+
+_STOP = object()
+
+
+class ChatHistoryWriter:
+    """Bounded queue + background insert_many flusher for chat_history records."""
+
+    def __init__(self, max_queue: int = CHAT_LOG_QUEUE_SIZE, batch_size: int = CHAT_LOG_BATCH_SIZE,
+                 flush_interval: float = CHAT_LOG_FLUSH_INTERVAL):
+        self.batch_size     = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._collection: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"enqueued": 0, "written": 0, "batches": 0, "dropped": 0, "failed": 0}
+        self._pending: Counter = Counter()      # conversation_id → records queued or in flight
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, collection: Any):
+        self._collection = collection
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, doc: Dict) -> bool:
+        """Queue one record without waiting. Returns False if it was dropped."""
+        if not self.running:
+            self.counters["dropped"] += 1
+            logger.warning("⚠️ chat_history writer not running — message dropped")
+            return False
+        try:
+            self._queue.put_nowait(doc)
+        except asyncio.QueueFull:
+            self.counters["dropped"] += 1
+            logger.warning("⚠️ chat_history queue full — message dropped")
+            return False
+        self.counters["enqueued"] += 1
+        self._pending[doc.get("conversation_id")] += 1
+        return True
+
+    async def flush(self, conversation_id: Optional[str] = None):
+        """
+        Wait until every record enqueued so far is written (or has failed).
+        With a conversation_id, return at once if none of its records are pending.
+        """
+        if not self.running or not (self._pending[conversation_id] if conversation_id else +self._pending):
+            return
+        # A marker queued behind the pending records; _run writes its batch early when it arrives
+        marker = asyncio.get_running_loop().create_future()
+        await self._queue.put(marker)
+        await asyncio.shield(marker)
+
+    async def _flush(self, batch: List[Dict]):
+        if not batch:
+            return
+        try:
+            await self._collection.insert_many(batch, ordered=False)
+            self.counters["written"] += len(batch)
+            self.counters["batches"] += 1
+        except Exception as e:
+            self.counters["failed"] += len(batch)
+            logger.warning(f"⚠️ chat_history flush of {len(batch)} failed: {str(e)}")
+        finally:
+            self._pending.subtract(doc.get("conversation_id") for doc in batch)
+            self._pending = +self._pending
+
+    @staticmethod
+    def _release(markers: List[asyncio.Future]):
+        for marker in markers:
+            if not marker.done():
+                marker.set_result(None)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            if isinstance(first, asyncio.Future):
+                self._release([first])      # everything before it is already written
+                continue
+            batch    = [first]
+            markers  = []
+            deadline = loop.time() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                if isinstance(item, asyncio.Future):
+                    markers.append(item)
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            self._release(markers)
+            if stopping:
+                return
+
+    async def stop(self):
+        """Flush everything queued so far and stop the background task."""
+        if not self.running:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        leftover, markers = [], []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if isinstance(item, asyncio.Future):
+                markers.append(item)
+            elif item is not _STOP:
+                leftover.append(item)
+        for i in range(0, len(leftover), self.batch_size):
+            await self._flush(leftover[i:i + self.batch_size])
+        self._release(markers)
+
+    def stats(self) -> Dict:
+        return {**self.counters, "queue_depth": self._queue.qsize(), "running": self.running}
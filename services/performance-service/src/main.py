@@ -4,18 +4,23 @@ Performance KPI Agent - AI Agent with tool calling.
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
 import sys, os, json, uuid, traceback
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from datetime import datetime
 import uvicorn
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo import ReturnDocument
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from react_engine import run_react_loop, build_react_system_prompt
+from react_engine import (run_react_loop, build_react_system_prompt, sse_stream,
+                          tool_cache_stats, SSE_HEADERS, LLM_TIMEOUT_SECONDS)
+from mongo_indexes import ensure_indexes, index_report
+from chat_logger import ChatHistoryWriter
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -25,11 +30,15 @@ app = FastAPI(title="Performance Agent", description="Performance AI Agent with
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client         = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client         = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS) if OPENAI_API_KEY else None
 MONGODB_URL    = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 DB_NAME        = os.getenv("DB_NAME", "performance_db")
 mongo_client   = None
 db             = None
+# Progress notes kept per goal — older ones are dropped as new ones are pushed
+GOAL_NOTES_MAX = int(os.getenv("GOAL_NOTES_MAX", "50"))
+# Stored performance summaries older than this are recomputed on read
+SUMMARY_MAX_AGE_SECONDS = int(os.getenv("PERFORMANCE_SUMMARY_MAX_AGE", "3600"))
 
 CONTEXT_MARKER = "[Prior conversation context:"
 
@@ -161,6 +170,9 @@ PERFORMANCE_TOOLS = [
     }
 ]
 
+# Tools that write to MongoDB — never run concurrently with other tool calls
+PERFORMANCE_MUTATING_TOOLS = {"create_goal", "update_goal_progress"}
+
 # ─────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────
@@ -170,29 +182,97 @@ def serialize_doc(doc):
         del doc["_id"]
     return doc
 
+chat_writer = ChatHistoryWriter()
+
 async def log_message(conv_id, role, message, employee_id=None, flagged=False):
     if db is None:
         return
-    try:
-        await db.chat_history.insert_one({
-            "conversation_id": conv_id, "service": "performance",
-            "employee_id": employee_id, "role": role,
-            "message": message, "flagged": flagged,
-            "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.warning(f"⚠️ log_message failed: {str(e)}")
+    # Write-behind: the background writer batches these into insert_many
+    chat_writer.enqueue({
+        "conversation_id": conv_id, "service": "performance",
+        "employee_id": employee_id, "role": role,
+        "message": message, "flagged": flagged,
+        "timestamp": datetime.now().isoformat()
+    })
 
 async def get_conversation_history(conv_id, limit=10):
     if db is None:
         return []
     try:
-        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", 1)]).limit(limit)
-        return await cursor.to_list(length=limit)
+        # Write-behind logging: make this conversation's queued messages readable first
+        await chat_writer.flush(conv_id)
+        # Newest `limit` messages via the (conversation_id, timestamp) index,
+        # then flipped back to chronological order for the prompt
+        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", -1)]).limit(limit)
+        recent = await cursor.to_list(length=limit)
+        return recent[::-1]
     except Exception as e:
         logger.warning(f"⚠️ get_history failed: {str(e)}")
         return []
 
+# ─────────────────────────────────────────────
+# Performance summary
+# ─────────────────────────────────────────────
+def summary_pipeline(employee_id: str) -> List[Dict]:
+    """
+    One aggregation over `goals` returning the whole summary: goal stats and
+    needs-attention titles via $facet, and the review count plus the rating
+    of the most recent review (by date) via a $lookup sub-pipeline.
+    """
+    return [
+        {"$match": {"employee_id": employee_id}},
+        {"$facet": {
+            "goals": [{"$group": {
+                "_id": None,
+                "total":        {"$sum": 1},
+                "avg_progress": {"$avg": "$progress"},
+                "on_track":     {"$sum": {"$cond": [{"$eq": ["$status", "on-track"]}, 1, 0]}},
+            }}],
+            "needs_attention": [{"$match": {"status": "needs-attention"}}, {"$project": {"_id": 0, "title": 1}}],
+        }},
+        {"$lookup": {
+            "from": "performance_reviews",
+            "pipeline": [
+                {"$match": {"employee_id": employee_id}},
+                {"$sort": {"date": -1}},
+                {"$group": {"_id": None, "total": {"$sum": 1}, "latest_rating": {"$first": "$rating"}}},
+            ],
+            "as": "reviews",
+        }},
+        {"$project": {
+            "_id": 0,
+            "employee_id":     {"$literal": employee_id},
+            "total_goals":     {"$ifNull": [{"$arrayElemAt": ["$goals.total", 0]}, 0]},
+            "avg_progress":    {"$ifNull": [{"$arrayElemAt": ["$goals.avg_progress", 0]}, 0]},
+            "latest_rating":   {"$arrayElemAt": ["$reviews.latest_rating", 0]},
+            "on_track":        {"$ifNull": [{"$arrayElemAt": ["$goals.on_track", 0]}, 0]},
+            "needs_attention": "$needs_attention.title",
+            "total_reviews":   {"$ifNull": [{"$arrayElemAt": ["$reviews.total", 0]}, 0]},
+        }},
+    ]
+
+async def refresh_performance_summary(employee_id: str) -> Dict:
+    """Recompute an employee's summary and store it in `performance_summaries`."""
+    rows    = await db.goals.aggregate(summary_pipeline(employee_id)).to_list(length=1)
+    summary = rows[0]
+    summary["avg_progress"] = round(summary["avg_progress"], 1)
+    summary.setdefault("latest_rating", None)
+    await db.performance_summaries.replace_one(
+        {"employee_id": employee_id},
+        {**summary, "computed_at": datetime.now().isoformat()},
+        upsert=True,
+    )
+    return summary
+
+async def get_performance_summary(employee_id: str) -> Dict:
+    """The stored summary (one indexed read), recomputed when missing or stale."""
+    doc = await db.performance_summaries.find_one({"employee_id": employee_id}, {"_id": 0})
+    if doc is not None:
+        age = (datetime.now() - datetime.fromisoformat(doc.pop("computed_at"))).total_seconds()
+        if age <= SUMMARY_MAX_AGE_SECONDS:
+            return doc
+    return await refresh_performance_summary(employee_id)
+
 # ─────────────────────────────────────────────
 # Tool Executor
 # ─────────────────────────────────────────────
@@ -221,6 +301,7 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             }
             result  = await db.goals.insert_one(goal)
             goal_id = str(result.inserted_id)
+            await refresh_performance_summary(goal["employee_id"])
             logger.info(f"✅ Goal created: {goal_id}")
             return json.dumps({"success": True, "goal_id": goal_id,
                                "message": f"Goal '{tool_args['title']}' created successfully."})
@@ -238,36 +319,21 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             update   = {"$set": {"progress": progress, "status": status}}
             if tool_args.get("note"):
                 update["$push"] = {"notes": {
-                    "date": datetime.now().isoformat(),
-                    "note": tool_args["note"]
+                    "$each":  [{"date": datetime.now().isoformat(), "note": tool_args["note"]}],
+                    "$slice": -GOAL_NOTES_MAX,
                 }}
 
-            await db.goals.update_one({"_id": oid}, update)
-            updated = await db.goals.find_one({"_id": oid})
+            # One round-trip; the notes history stays out of the model's context
+            updated = await db.goals.find_one_and_update(
+                {"_id": oid}, update, projection={"notes": 0}, return_document=ReturnDocument.AFTER)
             if not updated:
                 return json.dumps({"error": "Goal not found"})
+            await refresh_performance_summary(updated["employee_id"])
             return json.dumps({"success": True, "goal": serialize_doc(updated),
                                "message": f"Goal updated to {progress}% — status: {status}"})
 
         elif tool_name == "get_performance_summary":
-            goals_cursor   = db.goals.find({"employee_id": tool_args["employee_id"]})
-            goals          = await goals_cursor.to_list(length=100)
-            reviews_cursor = db.performance_reviews.find({"employee_id": tool_args["employee_id"]})
-            reviews        = await reviews_cursor.to_list(length=10)
-
-            avg_progress   = (sum(g["progress"] for g in goals) / len(goals)) if goals else 0
-            latest_rating  = reviews[0]["rating"] if reviews else None
-            needs_attention = [g["title"] for g in goals if g.get("status") == "needs-attention"]
-
-            return json.dumps({
-                "employee_id":       tool_args["employee_id"],
-                "total_goals":       len(goals),
-                "avg_progress":      round(avg_progress, 1),
-                "latest_rating":     latest_rating,
-                "on_track":          sum(1 for g in goals if g.get("status") == "on-track"),
-                "needs_attention":   needs_attention,
-                "total_reviews":     len(reviews)
-            })
+            return json.dumps(await get_performance_summary(tool_args["employee_id"]))
 
         else:
             return json.dumps({"error": f"Unknown tool: {tool_name}"})
@@ -306,6 +372,8 @@ async def startup_event():
         db = mongo_client[DB_NAME]
         await mongo_client.admin.command("ping")
         logger.info("✅ MongoDB connected")
+        await ensure_indexes(db, "performance")
+        chat_writer.start(db.chat_history)
         if await db.goals.count_documents({}) == 0:
             await db.goals.insert_many(SEED_GOALS)
         if await db.performance_reviews.count_documents({}) == 0:
@@ -315,6 +383,9 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if client:
+        await client.close()
+    await chat_writer.stop()
     if mongo_client:
         mongo_client.close()
 
@@ -329,13 +400,24 @@ async def health_check():
         mongo_status = "error"
     return {"status": "healthy", "service": "performance-agent", "version": "2.0.0",
             "openai_status": "configured" if OPENAI_API_KEY else "missing",
-            "mongodb_status": mongo_status, "mode": "agentic-tool-calling"}
+            "mongodb_status": mongo_status, "mode": "agentic-tool-calling",
+            "chat_logger": chat_writer.stats(), "tool_cache": tool_cache_stats()}
 
 # ─────────────────────────────────────────────
 # AI Query Endpoint — Agentic Loop
 # ─────────────────────────────────────────────
 @app.post("/api/performance/query", response_model=PerformanceQueryResponse)
 async def query_performance(request: PerformanceQueryRequest):
+    return await answer_performance_query(request)
+
+@app.post("/api/performance/query/stream")
+async def query_performance_stream(request: PerformanceQueryRequest):
+    """SSE variant: `token` events carry the Final Answer as it is generated, then `done`."""
+    async def run(emit):
+        return await answer_performance_query(request, on_token=lambda text: emit("token", {"text": text}))
+    return StreamingResponse(sse_stream(run), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def answer_performance_query(request: PerformanceQueryRequest, on_token=None) -> PerformanceQueryResponse:
     try:
         logger.info(f"📥 Performance query: {request.query}")
         if not client:
@@ -372,9 +454,11 @@ async def query_performance(request: PerformanceQueryRequest):
             openai_client=client,
             messages=messages,
             tools=PERFORMANCE_TOOLS,
+            mutating_tools=PERFORMANCE_MUTATING_TOOLS,
             tool_executor=execute_tool,
             service_name="Performance",
             max_iterations=8,
+            on_token=on_token,
         )
         answer     = result["answer"]
         tools_used = result["tools_used"]
@@ -403,6 +487,12 @@ async def get_goals(employee_id: str):
     avg    = sum(g["progress"] for g in goals) / len(goals) if goals else 0
     return {"employee_id": employee_id, "goals": goals, "total": len(goals), "avg_progress": round(avg, 1)}
 
+@app.get("/api/performance/summary")
+async def get_summary(employee_id: str):
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await get_performance_summary(employee_id)
+
 @app.get("/api/performance/reviews")
 async def get_reviews(employee_id: str):
     if db is None:
@@ -418,6 +508,7 @@ async def get_reviews(employee_id: str):
 async def get_chat_history(employee_id: str, limit: int = 50):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush()
     cursor = db.chat_history.find(
         {"employee_id": employee_id, "service": "performance"}, sort=[("timestamp", -1)]
     ).limit(limit)
@@ -428,9 +519,16 @@ async def get_chat_history(employee_id: str, limit: int = 50):
 async def get_conversation(conversation_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush(conversation_id)
     cursor = db.chat_history.find({"conversation_id": conversation_id}, sort=[("timestamp", 1)])
     messages = await cursor.to_list(length=200)
     return {"conversation_id": conversation_id, "messages": [serialize_doc(m) for m in messages]}
 
+@app.get("/api/performance/admin/indexes")
+async def get_index_report():
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await index_report(db, "performance")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8006)))
\ No newline at end of file
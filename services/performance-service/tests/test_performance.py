@@ -288,4 +288,155 @@ def test_performance_review_periods():
     data = response.json()
 
     for review in data["reviews"]:
-        assert "period" in review or "date" in review or "year" in review
\ No newline at end of file
+        assert "period" in review or "date" in review or "year" in review
+
+# ============================================================
+# PERFORMANCE SUMMARY
+# ============================================================
+
+@pytest.mark.asyncio
+async def test_performance_summary_is_a_point_read_until_stale(monkeypatch):
+    """
+    A fresh stored summary is served as-is; a stale one is recomputed with
+    the single aggregation and written back.
+    """
+    from datetime import datetime, timedelta
+    from types import SimpleNamespace
+    import src.main as perf_main
+
+    calls = []
+    stored = {"employee_id": "EMP000001", "total_goals": 1, "avg_progress": 75.0, "latest_rating": 4.5,
+              "on_track": 1, "needs_attention": [], "total_reviews": 1,
+              "computed_at": datetime.now().isoformat()}
+    fresh = {**stored, "total_goals": 2, "avg_progress": 57.5, "needs_attention": ["Mentor Junior Developers"]}
+
+    async def find_one(query, projection):
+        calls.append("find_one")
+        return dict(stored)
+
+    def aggregate(pipeline):
+        calls.append(("aggregate", [next(iter(stage)) for stage in pipeline]))
+
+        async def to_list(length):
+            return [{k: v for k, v in fresh.items() if k != "computed_at"}]
+        return SimpleNamespace(to_list=to_list)
+
+    async def replace_one(query, doc, upsert=False):
+        calls.append("replace_one")
+
+    monkeypatch.setattr(perf_main, "db", SimpleNamespace(
+        performance_summaries=SimpleNamespace(find_one=find_one, replace_one=replace_one),
+        goals=SimpleNamespace(aggregate=aggregate)))
+
+    summary = await perf_main.get_performance_summary("EMP000001")
+    assert summary["total_goals"] == 1 and calls == ["find_one"]
+
+    calls.clear()
+    stored["computed_at"] = (datetime.now() - timedelta(seconds=perf_main.SUMMARY_MAX_AGE_SECONDS + 1)).isoformat()
+    summary = await perf_main.get_performance_summary("EMP000001")
+    assert summary["needs_attention"] == ["Mentor Junior Developers"]
+    assert calls == ["find_one", ("aggregate", ["$match", "$facet", "$lookup", "$project"]), "replace_one"]
+
+
+class _AsyncCollection:
+    """Awaitable facade over a mongomock collection for the summary helpers."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def aggregate(self, pipeline):
+        from types import SimpleNamespace
+        db, stages = self.collection.database, []
+        for stage in pipeline:
+            # mongomock lacks $lookup sub-pipelines; an uncorrelated one is its result, attached
+            lookup = stage.get("$lookup", {})
+            if "pipeline" in lookup:
+                rows  = list(db[lookup["from"]].aggregate(lookup["pipeline"]))
+                stage = {"$addFields": {lookup["as"]: {"$literal": rows}}}
+            stages.append(stage)
+        rows = list(self.collection.aggregate(stages))
+
+        async def to_list(length=None):
+            return rows[:length]
+        return SimpleNamespace(to_list=to_list)
+
+    async def find_one(self, query, projection=None):
+        return self.collection.find_one(query, projection)
+
+    async def replace_one(self, query, doc, upsert=False):
+        return self.collection.replace_one(query, doc, upsert=upsert)
+
+
+@pytest.mark.asyncio
+async def test_performance_summary_pipeline_results(monkeypatch):
+    """
+    summary_pipeline run for real (mongomock): latest_rating follows the
+    review date, not insertion order; needs_attention lists titles; an
+    employee without goals or reviews still gets a zeroed summary.
+    """
+    from types import SimpleNamespace
+    import mongomock
+    import src.main as perf_main
+
+    mock = mongomock.MongoClient().perf
+    mock.goals.insert_many([
+        {"employee_id": "EMP000001", "title": "Ship Q1",   "progress": 80,    "status": "on-track"},
+        {"employee_id": "EMP000001", "title": "Mentor",    "progress": 35.25, "status": "needs-attention"},
+        {"employee_id": "EMP000001", "title": "Docs",      "progress": 10,    "status": "needs-attention"},
+        {"employee_id": "EMP000002", "title": "Elsewhere", "progress": 0,     "status": "needs-attention"},
+    ])
+    mock.performance_reviews.insert_many([
+        {"employee_id": "EMP000001", "date": "2024-12-31", "rating": 3.5},
+        {"employee_id": "EMP000001", "date": "2025-06-30", "rating": 4.5},
+        {"employee_id": "EMP000001", "date": "2023-06-30", "rating": 2.0},
+        {"employee_id": "EMP000002", "date": "2026-01-31", "rating": 1.0},
+    ])
+    monkeypatch.setattr(perf_main, "db", SimpleNamespace(
+        goals=_AsyncCollection(mock.goals), performance_summaries=_AsyncCollection(mock.performance_summaries)))
+
+    summary = await perf_main.get_performance_summary("EMP000001")
+    assert summary == {"employee_id": "EMP000001", "total_goals": 3, "avg_progress": 41.8,
+                       "latest_rating": 4.5, "on_track": 1, "needs_attention": ["Mentor", "Docs"],
+                       "total_reviews": 3}
+    assert mock.performance_summaries.count_documents({"employee_id": "EMP000001"}) == 1
+
+    empty = await perf_main.get_performance_summary("EMP000099")
+    assert empty == {"employee_id": "EMP000099", "total_goals": 0, "avg_progress": 0,
+                     "latest_rating": None, "on_track": 0, "needs_attention": [], "total_reviews": 0}
+
+
+@pytest.mark.asyncio
+async def test_update_goal_progress_is_one_capped_round_trip(monkeypatch):
+    """
+    Progress updates are a single find_one_and_update that caps the notes
+    history and keeps it out of the returned goal.
+    """
+    import json
+    from types import SimpleNamespace
+    from bson import ObjectId
+    import src.main as perf_main
+
+    goal_id = ObjectId()
+    calls   = []
+
+    async def find_one_and_update(query, update, projection=None, return_document=None):
+        calls.append((query, update, projection, return_document))
+        return {"_id": goal_id, "employee_id": "EMP000001", "title": "Ship Q1", "progress": 85, "status": "on-track"}
+
+    async def refresh(employee_id):
+        calls.append(("refresh", employee_id))
+
+    monkeypatch.setattr(perf_main, "db", SimpleNamespace(goals=SimpleNamespace(find_one_and_update=find_one_and_update)))
+    monkeypatch.setattr(perf_main, "refresh_performance_summary", refresh)
+
+    result = json.loads(await perf_main.execute_tool(
+        "update_goal_progress", {"goal_id": str(goal_id), "progress": 85, "note": "Demo done"}))
+
+    assert result["goal"]["status"] == "on-track" and "notes" not in result["goal"]
+    query, update, projection, return_document = calls[0]
+    assert query == {"_id": goal_id}
+    assert update["$set"] == {"progress": 85, "status": "on-track"}
+    assert update["$push"]["notes"]["$slice"] == -perf_main.GOAL_NOTES_MAX
+    assert update["$push"]["notes"]["$each"][0]["note"] == "Demo done"
+    assert projection == {"notes": 0} and return_document == perf_main.ReturnDocument.AFTER
+    assert calls[1] == ("refresh", "EMP000001")
@@ -0,0 +1,214 @@
+"""
+job_index.py — In-memory inverted index over job openings.
+
+Jobs are tokenised from title, department, location, skills and description
+(weighted in that order of importance) into postings token → {job_id: tf}.
+Department, location, status and skill are also kept as facets
+(value → set of job ids), so filters are set intersections instead of
+$regex scans.
+
+search() intersects the facet filters, ranks the remaining jobs with BM25
+against the free-text query (or newest first without one) and pages through
+them with an opaque keyset cursor. The cursor carries the last (score,
+posted, id) key plus the corpus statistics page one was scored with (query
+term IDFs, average length), and later pages re-score with those, so an
+already-ranked job keeps its score — and its place — while jobs are added
+or removed. add() / remove() keep the index current as postings are
+created; rebuild() reloads it wholesale.
+"""
+
+import re
+import json
+import math
+import base64
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+FIELD_WEIGHTS = {"title": 3.0, "skills": 2.5, "department": 2.0, "location": 1.5, "description": 1.0}
+FACETS        = ("department", "location", "status")
+HIT_FIELDS    = ("id", "title", "department", "location", "type", "experience",
+                 "skills", "salary_range", "status", "posted")
+
+_TOKEN = re.compile(r"[a-z0-9+#]+")
+_K1, _B = 1.2, 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _encode_cursor(key: Tuple, idf: Dict[str, float], avg_len: float) -> str:
+    payload = {"key": list(key), "idf": idf, "avg": avg_len}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[Tuple, Dict[str, float], float]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        score, posted, job_id = payload["key"]
+        idf = {str(t): float(v) for t, v in payload["idf"].items()}
+        return (float(score), int(posted), str(job_id)), idf, float(payload["avg"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+class JobIndex:
+    """Inverted index + facets over job openings, keyed by the job's string id."""
+
+    def __init__(self):
+        self._jobs:     Dict[str, Dict] = {}
+        self._lengths:  Dict[str, float] = {}
+        self._tokens:   Dict[str, List[str]] = {}
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._facets:   Dict[str, Dict[str, Set[str]]] = {f: defaultdict(set) for f in FACETS + ("skill",)}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    # ── Maintenance ─────────────────────────────────────────────────────────
+    def rebuild(self, jobs: Iterable[Dict]):
+        """Replace the whole index with `jobs`."""
+        fresh = JobIndex()
+        for job in jobs:
+            fresh.add(job)
+        self.__dict__.update(fresh.__dict__)
+
+    def add(self, job: Dict):
+        """Index (or re-index) one job document; `_id` or `id` identifies it."""
+        job    = {k: v for k, v in job.items() if k != "_id"} | {"id": str(job.get("_id", job.get("id")))}
+        job_id = job["id"]
+        self.remove(job_id)
+
+        weights: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            value = job.get(field) or ""
+            text  = " ".join(value) if isinstance(value, list) else str(value)
+            for token in tokenize(text):
+                weights[token] += weight
+        for token, tf in weights.items():
+            self._postings[token][job_id] = tf
+        self._tokens[job_id]  = list(weights)
+        self._lengths[job_id] = sum(weights.values())
+        self._total_length   += self._lengths[job_id]
+
+        for facet in FACETS:
+            self._facets[facet][str(job.get(facet, "")).lower()].add(job_id)
+        for skill in job.get("skills") or []:
+            self._facets["skill"][skill.lower()].add(job_id)
+        self._jobs[job_id] = job
+
+    def remove(self, job_id: str):
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return
+        for token in self._tokens.pop(job_id):
+            self._postings[token].pop(job_id, None)
+            if not self._postings[token]:
+                del self._postings[token]
+        self._total_length -= self._lengths.pop(job_id)
+        values = [(facet, str(job.get(facet, "")).lower()) for facet in FACETS]
+        values += [("skill", skill.lower()) for skill in job.get("skills") or []]
+        for facet, value in values:
+            ids = self._facets[facet].get(value)
+            if ids is not None:
+                ids.discard(job_id)
+                if not ids:
+                    del self._facets[facet][value]
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    # ── Querying ────────────────────────────────────────────────────────────
+    def _facet_match(self, facet: str, value: str, exact: bool = False) -> Set[str]:
+        """Ids whose facet equals `value` — or contains it, case-insensitively."""
+        value = value.lower().strip()
+        if exact:
+            return set(self._facets[facet].get(value, ()))
+        return set().union(*(ids for v, ids in self._facets[facet].items() if value in v))
+
+    def corpus_stats(self, tokens: List[str]) -> Tuple[Dict[str, float], float]:
+        """Current IDF of each query token and the average job length."""
+        count = len(self._jobs)
+        idf = {}
+        for token in set(tokens):
+            df = len(self._postings.get(token, ()))
+            idf[token] = math.log(1 + (count - df + 0.5) / (df + 0.5)) if df else 0.0
+        return idf, (self._total_length / count if count else 0.0)
+
+    def _bm25(self, candidates: Set[str], idf: Dict[str, float], avg_len: float) -> Dict[str, float]:
+        scores: Dict[str, float] = defaultdict(float)
+        for token, weight in idf.items():
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            for job_id, tf in postings.items():
+                if job_id in candidates:
+                    norm = _K1 * (1 - _B + _B * self._lengths[job_id] / avg_len) if avg_len else _K1
+                    scores[job_id] += weight * tf * (_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query: str = "", department: Optional[str] = None, location: Optional[str] = None,
+               skills: Optional[List[str]] = None, status: Optional[str] = "open",
+               limit: int = 10, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Filtered, ranked page of jobs. department / location match as
+        case-insensitive substrings, skills must all be present, status is
+        exact (None for any). Returns {total, jobs, next_cursor, facets}.
+        """
+        candidates = set(self._jobs)
+        if status:
+            candidates &= self._facet_match("status", status, exact=True)
+        if department:
+            candidates &= self._facet_match("department", department)
+        if location:
+            candidates &= self._facet_match("location", location)
+        for skill in skills or []:
+            candidates &= self._facet_match("skill", skill, exact=True)
+
+        # Later pages score with page one's corpus statistics, so ranked jobs keep their keys
+        tokens = tokenize(query or "")
+        after  = None
+        if cursor:
+            after, idf, avg_len = _decode_cursor(cursor)
+        if not cursor or set(idf) != set(tokens):
+            idf, avg_len = self.corpus_stats(tokens)
+        if tokens:
+            scores = self._bm25(candidates, idf, avg_len)
+            candidates = set(scores)
+        else:
+            scores = {}
+
+        # Sort key ascending: best score, then newest posting, then id
+        ranked = sorted((-round(scores.get(j, 0.0), 6), -_posted_key(self._jobs[j].get("posted")), j)
+                        for j in candidates)
+        start = bisect_right(ranked, after) if after else 0
+        page  = ranked[start:start + limit]
+
+        facets = {facet: defaultdict(int) for facet in ("department", "location")}
+        for job_id in candidates:
+            for facet in facets:
+                facets[facet][self._jobs[job_id].get(facet, "")] += 1
+        return {
+            "total": len(candidates),
+            "jobs": [{**self.get(job_id), "score": round(-score, 3)} if tokens else self.get(job_id)
+                     for score, _, job_id in page],
+            "next_cursor": _encode_cursor(page[-1], idf, avg_len) if start + limit < len(ranked) else None,
+            "facets": {facet: dict(counts) for facet, counts in facets.items()},
+        }
+
+
+def _posted_key(posted: Any) -> int:
+    """YYYY-MM-DD as an int (20250201) for ordering; 0 if missing or malformed."""
+    digits = str(posted or "").replace("-", "")
+    return int(digits) if digits.isdigit() else 0
+
+
+def compact_hit(job: Dict) -> Dict:
+    """The fields a search result needs; full details come from get_job_details."""
+    hit = {field: job[field] for field in HIT_FIELDS if field in job}
+    if "score" in job:
+        hit["score"] = job["score"]
+    return hit
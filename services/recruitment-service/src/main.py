@@ -2,20 +2,26 @@
 Recruitment Agent - AI Agent with tool calling.
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, List
-import sys, os, json, uuid, traceback
+import sys, os, json, uuid, asyncio, traceback
 from dotenv import load_dotenv
 import logging
-from openai import OpenAI
+from openai import AsyncOpenAI
 from datetime import datetime
 import uvicorn
 from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from react_engine import run_react_loop, build_react_system_prompt
+from react_engine import (run_react_loop, build_react_system_prompt, sse_stream,
+                          tool_cache_stats, shared_tool_cache, SSE_HEADERS, LLM_TIMEOUT_SECONDS)
+from mongo_indexes import ensure_indexes, index_report
+from chat_logger import ChatHistoryWriter
+from job_index import JobIndex, compact_hit
+from recruitment_stats import job_opened, job_closed, reconcile_stats, read_stats
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -25,12 +31,22 @@ app = FastAPI(title="Recruitment Agent", description="Hiring AI Agent with tool
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-client         = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+client         = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT_SECONDS) if OPENAI_API_KEY else None
 MONGODB_URL    = os.getenv("DATABASE_URL", "mongodb://localhost:27017")
 DB_NAME        = os.getenv("DB_NAME", "recruitment_db")
 mongo_client   = None
 db             = None
 
+# In-memory job search index, kept current by create_job_posting and
+# reloaded every JOB_INDEX_REFRESH_SECONDS to pick up writes made elsewhere
+job_index                 = JobIndex()
+job_index_watcher         = None
+JOB_INDEX_REFRESH_SECONDS = int(os.getenv("JOB_INDEX_REFRESH_SECONDS", "300"))
+JOB_SEARCH_PAGE_SIZE      = int(os.getenv("JOB_SEARCH_PAGE_SIZE", "10"))
+# The recruitment_stats summary is recomputed this often to repair drift
+STATS_RECONCILE_SECONDS   = int(os.getenv("RECRUITMENT_STATS_RECONCILE_SECONDS", "900"))
+stats_reconciler          = None
+
 CONTEXT_MARKER = "[Prior conversation context:"
 
 class RecruitmentQueryRequest(BaseModel):
@@ -38,6 +54,9 @@ class RecruitmentQueryRequest(BaseModel):
     context: Optional[str] = None
     conversation_id: Optional[str] = None
 
+class JobStatusUpdate(BaseModel):
+    status: str
+
 class RecruitmentQueryResponse(BaseModel):
     answer: str
     data: Optional[Dict] = None
@@ -87,13 +106,16 @@ RECRUITMENT_TOOLS = [
         "type": "function",
         "function": {
             "name": "search_job_openings",
-            "description": "Search for open job positions, optionally filtered by department or location. Returns a list of matching jobs.",
+            "description": "Search job positions by keywords (title, skills, description), optionally filtered by department, location or required skills. Returns a ranked page of compact matches; use get_job_details for the full posting.",
             "parameters": {
                 "type": "object",
                 "properties": {
+                    "query":      {"type": "string", "description": "Free-text keywords, e.g. 'python machine learning' (optional)"},
                     "department": {"type": "string", "description": "Filter by department name (optional)"},
                     "location":   {"type": "string", "description": "Filter by location (optional)"},
-                    "status":     {"type": "string", "enum": ["open", "closed", "all"], "description": "Filter by job status (default: open)"}
+                    "skills":     {"type": "array", "items": {"type": "string"}, "description": "Skills every match must list (optional)"},
+                    "status":     {"type": "string", "enum": ["open", "closed", "all"], "description": "Filter by job status (default: open)"},
+                    "cursor":     {"type": "string", "description": "next_cursor from a previous search, to fetch the next page"}
                 },
                 "required": []
             }
@@ -144,6 +166,9 @@ RECRUITMENT_TOOLS = [
     }
 ]
 
+# Tools that write to MongoDB — never run concurrently with other tool calls
+RECRUITMENT_MUTATING_TOOLS = {"create_job_posting"}
+
 # ─────────────────────────────────────────────
 # Helpers
 # ─────────────────────────────────────────────
@@ -153,47 +178,85 @@ def serialize_doc(doc):
         del doc["_id"]
     return doc
 
+chat_writer = ChatHistoryWriter()
+
 async def log_message(conv_id, role, message, user_id=None, flagged=False):
     if db is None:
         return
-    try:
-        await db.chat_history.insert_one({
-            "conversation_id": conv_id, "service": "recruitment",
-            "user_id": user_id, "role": role, "message": message,
-            "flagged": flagged, "timestamp": datetime.now().isoformat()
-        })
-    except Exception as e:
-        logger.warning(f"⚠️ log_message failed: {str(e)}")
+    # Write-behind: the background writer batches these into insert_many
+    chat_writer.enqueue({
+        "conversation_id": conv_id, "service": "recruitment",
+        "user_id": user_id, "role": role, "message": message,
+        "flagged": flagged, "timestamp": datetime.now().isoformat()
+    })
 
 async def get_conversation_history(conv_id, limit=10):
     if db is None:
         return []
     try:
-        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", 1)]).limit(limit)
-        return await cursor.to_list(length=limit)
+        # Write-behind logging: make this conversation's queued messages readable first
+        await chat_writer.flush(conv_id)
+        # Newest `limit` messages via the (conversation_id, timestamp) index,
+        # then flipped back to chronological order for the prompt
+        cursor = db.chat_history.find({"conversation_id": conv_id}, sort=[("timestamp", -1)]).limit(limit)
+        recent = await cursor.to_list(length=limit)
+        return recent[::-1]
     except Exception as e:
         logger.warning(f"⚠️ get_history failed: {str(e)}")
         return []
 
+async def refresh_job_index():
+    jobs = await db.job_openings.find({}).to_list(length=None)
+    job_index.rebuild(jobs)
+    logger.info(f"🔎 Job index rebuilt: {len(job_index)} openings")
+
+async def reconcile_stats_periodically():
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_SECONDS)
+        try:
+            await reconcile_stats(db)
+        except Exception as e:
+            logger.warning(f"⚠️ Recruitment stats reconciliation failed: {str(e)}")
+
+async def set_job_status(job_id: str, status: str) -> Optional[Dict]:
+    """Change a job's status, keeping the search index and the stats summary in step."""
+    before = await db.job_openings.find_one_and_update({"_id": ObjectId(job_id)}, {"$set": {"status": status}})
+    if before is None:
+        return None
+    job = {**before, "status": status}
+    job_index.add(job)
+    if before.get("status") == "open" and status != "open":
+        await job_closed(db, job)
+    elif before.get("status") != "open" and status == "open":
+        await job_opened(db, job)
+    return job
+
+async def watch_job_openings():
+    while True:
+        await asyncio.sleep(JOB_INDEX_REFRESH_SECONDS)
+        try:
+            await refresh_job_index()
+        except Exception as e:
+            logger.warning(f"⚠️ Job index refresh failed: {str(e)}")
+
 # ─────────────────────────────────────────────
 # Tool Executor
 # ─────────────────────────────────────────────
 async def execute_tool(tool_name: str, tool_args: dict) -> str:
     try:
         if tool_name == "search_job_openings":
-            query_filter = {}
             status = tool_args.get("status", "open")
-            if status != "all":
-                query_filter["status"] = status
-            if tool_args.get("department"):
-                query_filter["department"] = {"$regex": tool_args["department"], "$options": "i"}
-            if tool_args.get("location"):
-                query_filter["location"] = {"$regex": tool_args["location"], "$options": "i"}
-
-            cursor = db.job_openings.find(query_filter)
-            jobs   = await cursor.to_list(length=50)
-            jobs   = [serialize_doc(j) for j in jobs]
-            return json.dumps({"total": len(jobs), "jobs": jobs})
+            result = job_index.search(
+                query=tool_args.get("query", ""),
+                department=tool_args.get("department"),
+                location=tool_args.get("location"),
+                skills=tool_args.get("skills"),
+                status=None if status == "all" else status,
+                limit=JOB_SEARCH_PAGE_SIZE,
+                cursor=tool_args.get("cursor"),
+            )
+            return json.dumps({"total": result["total"], "jobs": [compact_hit(j) for j in result["jobs"]],
+                               "next_cursor": result["next_cursor"], "facets": result["facets"]})
 
         elif tool_name == "get_job_details":
             try:
@@ -206,21 +269,12 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
             return json.dumps(serialize_doc(job))
 
         elif tool_name == "get_recruitment_stats":
-            total     = await db.job_openings.count_documents({"status": "open"})
-            pipeline  = [
-                {"$match": {"status": "open"}},
-                {"$group": {"_id": "$department", "count": {"$sum": 1}}}
-            ]
-            by_dept   = await db.job_openings.aggregate(pipeline).to_list(length=20)
-            recent    = await db.job_openings.find(
-                {"status": "open"}, sort=[("posted", -1)]
-            ).limit(3).to_list(length=3)
-            return json.dumps({
-                "total_open": total,
-                "by_department": {d["_id"]: d["count"] for d in by_dept},
-                "recently_posted": [{"title": j["title"], "department": j["department"], "posted": j["posted"]}
-                                     for j in recent]
-            })
+            # One point read of the materialised summary (built on first use)
+            stats = await read_stats(db)
+            if stats is None:
+                await reconcile_stats(db)
+                stats = await read_stats(db)
+            return json.dumps(stats)
 
         elif tool_name == "create_job_posting":
             job = {
@@ -236,6 +290,8 @@ async def execute_tool(tool_name: str, tool_args: dict) -> str:
                 "posted":       datetime.now().strftime("%Y-%m-%d")
             }
             result = await db.job_openings.insert_one(job)
+            job_index.add(job)
+            await job_opened(db, job)
             logger.info(f"✅ New job posting created: {tool_args['title']}")
             return json.dumps({"success": True, "job_id": str(result.inserted_id),
                                "message": f"Job posting '{tool_args['title']}' created successfully."})
@@ -275,21 +331,34 @@ SEED_JOBS = [
 
 @app.on_event("startup")
 async def startup_event():
-    global mongo_client, db
+    global mongo_client, db, job_index_watcher, stats_reconciler
     logger.info("🚀 Recruitment Agent v2 Starting (with tool calling)")
     try:
         mongo_client = AsyncIOMotorClient(MONGODB_URL)
         db = mongo_client[DB_NAME]
         await mongo_client.admin.command("ping")
         logger.info("✅ MongoDB connected")
+        await ensure_indexes(db, "recruitment")
+        chat_writer.start(db.chat_history)
         if await db.job_openings.count_documents({}) == 0:
             await db.job_openings.insert_many(SEED_JOBS)
             logger.info(f"🌱 Seeded {len(SEED_JOBS)} job openings")
+        await refresh_job_index()
+        job_index_watcher = asyncio.create_task(watch_job_openings())
+        await reconcile_stats(db)
+        stats_reconciler = asyncio.create_task(reconcile_stats_periodically())
     except Exception as e:
         logger.error(f"❌ MongoDB failed: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if job_index_watcher:
+        job_index_watcher.cancel()
+    if stats_reconciler:
+        stats_reconciler.cancel()
+    if client:
+        await client.close()
+    await chat_writer.stop()
     if mongo_client:
         mongo_client.close()
 
@@ -304,13 +373,25 @@ async def health_check():
         mongo_status = "error"
     return {"status": "healthy", "service": "recruitment-agent", "version": "2.0.0",
             "openai_status": "configured" if OPENAI_API_KEY else "missing",
-            "mongodb_status": mongo_status, "mode": "agentic-tool-calling"}
+            "mongodb_status": mongo_status, "mode": "agentic-tool-calling",
+            "job_index": {"openings": len(job_index)},
+            "chat_logger": chat_writer.stats(), "tool_cache": tool_cache_stats()}
 
 # ─────────────────────────────────────────────
 # AI Query Endpoint — Agentic Loop
 # ─────────────────────────────────────────────
 @app.post("/api/recruitment/query", response_model=RecruitmentQueryResponse)
 async def query_recruitment(request: RecruitmentQueryRequest):
+    return await answer_recruitment_query(request)
+
+@app.post("/api/recruitment/query/stream")
+async def query_recruitment_stream(request: RecruitmentQueryRequest):
+    """SSE variant: `token` events carry the Final Answer as it is generated, then `done`."""
+    async def run(emit):
+        return await answer_recruitment_query(request, on_token=lambda text: emit("token", {"text": text}))
+    return StreamingResponse(sse_stream(run), media_type="text/event-stream", headers=SSE_HEADERS)
+
+async def answer_recruitment_query(request: RecruitmentQueryRequest, on_token=None) -> RecruitmentQueryResponse:
     try:
         logger.info(f"📥 Recruitment query: {request.query}")
         if not client:
@@ -346,9 +427,11 @@ async def query_recruitment(request: RecruitmentQueryRequest):
             openai_client=client,
             messages=messages,
             tools=RECRUITMENT_TOOLS,
+            mutating_tools=RECRUITMENT_MUTATING_TOOLS,
             tool_executor=execute_tool,
             service_name="Recruitment",
             max_iterations=8,
+            on_token=on_token,
         )
         answer     = result["answer"]
         tools_used = result["tools_used"]
@@ -368,17 +451,18 @@ async def query_recruitment(request: RecruitmentQueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/recruitment/openings")
-async def get_openings(department: Optional[str] = None, location: Optional[str] = None):
+async def get_openings(department: Optional[str] = None, location: Optional[str] = None,
+                       q: Optional[str] = None, skill: Optional[List[str]] = Query(None),
+                       status: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
-    query_filter = {}
-    if department:
-        query_filter["department"] = {"$regex": department, "$options": "i"}
-    if location:
-        query_filter["location"] = {"$regex": location, "$options": "i"}
-    cursor   = db.job_openings.find(query_filter)
-    openings = await cursor.to_list(length=100)
-    return {"openings": [serialize_doc(j) for j in openings], "total": len(openings)}
+    try:
+        result = job_index.search(query=q or "", department=department, location=location, skills=skill,
+                                  status=status, limit=max(1, min(limit, 100)), cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"openings": result["jobs"], "total": result["total"],
+            "next_cursor": result["next_cursor"], "facets": result["facets"]}
 
 @app.get("/api/recruitment/opening/{job_id}")
 async def get_opening(job_id: str):
@@ -393,10 +477,28 @@ async def get_opening(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
     return serialize_doc(job)
 
+@app.put("/api/recruitment/opening/{job_id}/status")
+async def update_opening_status(job_id: str, update: JobStatusUpdate):
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    if update.status not in ("open", "closed"):
+        raise HTTPException(status_code=400, detail="Status must be 'open' or 'closed'")
+    try:
+        ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job ID")
+    job = await set_job_status(job_id, update.status)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    # Drops this job's cached details and every cached search / stats read
+    shared_tool_cache.invalidate("Recruitment", {"job_id": job_id})
+    return serialize_doc(job)
+
 @app.get("/api/recruitment/history/chat")
 async def get_chat_history(limit: int = 50):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush()
     cursor = db.chat_history.find({"service": "recruitment"}, sort=[("timestamp", -1)]).limit(limit)
     history = await cursor.to_list(length=limit)
     return {"history": [serialize_doc(h) for h in history]}
@@ -405,9 +507,16 @@ async def get_chat_history(limit: int = 50):
 async def get_conversation(conversation_id: str):
     if db is None:
         raise HTTPException(status_code=500, detail="Database not connected")
+    await chat_writer.flush(conversation_id)
     cursor = db.chat_history.find({"conversation_id": conversation_id}, sort=[("timestamp", 1)])
     messages = await cursor.to_list(length=200)
     return {"conversation_id": conversation_id, "messages": [serialize_doc(m) for m in messages]}
 
+@app.get("/api/recruitment/admin/indexes")
+async def get_index_report():
+    if db is None:
+        raise HTTPException(status_code=500, detail="Database not connected")
+    return await index_report(db, "recruitment")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8005)))
\ No newline at end of file
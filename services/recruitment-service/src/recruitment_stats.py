@@ -0,0 +1,104 @@
+"""
+recruitment_stats.py — Materialised recruitment summary.
+
+get_recruitment_stats used to run a count, a $group and a sorted find on
+every call. The same numbers now live in one `recruitment_stats` document
+(_id "open_jobs"): total_open, by_department counts and the RECENT_JOBS
+most recently posted open jobs.
+
+Writers keep it current with a single update each — job_opened() when a
+job is posted or reopened, job_closed() when an open job changes status —
+and reconcile_stats() recomputes it from `job_openings` to repair any
+drift (run at startup and periodically, and whenever an incremental update
+can't apply). read_stats() is one point read.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+STATS_ID    = "open_jobs"
+RECENT_JOBS = 3
+
+
+def _recent_entry(job: Dict) -> Dict:
+    return {"job_id": str(job["_id"]), "title": job["title"],
+            "department": job["department"], "posted": job["posted"]}
+
+
+async def compute_stats(db) -> Dict:
+    """The summary, computed from scratch off `job_openings`."""
+    total   = await db.job_openings.count_documents({"status": "open"})
+    by_dept = await db.job_openings.aggregate([
+        {"$match": {"status": "open"}},
+        {"$group": {"_id": "$department", "count": {"$sum": 1}}},
+    ]).to_list(length=None)
+    recent  = await db.job_openings.find(
+        {"status": "open"}, {"title": 1, "department": 1, "posted": 1}, sort=[("posted", -1)]
+    ).limit(RECENT_JOBS).to_list(length=RECENT_JOBS)
+    return {"total_open": total,
+            "by_department": {d["_id"]: d["count"] for d in by_dept},
+            "recently_posted": [_recent_entry(j) for j in recent]}
+
+
+async def reconcile_stats(db) -> Dict:
+    """Overwrite the summary document with freshly computed numbers."""
+    stats = await compute_stats(db)
+    await db.recruitment_stats.replace_one(
+        {"_id": STATS_ID}, {**stats, "reconciled_at": datetime.now().isoformat()}, upsert=True)
+    return stats
+
+
+def _incremental(job: Dict) -> bool:
+    # A department name that is not a plain field name can't be $inc'd by path
+    department = str(job["department"])
+    return bool(department) and "." not in department and not department.startswith("$")
+
+
+async def job_opened(db, job: Dict):
+    """A job was posted or reopened — count it and offer it to the recent list."""
+    if not _incremental(job):
+        await reconcile_stats(db)
+        return
+    result = await db.recruitment_stats.update_one(
+        {"_id": STATS_ID},
+        {"$inc":  {"total_open": 1, f"by_department.{job['department']}": 1},
+         "$push": {"recently_posted": {"$each": [_recent_entry(job)],
+                                       "$sort": {"posted": -1}, "$slice": RECENT_JOBS}}},
+    )
+    if result.matched_count == 0:
+        await reconcile_stats(db)
+
+
+async def job_closed(db, job: Dict):
+    """An open job left the open state — uncount it; refill the recent list if it was on it."""
+    if not _incremental(job):
+        await reconcile_stats(db)
+        return
+    before = await db.recruitment_stats.find_one_and_update(
+        {"_id": STATS_ID},
+        {"$inc":  {"total_open": -1, f"by_department.{job['department']}": -1},
+         "$pull": {"recently_posted": {"job_id": str(job["_id"])}}},
+        projection={"recently_posted.job_id": 1},
+    )
+    if before is None:
+        await reconcile_stats(db)
+        return
+    if any(r["job_id"] == str(job["_id"]) for r in before.get("recently_posted", [])):
+        recent = await db.job_openings.find(
+            {"status": "open"}, {"title": 1, "department": 1, "posted": 1}, sort=[("posted", -1)]
+        ).limit(RECENT_JOBS).to_list(length=RECENT_JOBS)
+        await db.recruitment_stats.update_one(
+            {"_id": STATS_ID}, {"$set": {"recently_posted": [_recent_entry(j) for j in recent]}})
+
+
+async def read_stats(db) -> Optional[Dict]:
+    """The summary in get_recruitment_stats' shape, or None if it was never built."""
+    doc = await db.recruitment_stats.find_one({"_id": STATS_ID})
+    if doc is None:
+        return None
+    return {
+        "total_open": doc.get("total_open", 0),
+        "by_department": {d: n for d, n in doc.get("by_department", {}).items() if n > 0},
+        "recently_posted": [{"title": r["title"], "department": r["department"], "posted": r["posted"]}
+                            for r in doc.get("recently_posted", [])],
+    }
@@ -207,4 +207,172 @@ def test_posted_date_format():
     for job in data["openings"]:
         # basic ISO date check
         assert len(job["posted"]) == 10
-        assert job["posted"].count("-") == 2
\ No newline at end of file
+        assert job["posted"].count("-") == 2
+
+# =========================
+# JOB INDEX
+# =========================
+
+def test_job_index_filters_ranks_and_pages():
+    from src.job_index import JobIndex
+
+    index = JobIndex()
+    index.rebuild([
+        {"_id": "a", "title": "Senior Software Engineer", "department": "Engineering", "location": "Singapore",
+         "skills": ["Python", "AWS"], "description": "Backend systems.", "status": "open", "posted": "2025-02-01"},
+        {"_id": "b", "title": "Data Scientist", "department": "Analytics", "location": "Singapore",
+         "skills": ["Python", "Machine Learning"], "description": "Build ML models.", "status": "open",
+         "posted": "2025-02-03"},
+        {"_id": "c", "title": "Marketing Specialist", "department": "Marketing", "location": "Remote",
+         "skills": ["SEO"], "description": "Campaigns.", "status": "open", "posted": "2025-02-05"},
+        {"_id": "d", "title": "Python Engineer", "department": "Engineering", "location": "Remote",
+         "skills": ["Python"], "description": "Tooling.", "status": "closed", "posted": "2025-01-01"},
+    ])
+
+    # No query: open jobs, newest first; substring facet filters are case-insensitive
+    assert [j["id"] for j in index.search()["jobs"]] == ["c", "b", "a"]
+    assert [j["id"] for j in index.search(department="engineer", status=None)["jobs"]] == ["a", "d"]
+    assert index.search(location="singapore")["facets"]["department"] == {"Engineering": 1, "Analytics": 1}
+
+    # Ranked text search plus a required skill
+    hits = index.search(query="machine learning python")["jobs"]
+    assert hits[0]["id"] == "b" and hits[0]["score"] > hits[1]["score"]
+    assert [j["id"] for j in index.search(skills=["aws"])["jobs"]] == ["a"]
+
+    # Cursor pages are disjoint and stable when a job is added mid-way
+    first = index.search(limit=2)
+    index.add({"_id": "e", "title": "HR Manager", "department": "Human Resources", "location": "Singapore",
+               "skills": [], "status": "open", "posted": "2025-03-01"})
+    second = index.search(limit=2, cursor=first["next_cursor"])
+    assert [j["id"] for j in first["jobs"]] == ["c", "b"]
+    assert [j["id"] for j in second["jobs"]] == ["a"] and second["next_cursor"] is None
+
+    index.remove("b")
+    assert index.search(query="machine")["total"] == 0
+
+
+def test_job_index_ranked_pages_survive_corpus_changes():
+    """Adds between pages shift IDF and average length; no ranked job is lost or repeated"""
+    from src.job_index import JobIndex
+
+    def job(i, title, skills, words):
+        return {"_id": f"j{i:02d}", "title": title, "department": "Engineering", "location": "Singapore",
+                "skills": skills, "description": " ".join(["systems"] * words), "status": "open",
+                "posted": f"2025-01-{i % 28 + 1:02d}"}
+
+    def page_through(index, added):
+        seen, cursor, page = [], None, 0
+        while True:
+            result = index.search("python", limit=4, cursor=cursor)
+            seen += [j["id"] for j in result["jobs"]]
+            cursor, page = result["next_cursor"], page + 1
+            if page == 1:
+                for extra in added:
+                    index.add(extra)
+            if cursor is None:
+                return seen
+
+    matching = [job(i, "Python Engineer" if i % 3 else "Backend Developer", ["Python"], i % 5)
+                for i in range(25)]
+    for added in ([job(90, "Marketing Lead", ["SEO"], 40)],
+                  [job(91, "Python Platform Lead", ["Python", "Go"], 1)]):
+        index = JobIndex()
+        index.rebuild(matching)
+        seen = page_through(index, added)
+        assert len(seen) == len(set(seen))
+        assert {j["_id"] for j in matching} <= set(seen)
+
+
+# =========================
+# MATERIALISED STATS
+# =========================
+
+class _FakeStats:
+    """The recruitment_stats operators the incremental updates use, over one dict."""
+
+    def __init__(self):
+        self.doc = None
+
+    async def replace_one(self, query, doc, upsert=False):
+        self.doc = {"_id": query["_id"], **doc}
+
+    async def find_one(self, query):
+        return self.doc
+
+    def _apply(self, update):
+        for path, delta in update.get("$inc", {}).items():
+            parent, _, key = path.rpartition(".")
+            target = self.doc.setdefault(parent, {}) if parent else self.doc
+            target[key] = target.get(key, 0) + delta
+        for field, spec in update.get("$push", {}).items():
+            items = self.doc.get(field, []) + spec["$each"]
+            items.sort(key=lambda r: r["posted"], reverse=True)
+            self.doc[field] = items[:spec["$slice"]]
+        for field, cond in update.get("$pull", {}).items():
+            self.doc[field] = [r for r in self.doc.get(field, []) if r["job_id"] != cond["job_id"]]
+        self.doc.update(update.get("$set", {}))
+
+    async def update_one(self, query, update):
+        from types import SimpleNamespace
+        if self.doc is None:
+            return SimpleNamespace(matched_count=0)
+        self._apply(update)
+        return SimpleNamespace(matched_count=1)
+
+    async def find_one_and_update(self, query, update, projection=None):
+        import copy
+        before = copy.deepcopy(self.doc)
+        if self.doc is not None:
+            self._apply(update)
+        return before
+
+
+@pytest.mark.asyncio
+async def test_recruitment_stats_follow_incremental_updates(monkeypatch):
+    from types import SimpleNamespace
+    import src.recruitment_stats as stats_module
+    from src.recruitment_stats import job_opened, job_closed, read_stats
+
+    jobs = [{"_id": f"j{i}", "title": f"Job {i}", "department": dept, "posted": f"2025-02-0{i}",
+             "status": "open"} for i, dept in enumerate(["Engineering", "Engineering", "Analytics", "Marketing"], 1)]
+    open_jobs = lambda: sorted((j for j in jobs if j["status"] == "open"), key=lambda j: j["posted"], reverse=True)
+
+    async def compute_stats(db):
+        by_dept = {}
+        for j in open_jobs():
+            by_dept[j["department"]] = by_dept.get(j["department"], 0) + 1
+        return {"total_open": len(open_jobs()), "by_department": by_dept,
+                "recently_posted": [stats_module._recent_entry(j) for j in open_jobs()[:3]]}
+
+    class Openings:
+        def find(self, *args, **kwargs):
+            return SimpleNamespace(limit=lambda n: SimpleNamespace(
+                to_list=lambda length: _resolved(open_jobs()[:n])))
+
+    async def _resolved(value):
+        return value
+
+    monkeypatch.setattr(stats_module, "compute_stats", compute_stats)
+    db = SimpleNamespace(recruitment_stats=_FakeStats(), job_openings=Openings())
+
+    # First write finds no summary and builds it
+    await job_opened(db, jobs[0])
+    assert (await read_stats(db))["total_open"] == 4
+
+    jobs.append({"_id": "j5", "title": "Job 5", "department": "Analytics", "posted": "2025-02-05", "status": "open"})
+    await job_opened(db, jobs[-1])
+    jobs[3]["status"] = "closed"                       # most recent before j5 — on the recent list
+    await job_closed(db, jobs[3])
+    jobs[0]["status"] = "closed"
+    await job_closed(db, jobs[0])
+
+    assert await read_stats(db) == {
+        "total_open": 3,
+        "by_department": {"Engineering": 1, "Analytics": 2},
+        "recently_posted": [{"title": "Job 5", "department": "Analytics", "posted": "2025-02-05"},
+                            {"title": "Job 3", "department": "Analytics", "posted": "2025-02-03"},
+                            {"title": "Job 2", "department": "Engineering", "posted": "2025-02-02"}],
+    }
+    # And the incremental state matches a full recomputation
+    recomputed = await compute_stats(db)
+    assert db.recruitment_stats.doc["recently_posted"] == recomputed["recently_posted"]